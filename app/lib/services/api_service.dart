@@ -338,6 +338,7 @@ class ApiService {
   Future<Map<String, dynamic>> analyzePlant({
     required Uint8List imageBytes,
     String model = 'auto',
+    bool allowRefresh = true,
   }) async {
     final token = await _authService.getToken();
     if (token == null) {
@@ -366,6 +367,11 @@ class ApiService {
       );
       final response = await http.Response.fromStream(streamedResponse);
 
+      // Access token süresi dolduysa bir kez yenileyip tekrar dene
+      if (response.statusCode == 401 && allowRefresh && await _authService.refreshSession()) {
+        return analyzePlant(imageBytes: imageBytes, model: model, allowRefresh: false);
+      }
+
       // Token geçersizse (401) otomatik logout
       if (response.statusCode == 401) {
         _handleUnauthorized();
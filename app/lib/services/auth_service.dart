@@ -5,10 +5,14 @@ import '../core/config.dart';
 
 class AuthService {
   static const String _tokenKey = 'auth_token';
+  static const String _refreshTokenKey = 'refresh_token';
   static const String _userKey = 'user_data';
   
   final _client = http.Client();
 
+  // Süren refresh; tüm AuthService örnekleri paylaşır
+  static Future<bool>? _refreshInFlight;
+
   Uri _u(String path) {
     return Uri.parse('${AppConfig.baseUrl}$path');
   }
@@ -34,7 +38,7 @@ class AuthService {
       if (response.statusCode == 200) {
         final data = jsonDecode(response.body) as Map<String, dynamic>;
         final token = (data['access_token'] as String).trim();
-        await _saveToken(token);
+        await _saveTokens(data);
         await _saveUser(data['user'] as Map<String, dynamic>);
         print('[AuthService] Register successful, token saved (length: ${token.length})');
         return {'success': true, 'data': data};
@@ -67,7 +71,7 @@ class AuthService {
       if (response.statusCode == 200) {
         final data = jsonDecode(response.body) as Map<String, dynamic>;
         final token = (data['access_token'] as String).trim();
-        await _saveToken(token);
+        await _saveTokens(data);
         await _saveUser(data['user'] as Map<String, dynamic>);
         print('[AuthService] Login successful, token saved (length: ${token.length})');
         return {'success': true, 'data': data};
@@ -97,9 +101,46 @@ class AuthService {
     return prefs.getString(_tokenKey);
   }
 
-  Future<void> _saveToken(String token) async {
+  Future<void> _saveTokens(Map<String, dynamic> data) async {
     final prefs = await SharedPreferences.getInstance();
-    await prefs.setString(_tokenKey, token);
+    await prefs.setString(_tokenKey, (data['access_token'] as String).trim());
+    final refreshToken = data['refresh_token'] as String?;
+    if (refreshToken != null) {
+      await prefs.setString(_refreshTokenKey, refreshToken);
+    }
+  }
+
+  /// Access token'ı refresh token ile yeniler. Başarısızsa false döner;
+  /// refresh token tek kullanımlık olduğundan yanıttaki yenisi saklanır.
+  /// Aynı anda 401 alan istekler tek bir refresh'i bekler: aynı refresh
+  /// token'ın ikinci kullanımı sunucuda token hırsızlığı sayılır.
+  Future<bool> refreshSession() {
+    return _refreshInFlight ??= _refreshSession().whenComplete(() => _refreshInFlight = null);
+  }
+
+  Future<bool> _refreshSession() async {
+    final prefs = await SharedPreferences.getInstance();
+    final refreshToken = prefs.getString(_refreshTokenKey);
+    if (refreshToken == null) return false;
+
+    try {
+      final response = await _client.post(
+        _u('/api/v1/auth/refresh'),
+        headers: {'Content-Type': 'application/json'},
+        body: jsonEncode({'refresh_token': refreshToken}),
+      );
+      if (response.statusCode != 200) {
+        print('[AuthService] Refresh failed: ${response.statusCode}');
+        return false;
+      }
+      final data = jsonDecode(response.body) as Map<String, dynamic>;
+      await _saveTokens(data);
+      await _saveUser(data['user'] as Map<String, dynamic>);
+      return true;
+    } catch (e) {
+      print('[AuthService] Refresh error: $e');
+      return false;
+    }
   }
 
   Future<void> _saveUser(Map<String, dynamic> user) async {
@@ -109,7 +150,25 @@ class AuthService {
 
   Future<void> logout() async {
     final prefs = await SharedPreferences.getInstance();
+    final token = prefs.getString(_tokenKey);
+    final refreshToken = prefs.getString(_refreshTokenKey);
+    if (token != null) {
+      // Sunucu tarafında token'ları iptal et; bağlantı yoksa yerel çıkış yine yapılır
+      try {
+        await _client.post(
+          _u('/api/v1/auth/logout'),
+          headers: {
+            'Authorization': 'Bearer ${token.trim()}',
+            'Content-Type': 'application/json',
+          },
+          body: jsonEncode({'refresh_token': refreshToken}),
+        ).timeout(const Duration(seconds: 5));
+      } catch (e) {
+        print('[AuthService] Logout request error: $e');
+      }
+    }
     await prefs.remove(_tokenKey);
+    await prefs.remove(_refreshTokenKey);
     await prefs.remove(_userKey);
   }
 
@@ -118,7 +177,7 @@ class AuthService {
     return token != null && token.isNotEmpty;
   }
 
-  Future<Map<String, dynamic>?> verifyToken() async {
+  Future<Map<String, dynamic>?> verifyToken({bool allowRefresh = true}) async {
     final token = await getToken();
     if (token == null) return null;
 
@@ -136,6 +195,9 @@ class AuthService {
 
       if (response.statusCode == 200) {
         return jsonDecode(response.body) as Map<String, dynamic>;
+      } else if (response.statusCode == 401 && allowRefresh && await refreshSession()) {
+        // Access token'ın süresi dolmuş, yenilendi
+        return verifyToken(allowRefresh: false);
       } else {
         // Token geçersiz, logout yap
         print('[AuthService] Token verification failed: ${response.statusCode} - ${response.body}');
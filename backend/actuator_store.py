@@ -0,0 +1,254 @@
+"""
+Actuator durumu için olay kaynaklı (event-sourced) bellek içi depo.
+
+Doğruluk kaynağı ActuatorEventDB tablosudur; her olay cihazın o andaki
+mode/state değerini taşır. Startup'ta son snapshot yüklenir ve ondan sonraki
+olaylar id sırasıyla yeniden oynatılır. Çalışma sırasında:
+
+- okumalar (`get`, `all`) DB'ye gitmez, paylaşılan durumdan yapılır,
+- `apply()` paylaşılan durumu compare-and-set ile günceller (başka bir
+  worker'ın eşzamanlı komutu ezilmez), olayı kuyruğa koyar; ayrı bir writer
+  thread'i kuyruğu toplu (tek transaction) olarak yazar,
+- writer her `snapshot_every` olayda (ve kapanışta) ActuatorSnapshotDB'ye
+  snapshot yazar. Snapshot içeriği DB'den kurulur: son snapshot + ondan sonraki
+  tüm olaylar (hangi worker yazmış olursa olsun). Böylece yeniden oynatma ile
+  tutarlıdır; worker'ın yalnızca kendi yazdığı olaylardan türetilmez.
+
+Güncel durum bir SharedState'te (`actuator:<device>` anahtarları) tutulur;
+varsayılan LocalState süreç içi bellektir, diğer backend'lerle tüm uvicorn
+worker'ları aynı durumu görür. Replay sonucu yalnızca anahtar henüz yoksa
+yazılır, böylece yeni başlayan bir worker diğerlerinin güncel durumunu ezmez.
+
+Modeller ve engine dışarıdan verilir (main.py'deki tablolar).
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from sqlmodel import Session, select
+
+from shared_state import LocalState, SharedState
+
+log = logging.getLogger(__name__)
+
+DEVICES = ("fan", "heater", "humidifier")
+
+
+def _initial_state(devices: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+    return {d: {"mode": "auto", "state": "off", "last_change": None} for d in devices}
+
+
+class ActuatorStore:
+    def __init__(
+        self,
+        engine,
+        event_model,
+        snapshot_model,
+        *,
+        format_ts: Callable[[datetime], str],
+        devices: Iterable[str] = DEVICES,
+        batch_size: int = 100,
+        flush_interval: float = 0.05,
+        snapshot_every: int = 500,
+        shared: Optional[SharedState] = None,
+        on_write: Optional[Callable[[], None]] = None,
+    ) -> None:
+        self.engine = engine
+        self.event_model = event_model
+        self.snapshot_model = snapshot_model
+        self.format_ts = format_ts
+        self.devices = tuple(devices)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.snapshot_every = snapshot_every
+        self.shared = shared if shared is not None else LocalState({})
+        self.on_write = on_write  # bir toplu yazma DB'ye işlendikten sonra (ör. veri sürümü artırma)
+        self._last_event_id = 0
+        self._since_snapshot = 0
+        self._lock = threading.Lock()
+        self._queue: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._stats = {"events": 0, "batches": 0, "snapshots": 0, "write_errors": 0, "replayed": 0}
+
+    # ---- okuma -----------------------------------------------------------
+    @staticmethod
+    def _key(device: str) -> str:
+        return f"actuator:{device}"
+
+    def get(self, device: str) -> Dict[str, Any]:
+        if device not in self.devices:
+            raise KeyError(device)
+        return self.shared.get(self._key(device)) or _initial_state([device])[device]
+
+    def all(self) -> Dict[str, Dict[str, Any]]:
+        return {d: self.get(d) for d in self.devices}
+
+    # ---- yazma -----------------------------------------------------------
+    def apply(self, device: str, action: str, reason: str) -> Dict[str, Any]:
+        """Komutu paylaşılan duruma uygular, olayı yazım kuyruğuna koyar; yeni durumu döner."""
+        if device not in self.devices:
+            raise KeyError(device)
+        now = datetime.now(timezone.utc)
+        key = self._key(device)
+        while True:
+            current = self.shared.get(key)
+            actuator = dict(current) if current is not None else _initial_state([device])[device]
+            actuator["last_change"] = self.format_ts(now)
+            if action in {"on", "off"}:
+                # Otomasyon komutları auto modunu korur; manuel komut modu kilitler
+                if reason == "manual":
+                    actuator["mode"] = "manual"
+                actuator["state"] = action
+            else:
+                actuator["mode"] = "auto"
+                # Otomatik moda geçerken cihazı kapalı varsay
+                actuator["state"] = "off"
+            # Okuma ile yazma arasında başka bir worker yazdıysa onun değeri üzerinden yeniden dene
+            if self.shared.compare_and_set(key, current, actuator):
+                break
+        snapshot = dict(actuator)
+        self._queue.put({
+            "device": device,
+            "action": action,
+            "reason": reason,
+            "mode": snapshot["mode"],
+            "state": snapshot["state"],
+            "ts": now,
+        })
+        return snapshot
+
+    # ---- yaşam döngüsü -----------------------------------------------------
+    def start(self) -> None:
+        """Snapshot + olay tekrarı ile durumu kurar ve writer thread'ini başlatır."""
+        self.recover()
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="actuator-writer", daemon=True)
+            self._thread.start()
+
+    def _replay(self, s: Session):
+        """Son snapshot + sonraki tüm olaylar; (durum, son olay id'si, oynatılan olay sayısı)."""
+        state = _initial_state(self.devices)
+        last_event_id = 0
+        snap = s.exec(select(self.snapshot_model).order_by(self.snapshot_model.id.desc()).limit(1)).first()
+        if snap is not None:
+            for device, data in json.loads(snap.payload).items():
+                if device in state:
+                    state[device].update(data)
+            last_event_id = snap.last_event_id
+        # Tek sorgu: sonuç tutarlı bir görüntüdür ve en büyük id'ye kadar tüm olayları içerir
+        events = s.exec(
+            select(self.event_model)
+            .where(self.event_model.id > last_event_id)
+            .order_by(self.event_model.id)
+        ).all()
+        for e in events:
+            if e.device in state:
+                state[e.device] = {"mode": e.mode, "state": e.state, "last_change": self.format_ts(e.ts)}
+            last_event_id = e.id
+        return state, last_event_id, len(events)
+
+    def recover(self) -> None:
+        with Session(self.engine) as s:
+            state, last_event_id, replayed = self._replay(s)
+        for device, data in state.items():
+            self.shared.add(self._key(device), data)
+        with self._lock:
+            self._last_event_id = last_event_id
+            self._since_snapshot = replayed
+        self._stats["replayed"] = replayed
+
+    def flush(self) -> None:
+        """Kuyruktaki tüm olaylar yazılana kadar bekler."""
+        self._queue.join()
+
+    def close(self) -> None:
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+        if self._since_snapshot:
+            self._write_snapshot()
+
+    # ---- writer thread -----------------------------------------------------
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                self._queue.task_done()
+                return
+            batch = [item]
+            stop = False
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    nxt = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if nxt is None:
+                    stop = True
+                    break
+                batch.append(nxt)
+            self._write_batch(batch)
+            for _ in range(len(batch) + (1 if stop else 0)):
+                self._queue.task_done()
+            if stop:
+                return
+
+    def _write_batch(self, batch: List[Dict[str, Any]]) -> None:
+        for attempt in range(3):
+            try:
+                with Session(self.engine) as s:
+                    rows = [self.event_model(**event) for event in batch]
+                    s.add_all(rows)
+                    s.commit()
+                    ids = [row.id for row in rows]
+                break
+            except Exception as db_err:
+                if attempt == 2:
+                    self._stats["write_errors"] += 1
+                    log.error("ActuatorEvent DB insert error (%d olay kaybedildi): %s", len(batch), db_err)
+                    return
+                time.sleep(0.1 * (attempt + 1))
+
+        self._last_event_id = max(self._last_event_id, *ids)
+        if self.on_write is not None:
+            self.on_write()
+        self._stats["events"] += len(batch)
+        self._stats["batches"] += 1
+        self._since_snapshot += len(batch)
+        if self._since_snapshot >= self.snapshot_every:
+            self._write_snapshot()
+
+    def _write_snapshot(self) -> None:
+        # İçerik DB'den kurulur: diğer worker'ların araya giren olayları da dahil edilir
+        try:
+            with Session(self.engine) as s:
+                state, last_event_id, replayed = self._replay(s)
+                if replayed:  # son snapshot'tan beri olay yoksa aynısını tekrar yazma
+                    s.add(self.snapshot_model(
+                        last_event_id=last_event_id,
+                        payload=json.dumps(state),
+                        ts=datetime.now(timezone.utc),
+                    ))
+                    s.commit()
+            self._last_event_id = max(self._last_event_id, last_event_id)
+            self._since_snapshot = 0
+            self._stats["snapshots"] += 1
+        except Exception as db_err:
+            log.error("ActuatorSnapshot DB insert error: %s", db_err)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            "pending": self._queue.qsize(),
+            "last_event_id": self._last_event_id,
+            "since_snapshot": self._since_snapshot,
+        }
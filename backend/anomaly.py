@@ -0,0 +1,133 @@
+"""
+Sensör serileri için akış (streaming) anomali tespiti.
+
+Her sensör için üssel ağırlıklı ortalama ve varyans (EWMA) tutulur; bellek
+sensör başına sabittir (O(1)) ve her okuma O(1) sürede işlenir:
+
+    z = (x - mean) / max(std, min_std[type])
+
+- ilk `warmup` okuma yalnızca tabanı kurar,
+- |z| >= `threshold` olan okuma spike işaretidir (markers),
+- spike'lar tabanı bozmasın diye ortalamaya katılmaz; art arda
+  `adapt_after` anomali gelirse bu yeni seviye kabul edilir (seviye kayması),
+- aynı sensör için `suppress_seconds` içinde yalnızca bir alarm üretilir;
+  işaretler yine kaydedilir.
+"""
+
+from __future__ import annotations
+
+import math
+import threading
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Mapping, Optional
+
+# Varyans neredeyse sıfırken z'nin patlamaması için tip başına alt sınır
+DEFAULT_MIN_STD: Mapping[str, float] = {"temp": 0.2, "humidity": 0.5, "co2": 10.0}
+
+
+class _SensorState:
+    __slots__ = ("mean", "var", "count", "run", "last_alert")
+
+    def __init__(self, value: float) -> None:
+        self.mean = value
+        self.var = 0.0
+        self.count = 1
+        self.run = 0
+        self.last_alert = -math.inf
+
+
+class AnomalyDetector:
+    def __init__(
+        self,
+        *,
+        alpha: float = 0.1,
+        threshold: float = 4.0,
+        warmup: int = 10,
+        adapt_after: int = 5,
+        suppress_seconds: float = 300.0,
+        min_std: Mapping[str, float] = DEFAULT_MIN_STD,
+        max_markers: int = 1000,
+        on_alert: Optional[Callable[[Dict[str, Any]], None]] = None,
+    ) -> None:
+        self.alpha = alpha
+        self.threshold = threshold
+        self.warmup = warmup
+        self.adapt_after = adapt_after
+        self.suppress_seconds = suppress_seconds
+        self.min_std = dict(min_std)
+        self.on_alert = on_alert
+        self._sensors: Dict[str, _SensorState] = {}
+        self._markers: Deque[Dict[str, Any]] = deque(maxlen=max_markers)
+        self._lock = threading.Lock()
+        self.stats = {"readings": 0, "anomalies": 0, "alerts": 0, "suppressed": 0}
+
+    def update(self, sensor_id: str, sensor_type: str, value: float, ts: float) -> Optional[Dict[str, Any]]:
+        """Okumayı işler; anomaliyse spike işaretini döner (alarm gerekiyorsa `alert=True`)."""
+        with self._lock:
+            self.stats["readings"] += 1
+            state = self._sensors.get(sensor_id)
+            if state is None:
+                self._sensors[sensor_id] = _SensorState(value)
+                return None
+
+            std = max(math.sqrt(state.var), self.min_std.get(sensor_type, 0.0))
+            z = (value - state.mean) / std if std > 0 else 0.0
+            anomalous = state.count >= self.warmup and abs(z) >= self.threshold
+            expected = state.mean
+
+            if anomalous:
+                state.run += 1
+                if state.run >= self.adapt_after:
+                    # Kalıcı seviye değişimi: tabanı yeni seviyeden yeniden kur
+                    state.mean, state.var, state.count, state.run = value, 0.0, 1, 0
+            else:
+                state.run = 0
+                diff = value - state.mean
+                incr = self.alpha * diff
+                state.mean += incr
+                state.var = (1 - self.alpha) * (state.var + diff * incr)
+                state.count += 1
+
+            if not anomalous:
+                return None
+
+            self.stats["anomalies"] += 1
+            alert = ts - state.last_alert >= self.suppress_seconds
+            if alert:
+                state.last_alert = ts
+                self.stats["alerts"] += 1
+            else:
+                self.stats["suppressed"] += 1
+            marker = {
+                "sensor_id": sensor_id,
+                "type": sensor_type,
+                "value": value,
+                "expected": round(expected, 3),
+                "z": round(z, 2),
+                "ts": ts,
+                "alert": alert,
+            }
+            self._markers.append(marker)
+
+        if alert and self.on_alert is not None:
+            self.on_alert(marker)
+        return marker
+
+    def markers(self, sensor_id: Optional[str] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        """En yeniden eskiye spike işaretleri."""
+        with self._lock:
+            items = list(self._markers)
+        out = []
+        for marker in reversed(items):
+            if sensor_id is None or marker["sensor_id"] == sensor_id:
+                out.append(marker)
+                if len(out) >= limit:
+                    break
+        return out
+
+    def baseline(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {
+                sid: {"mean": round(s.mean, 3), "std": round(math.sqrt(s.var), 3), "count": s.count}
+                for sid, s in self._sensors.items()
+            }
@@ -0,0 +1,59 @@
+"""
+Kimliği doğrulanmış kullanıcılar (principal) için TTL'li bellek içi önbellek.
+
+get_current_user() her istekte SQLite'a gitmek yerine JWT'deki kullanıcı
+id'si ile bu önbelleğe bakar. Kayıtlar `ttl_seconds` sonra düşer; şifre
+değişikliği veya hesap kapatma gibi durumlarda `invalidate()` ile hemen
+silinir. Başka bir süreçten (ör. manage_users.py) yapılan değişiklikler en
+geç TTL süresi sonunda görülür.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+
+class PrincipalCache:
+    def __init__(self, ttl_seconds: float = 60.0, max_entries: int = 10_000) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: Dict[int, Tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int) -> Optional[Any]:
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+        expires_at, principal = entry
+        if expires_at < time.monotonic():
+            self.invalidate(user_id)
+            return None
+        return principal
+
+    def put(self, user_id: int, principal: Any) -> None:
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                self._evict()
+            self._entries[user_id] = (time.monotonic() + self.ttl_seconds, principal)
+
+    def invalidate(self, user_id: int) -> None:
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def _evict(self) -> None:
+        """Süresi dolanları sil; hâlâ doluysa en eski kaydı at (lock altında çağrılır)."""
+        now = time.monotonic()
+        for user_id in [uid for uid, (exp, _) in self._entries.items() if exp < now]:
+            del self._entries[user_id]
+        if len(self._entries) >= self.max_entries:
+            oldest = next(iter(self._entries))
+            del self._entries[oldest]
+
+    def __len__(self) -> int:
+        return len(self._entries)
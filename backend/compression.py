@@ -0,0 +1,175 @@
+"""
+Yanıt sıkıştırma: Accept-Encoding ile pazarlık edilen brotli / gzip.
+
+Saf ASGI middleware'idir (BaseHTTPMiddleware değil), gövde parça parça
+geçer:
+
+- karar `minimum_size` bayt ya da gövdenin sonu görülene kadar ertelenir
+  (parçalar biriktirilir): gövdesi bu eşikten küçük kalan yanıtlar parça
+  sayısından bağımsız olarak olduğu gibi gider,
+- tamamı eşikten önce ya da tek mesajda gelen gövde tek seferde sıkıştırılır
+  ve Content-Length düzeltilir,
+- akan (more_body) yanıtlarda eşikten sonraki her parça sıkıştırılıp flush
+  edilir; istemci veriyi yanıt bitmeden almaya devam eder,
+- `thread_minimum_size` üstü parçalar threadpool'da sıkıştırılır, büyük
+  gövdeler event loop'u bloklamaz,
+- yalnızca JSON/metin içerik sıkıştırılır; Content-Encoding taşıyan,
+  204/206/304 yanıtlar ve görüntüler dokunulmadan geçer.
+
+İstemci ikisini de kabul ediyorsa brotli tercih edilir (JSON'da gzip'ten
+belirgin küçük, düşük kalitede benzer hız). brotli paketi kurulu değilse
+yalnızca gzip sunulur.
+"""
+
+from __future__ import annotations
+
+import zlib
+from typing import List, Optional
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # brotli yoksa yalnızca gzip (requirements.txt brotli içerir)
+    brotli = None
+
+COMPRESSIBLE_TYPES = ("application/json", "application/javascript", "application/xml", "image/svg+xml")
+
+
+def _compressible(content_type: str) -> bool:
+    media_type = content_type.partition(";")[0].strip().lower()
+    return media_type.startswith("text/") or media_type.endswith("+json") or media_type in COMPRESSIBLE_TYPES
+
+
+def negotiate(accept_encoding: str, available=("br", "gzip")) -> Optional[str]:
+    """Accept-Encoding'den (q değerleriyle) sunulabilecek en iyi kodlama; yoksa None."""
+    weights = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[coding] = q
+    best, best_q = None, 0.0
+    for coding in available:  # eşit q'da `available` sırası (önce br)
+        q = weights.get(coding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+class _GzipEncoder:
+    def __init__(self, level: int) -> None:
+        self._z = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        return self._z.compress(data) + self._z.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+class _BrotliEncoder:
+    def __init__(self, quality: int) -> None:
+        self._c = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        out = self._c.process(data)
+        return out + (self._c.finish() if final else self._c.flush())
+
+
+class CompressionMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        *,
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+        thread_minimum_size: int = 64 * 1024,
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.thread_minimum_size = thread_minimum_size
+        self.available = ("br", "gzip") if brotli is not None else ("gzip",)
+
+    def _encoder(self, encoding: str):
+        if encoding == "br":
+            return _BrotliEncoder(self.brotli_quality)
+        return _GzipEncoder(self.gzip_level)
+
+    async def _compress(self, encoder, data: bytes, final: bool) -> bytes:
+        if len(data) >= self.thread_minimum_size:
+            return await run_in_threadpool(encoder.compress, data, final)
+        return encoder.compress(data, final)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""), self.available)
+        start: Optional[Message] = None
+        pending: List[bytes] = []
+        pending_size = 0
+        encoder = None
+        passthrough = False
+
+        async def send_compressed(message: Message) -> None:
+            nonlocal start, encoder, passthrough, pending_size
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                passthrough = (
+                    "content-encoding" in headers
+                    or message["status"] in (204, 206, 304)
+                    or not _compressible(headers.get("content-type", ""))
+                )
+                if passthrough:
+                    await send(message)
+                else:
+                    start = message  # başlıklar ilk gövde parçası görülünce belirlenir
+                return
+            if passthrough or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if start is not None:
+                if encoding is not None:
+                    pending.append(body)
+                    pending_size += len(body)
+                    if more_body and pending_size < self.minimum_size:
+                        return
+                    body = b"".join(pending)
+                    pending.clear()
+                headers = MutableHeaders(raw=start["headers"])
+                headers.add_vary_header("Accept-Encoding")
+                if encoding is None or (not more_body and len(body) < self.minimum_size):
+                    passthrough = True
+                    await send(start)
+                    await send({"type": "http.response.body", "body": body, "more_body": more_body})
+                    return
+                encoder = self._encoder(encoding)
+                headers["Content-Encoding"] = encoding
+                body = await self._compress(encoder, body, not more_body)
+                if more_body:
+                    del headers["Content-Length"]
+                else:
+                    headers["Content-Length"] = str(len(body))
+                await send(start)
+                start = None
+            else:
+                body = await self._compress(encoder, body, not more_body)
+            await send({"type": "http.response.body", "body": body, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
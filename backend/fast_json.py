@@ -0,0 +1,59 @@
+"""
+Yüksek hacimli uç noktalar için JSON yanıtı.
+
+FastAPI bir endpoint'in dönüş değerini önce response_model ile doğrular,
+sonra jsonable_encoder ile her değeri gezip stdlib json ile yazar. Endpoint
+doğrudan bir Response döndürdüğünde bu adımlar atlanır; `FastJSONResponse`
+içeriği tek geçişte orjson ile bayta çevirir:
+
+- naive datetime'lar UTC kabul edilir ve "Z" sonekiyle yazılır (`iso_z` ile
+  aynı çıktı), satır başına ISO biçimlendirme Python'da yapılmaz,
+- numpy skalerleri/dizileri doğrudan yazılır.
+
+response_model yine verilir; OpenAPI şeması için kullanılır, yanıt
+doğrulaması yapılmaz. orjson kurulu değilse stdlib json'a düşülür (aynı
+çıktı, daha yavaş).
+"""
+
+from __future__ import annotations
+
+import json
+from datetime import datetime, timezone
+from typing import Any, List
+
+import numpy as np
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # orjson yoksa stdlib json (requirements.txt orjson içerir)
+    orjson = None
+
+if orjson is not None:
+    _OPTIONS = orjson.OPT_NAIVE_UTC | orjson.OPT_UTC_Z | orjson.OPT_SERIALIZE_NUMPY
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.astimezone(timezone.utc).isoformat().replace("+00:00", "Z")
+    if hasattr(value, "tolist"):  # numpy skaler/dizi
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def iso_z_ms(values: List[int]) -> List[str]:
+    """epoch ms listesi -> ISO 8601 + Z; satır başına datetime oluşturmadan, NumPy ile toplu."""
+    return [s + "Z" for s in np.datetime_as_string(np.array(values, dtype="datetime64[ms]"), unit="ms").tolist()]
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, option=_OPTIONS)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":"), default=_default).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,235 @@
+"""
+Okuma/alarm/actuator uç noktaları için koşullu GET (ETag / 304 Not Modified).
+
+Her yazma yolu, DB'ye yazdıktan sonra ilgili veri alanının sürüm sayacını
+artırır (`DataVersions.bump`): readings (ingest, DuckDB senkronu, saklama),
+alerts, actuators (writer thread olayları yazdıktan sonra), rules. Sayaçlar
+SharedState'te tutulur; paylaşılan bir backend ile tüm worker'lar aynı
+sürümü görür.
+
+Politikası olan bir yolda ETag = hash(sürüm dönemi, yol, sorgu dizesi, ilgili
+sürümler [, zaman dilimi]). İstek If-None-Match ile aynı ETag'i getirirse endpoint
+hiç çalışmadan (sorgu, serileştirme yok) gövdesiz 304 döner. Sürüm sorgudan
+önce okunur: sorgu sürerken gelen bir yazma yanıtı eski ETag ile etiketler,
+sonraki istek yine 200 alır.
+
+Sürümler event loop'ta paylaşılan durumdan okunmaz (sqlite/shm'de thread
+kilidi ve busy timeout, Redis'te ağ gidiş-dönüşü loop'u durdururdu). Süreç
+içinde `ttl` saniye önbelleklenir, süresi dolunca threadpool'da (eşzamanlı
+isteklerde tek okuma) yenilenir. Bu worker'daki yazmalar önbelleğe hemen
+işlenir. Başka bir worker'daki yazma ise en fazla `ttl` saniye geç görülür;
+bu sürede o veri için bayat bir 304 dönebilir. Tek worker'da bayat 304 olmaz.
+
+`window` verilen politikalarda (son N dakika, son N gün gibi kayan
+pencereler) sonuç yazma olmadan da değişir. Bu yüzden `window` saniyelik
+zaman dilimi ETag'e katılır ve bayatlık en fazla `window` saniye olur.
+
+Politikası olmayan yollar eskisi gibi `Cache-Control: no-store` alır; yanıt
+kendi Cache-Control başlığını taşıyorsa ezilmez.
+
+`HttpCacheMiddleware` saf ASGI'dir (BaseHTTPMiddleware değil): yanıt gövdesi
+parçalanmadan dış katmanlara (sıkıştırma) tek mesaj olarak ulaşır.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import secrets
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, Mapping, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from shared_state import SharedState
+
+log = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class CachePolicy:
+    domains: Tuple[str, ...]   # ETag'e giren sürüm sayaçları
+    window: float = 0.0        # >0: kayan zaman penceresi, ETag en geç bu aralıkla yenilenir
+    max_age: int = 0           # 0: istemci her seferinde doğrular (no-cache)
+
+    @property
+    def cache_control(self) -> str:
+        return f"private, max-age={self.max_age}" if self.max_age else "private, no-cache"
+
+
+class DataVersions:
+    """
+    Veri alanı başına sürüm sayacı (SharedState `incr`/`counter` üzerinde).
+
+    `epoch`, sayaçlarla aynı depoda tutulan rastgele bir değerdir ve ETag'e
+    katılır. Her yenilemede yeniden okunur (yoksa yeniden yazılır): sayaçlar
+    sıfırlanırsa (local backend'de her açılışta; sqlite/shm dosyası silinince,
+    Redis keyspace'i çalışırken flush edilince) dönem de değişir. Böylece sayaç
+    eski değerine geri döndüğünde istemcinin elindeki ETag farklı veriyle
+    eşleşmez.
+
+    `get` doğrudan okur (thread'lerden). `current` event loop içindir: önbellekten
+    döner, `ttl` dolmuşsa önce threadpool'da `refresh` eder.
+    """
+
+    def __init__(
+        self,
+        shared: SharedState,
+        prefix: str = "version",
+        *,
+        ttl: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.shared = shared
+        self.prefix = prefix
+        self.ttl = ttl
+        self.clock = clock
+        self.epoch = self._load_epoch()
+        self._cached: Dict[str, int] = {}
+        self._loaded_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._refreshing: Optional[asyncio.Future] = None
+
+    def _load_epoch(self) -> str:
+        key = f"{self.prefix}:epoch"
+        # Worker'lar aynı anda açılabilir: yalnızca ilk yazan kazanır, hepsi aynı dönemi okur
+        self.shared.add(key, {"epoch": secrets.token_hex(8)})
+        return self.shared.get(key)["epoch"]
+
+    def bump(self, domain: str) -> Optional[int]:
+        """Yeni sürümü döner; artırılamadıysa None"""
+        # Sürüm artırılamazsa yazma başarısız sayılmaz; ETag bir sonraki artışa kadar eski kalır
+        try:
+            value = self.shared.incr(f"{self.prefix}:{domain}")
+        except Exception as e:
+            log.warning("Veri sürümü artırılamadı (%s): %s", domain, e)
+            return None
+        with self._lock:
+            self._cached[domain] = max(self._cached.get(domain, 0), value)
+        return value
+
+    def get(self, domain: str) -> int:
+        return self.shared.counter(f"{self.prefix}:{domain}")
+
+    def refresh(self, domains: Iterable[str]) -> None:
+        """Dönemi ve sayaçları paylaşılan durumdan okur (bloklar; loop dışında çağrılır)."""
+        epoch = self._load_epoch()
+        fresh = {d: self.get(d) for d in domains}
+        with self._lock:
+            if epoch == self.epoch:
+                # Okuma sürerken bu worker'da yapılan artışlar geri alınmasın
+                fresh = {d: max(v, self._cached.get(d, 0)) for d, v in fresh.items()}
+            self.epoch = epoch
+            self._cached = fresh
+            self._loaded_at = self.clock()
+
+    async def current(self, domains: Iterable[str]) -> Tuple[str, Dict[str, int]]:
+        """(dönem, sürümler); önbellek en fazla `ttl` saniye eskidir."""
+        if self._loaded_at is None or self.clock() - self._loaded_at >= self.ttl:
+            if self._refreshing is None:
+                self._refreshing = asyncio.ensure_future(run_in_threadpool(self.refresh, tuple(domains)))
+                self._refreshing.add_done_callback(self._refresh_done)
+            # shield: bekleyen bir isteğin iptali diğerlerinin beklediği okumayı iptal etmez
+            await asyncio.shield(self._refreshing)
+        return self.epoch, self._cached
+
+    def _refresh_done(self, future: asyncio.Future) -> None:
+        self._refreshing = None
+        if not future.cancelled():
+            future.exception()  # bekleyen kalmadıysa "never retrieved" uyarısı çıkmasın
+
+
+def _matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match zayıf karşılaştırması (RFC 9110 13.1.2): W/ öneki yok sayılır."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+
+class HttpCache:
+    def __init__(
+        self,
+        versions: DataVersions,
+        policies: Mapping[str, CachePolicy],
+        *,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.versions = versions
+        self.policies = dict(policies)
+        self.domains = tuple(sorted({d for p in self.policies.values() for d in p.domains}))
+        self.clock = clock
+        self._stats: Dict[str, int] = {"not_modified": 0, "full": 0, "version_errors": 0}
+
+    def etag(self, policy: CachePolicy, path: str, query: str, epoch: str, versions: Mapping[str, int]) -> str:
+        parts = [epoch, path, query, *(str(versions.get(d, 0)) for d in policy.domains)]
+        if policy.window > 0:
+            parts.append(str(int(self.clock() // policy.window)))
+        digest = hashlib.blake2b("\0".join(parts).encode("utf-8"), digest_size=12).hexdigest()
+        # Zayıf ETag: aynı içerik farklı kodlamayla (sıkıştırma) gönderilebilir
+        return f'W/"{digest}"'
+
+    async def handle(self, scope: Scope, receive: Receive, send: Send, app: ASGIApp) -> None:
+        path = scope["path"]
+        policy = self.policies.get(path) if scope["method"] in ("GET", "HEAD") else None
+        headers: Dict[str, str] = {}
+        if policy is not None:
+            try:
+                epoch, versions = await self.versions.current(self.domains)
+            except Exception as e:
+                # Sürümler okunamıyorsa (ör. Redis erişilemez) koşullu GET yapılmaz, yanıt normal döner
+                self._stats["version_errors"] += 1
+                log.warning("Veri sürümleri okunamadı, ETag'siz yanıt: %s", e)
+                policy = None
+        if policy is not None:
+            tag = self.etag(policy, path, scope.get("query_string", b"").decode("latin-1"), epoch, versions)
+            headers = {"ETag": tag, "Cache-Control": policy.cache_control}
+            if _matches(Headers(scope=scope).get("if-none-match"), tag):
+                self._stats["not_modified"] += 1
+                await Response(status_code=304, headers=headers)(scope, receive, send)
+                return
+
+        async def send_with_headers(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                response_headers = MutableHeaders(scope=message)
+                if policy is not None and message["status"] == 200:
+                    self._stats["full"] += 1
+                    response_headers.update(headers)
+                elif "cache-control" not in response_headers:
+                    response_headers["Cache-Control"] = "no-store"
+            await send(message)
+
+        await app(scope, receive, send_with_headers)
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            **self._stats,
+            "epoch": self.versions.epoch,
+            "versions": {d: self.versions.get(d) for d in self.domains},
+        }
+
+
+class HttpCacheMiddleware:
+    """`cache` ilk istekte çağrılır: HttpCache paylaşılan durumla middleware kaydından sonra kurulabilir"""
+
+    def __init__(self, app: ASGIApp, *, cache: Callable[[], HttpCache]) -> None:
+        self.app = app
+        self._resolve = cache
+        self._cache: Optional[HttpCache] = None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        if self._cache is None:
+            self._cache = self._resolve()
+        await self._cache.handle(scope, receive, send, self.app)
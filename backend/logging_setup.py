@@ -0,0 +1,241 @@
+"""
+Yapılandırılmış, bloklamayan loglama.
+
+- `setup_logging()`: kök logger'a bir `QueueHandler` bağlar. Biçimlendirme
+  (traceback dahil) ve stdout'a yazma `QueueListener` thread'inde yapılır;
+  istek yolu kaydı yalnızca kuyruğa bırakır. Kuyruk doluysa kayıt düşürülür
+  ve sayılır, istek stdout'u beklemez.
+- `ErrorSampler`: WARNING ve üstü kayıtlar hata imzası (logger, satır, mesaj
+  şablonu, istisna türü) başına `window` saniyede en çok `burst` adet geçer.
+  Fazlası kuyruğa hiç girmez. Bastırılan sayı, pencere yenilenince geçen ilk
+  kayda `suppressed` alanı olarak eklenir.
+- `JsonFormatter`: satır başına bir JSON nesnesi (ts, level, logger, msg,
+  request_id, `extra=` alanları, exc). `LOG_FORMAT=text` düz metin verir.
+- `RequestIdMiddleware`: gelen `X-Request-ID`'yi (yoksa ya da geçersizse yeni
+  bir id) contextvar'a koyar ve yanıta ekler. Contextvar threadpool'a da
+  taşınır; ingest, model çıkarımı ve auth kayıtları aynı id ile eşlenir.
+"""
+
+from __future__ import annotations
+
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import re
+import sys
+import threading
+import time
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+REQUEST_ID: ContextVar[str] = ContextVar("request_id", default="-")
+_VALID_REQUEST_ID = re.compile(r"[A-Za-z0-9._:-]{1,64}")
+
+# LogRecord'un kendi alanları; kalanlar `extra=` ile gelmiştir ve JSON'a eklenir
+_RECORD_FIELDS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "request_id"}
+
+
+def new_request_id() -> str:
+    return os.urandom(8).hex()
+
+
+def current_request_id() -> str:
+    return REQUEST_ID.get()
+
+
+class RequestIdFilter(logging.Filter):
+    """Kaydı üreten thread'in/task'ın istek id'sini kayda yazar"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not hasattr(record, "request_id"):
+            record.request_id = REQUEST_ID.get()
+        return True
+
+
+class ErrorSampler(logging.Filter):
+    """İmza başına pencere içi sınır; burst=0 örneklemeyi kapatır"""
+
+    def __init__(self, burst: int = 5, window: float = 60.0, min_level: int = logging.WARNING, clock=time.monotonic):
+        super().__init__()
+        self.burst = burst
+        self.window = window
+        self.min_level = min_level
+        self._clock = clock
+        self._state: Dict[Tuple, List] = {}  # imza -> [pencere başı, geçen, bastırılan]
+        self._lock = threading.Lock()
+        self.suppressed_total = 0
+
+    @staticmethod
+    def signature(record: logging.LogRecord) -> Tuple:
+        exc_type = record.exc_info[0].__name__ if record.exc_info and record.exc_info[0] else ""
+        return (record.name, record.lineno, str(record.msg), exc_type)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < self.min_level or self.burst <= 0:
+            return True
+        key = self.signature(record)
+        now = self._clock()
+        with self._lock:
+            state = self._state.get(key)
+            if state is None or now - state[0] >= self.window:
+                if state is not None and state[2]:
+                    record.suppressed = state[2]
+                self._state[key] = [now, 1, 0]
+                return True
+            if state[1] < self.burst:
+                state[1] += 1
+                return True
+            state[2] += 1
+            self.suppressed_total += 1
+            return False
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """
+    Aynı süreçteki dinleyiciye verir: mesaj argümanları burada metne çevrilir
+    (sonradan değişebilirler), traceback ise dinleyici thread'inde biçimlenir.
+    """
+
+    def __init__(self, q: queue.Queue) -> None:
+        super().__init__(q)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def _iso_z(created: float) -> str:
+    return datetime.fromtimestamp(created, tz=timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z")
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": _iso_z(record.created),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        request_id = getattr(record, "request_id", "-")
+        if request_id != "-":
+            entry["request_id"] = request_id
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_FIELDS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        if record.stack_info:
+            entry["stack"] = record.stack_info
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self) -> None:
+        super().__init__("%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s")
+
+    def formatMessage(self, record: logging.LogRecord) -> str:
+        text = super().formatMessage(record)
+        suppressed = getattr(record, "suppressed", 0)
+        return f"{text} (+{suppressed} benzer kayıt bastırıldı)" if suppressed else text
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_handler: Optional[_QueueHandler] = None
+_sampler: Optional[ErrorSampler] = None
+
+
+def setup_logging(
+    level: Optional[str] = None,
+    fmt: Optional[str] = None,
+    burst: Optional[int] = None,
+    window: Optional[float] = None,
+    queue_size: int = 10_000,
+) -> logging.handlers.QueueListener:
+    """
+    Kök logger'ı kuyruk + dinleyici thread'ine bağlar; ikinci çağrı mevcut
+    dinleyiciyi döndürür. Verilmeyen ayarlar LOG_LEVEL, LOG_FORMAT (json|text),
+    LOG_SAMPLE_BURST ve LOG_SAMPLE_WINDOW_SECONDS'tan okunur.
+    """
+    global _listener, _handler, _sampler
+    if _listener is not None:
+        return _listener
+    level = (level or os.getenv("LOG_LEVEL", "INFO")).upper()
+    fmt = (fmt or os.getenv("LOG_FORMAT", "json")).lower()
+    burst = int(os.getenv("LOG_SAMPLE_BURST", "5")) if burst is None else burst
+    window = float(os.getenv("LOG_SAMPLE_WINDOW_SECONDS", "60")) if window is None else window
+
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(TextFormatter() if fmt == "text" else JsonFormatter())
+    _handler = _QueueHandler(queue.Queue(queue_size))
+    _sampler = ErrorSampler(burst, window)
+    _handler.addFilter(_sampler)  # önce örnekleme: düşen kayıt için başka iş yapılmaz
+    _handler.addFilter(RequestIdFilter())
+
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(_handler)
+    _listener = logging.handlers.QueueListener(_handler.queue, stream, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)  # kuyrukta kalanlar çıkışta yazılır
+    return _listener
+
+
+def logging_stats() -> dict:
+    """Kuyruk derinliği, kuyruk dolu olduğu için düşen ve örneklemeyle bastırılan kayıtlar"""
+    if _handler is None:
+        return {"enabled": False}
+    return {
+        "enabled": True,
+        "queue_depth": _handler.queue.qsize(),
+        "dropped": _handler.dropped,
+        "suppressed": _sampler.suppressed_total if _sampler is not None else 0,
+    }
+
+
+class RequestIdMiddleware:
+    def __init__(self, app: ASGIApp, *, header: str = "X-Request-ID") -> None:
+        self.app = app
+        self.header = header.lower().encode("latin-1")
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for key, value in scope["headers"]:
+            if key == self.header:
+                candidate = value.decode("latin-1")
+                if _VALID_REQUEST_ID.fullmatch(candidate):
+                    request_id = candidate
+                break
+        request_id = request_id or new_request_id()
+        # Sunucu her isteği kendi task'ında (kendi context kopyasında) çalıştırır;
+        # reset edilmez ki dıştaki ServerErrorMiddleware'in handler'ı da id'yi görsün
+        REQUEST_ID.set(request_id)
+        raw = request_id.encode("latin-1")
+
+        async def send_with_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", ()), (self.header, raw)]
+            await send(message)
+
+        await self.app(scope, receive, send_with_id)
@@ -1,19 +1,24 @@
 # backend/main.py
-from fastapi import FastAPI, UploadFile, File, HTTPException, Depends, status
+from fastapi import FastAPI, UploadFile, File, HTTPException, Depends, Request, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel, field_validator, EmailStr
-from typing import Optional, Deque, Dict, List, Literal, Any
+from typing import Optional, Dict, List, Literal, Any
 from pathlib import Path
-from collections import deque
 from datetime import datetime, timezone
 from datetime import timedelta
 from sqlalchemy import text as sqltext
-from sqlalchemy import func, event
+from sqlalchemy import func, event, update
+import asyncio
+import hashlib
 import io
+import logging
 import os
 import secrets
+import time
+import uuid
 from PIL import Image
 import numpy as np
 from jose import JWTError, jwt
@@ -21,7 +26,6 @@ from passlib.context import CryptContext
 import bcrypt
 from dotenv import load_dotenv
 from pathlib import Path
-import httpx
 
 # .env dosyasını yükle (backend dizininden)
 env_path = Path(__file__).parent / ".env"
@@ -29,9 +33,30 @@ load_dotenv(dotenv_path=env_path)
 
 from plant_classifier import PlantClassifier
 from plantvillage_classifier import PlantVillageClassifier
+from auth_cache import PrincipalCache
+from password_pool import PasswordPool, PoolRejected
+from revocation import RevocationList
+from weather import WeatherService
+from actuator_store import ActuatorStore
+from shared_state import create_shared_state
+from reading_ring import ReadingRing
+from reading_store import create_reading_store
+from fast_json import FastJSONResponse, iso_z_ms
+from http_cache import CachePolicy, DataVersions, HttpCache, HttpCacheMiddleware
+from compression import CompressionMiddleware
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, MetricsMiddleware, Registry
+from logging_setup import RequestIdMiddleware, current_request_id, logging_stats, setup_logging
+from rules import RuleEngine
+from anomaly import AnomalyDetector
 
 
 from sqlmodel import SQLModel, Field, create_engine, Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.ext.asyncio import create_async_engine
+
+# Loglar kuyruk üzerinden ayrı thread'de JSON olarak yazılır (LOG_LEVEL, LOG_FORMAT)
+setup_logging()
+log = logging.getLogger(__name__)
 
 app = FastAPI(title="AA Backend", version="0.5.0")
 
@@ -42,9 +67,9 @@ from pydantic import ValidationError
 
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request, exc):
-    import traceback
-    error_msg = f"Validation Error: {str(exc)}\n{traceback.format_exc()}"
-    print(error_msg)
+    # Traceback yok (geçersiz gövde bir hata değil); "input" atılır, parola içerebilir
+    errors = [{"loc": e.get("loc"), "type": e.get("type"), "msg": e.get("msg")} for e in exc.errors()]
+    log.warning("Validation error %s %s", request.method, request.url.path, extra={"errors": errors})
     return JSONResponse(
         status_code=200,  # simulate.py için 200 dön
         content={"ok": False, "error": "Validation error", "details": str(exc)}
@@ -52,20 +77,17 @@ async def validation_exception_handler(request, exc):
 
 @app.exception_handler(Exception)
 async def global_exception_handler(request, exc):
-    import traceback
-    error_msg = f"Error: {type(exc).__name__}: {str(exc)}\n{traceback.format_exc()}"
-    print(error_msg)
+    log.error("Unhandled error %s %s", request.method, request.url.path, exc_info=exc)
     return JSONResponse(
         status_code=200,  # simulate.py için 200 dön
-        content={"ok": False, "error": str(exc), "type": type(exc).__name__}
+        content={"ok": False, "error": str(exc), "type": type(exc).__name__},
+        # RequestIdMiddleware'in içinde değiliz (ServerErrorMiddleware dışta)
+        headers={"X-Request-ID": current_request_id()},
     )
 
-# ----------------- NO-CACHE (UI her zaman taze veri görsün) -----------------
-@app.middleware("http")
-async def add_no_cache_headers(request, call_next):
-    resp: Response = await call_next(request)
-    resp.headers["Cache-Control"] = "no-store"
-    return resp
+# ----------------- HTTP ÖNBELLEK (ETag / 304; politikasız yollar no-store) ------
+# En içte: 304'ler de CORS başlıklarını alır; saf ASGI, gövde parçalanmadan sıkıştırmaya ulaşır
+app.add_middleware(HttpCacheMiddleware, cache=lambda: HTTP_CACHE)
 
 # ----------------- CORS ------------------------------------------------------
 app.add_middleware(
@@ -74,9 +96,39 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Readings-Source", "X-Request-ID"],
+)
+
+# ----------------- SIKIŞTIRMA (brotli/gzip, Accept-Encoding ile) --------------
+# COMPRESSION_MIN_BYTES altındaki yanıtlar sıkıştırılmaz (0 = hepsi)
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=int(os.getenv("COMPRESSION_MIN_BYTES", "1024")),
+    gzip_level=int(os.getenv("COMPRESSION_GZIP_LEVEL", "6")),
+    brotli_quality=int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4")),
+)
+
+# ----------------- METRİKLER (Prometheus metin biçimi, GET /metrics) ----------
+# En dışta: süre sıkıştırma dahil, yanıt boyutu sıkıştırılmış (gönderilen) bayt
+METRICS = Registry()
+app.add_middleware(MetricsMiddleware, registry=METRICS)
+INGEST_DB_SECONDS = METRICS.histogram(
+    "ingest_db_write_seconds", "Reading insert + commit duration in /ingest"
+).labels()
+ANALYZE_STAGE_SECONDS = METRICS.histogram(
+    "analyze_stage_seconds", "analyze-plant stage durations (decode, preprocess, forward)", ("model", "stage")
 )
+WEATHER_UPSTREAM_SECONDS = METRICS.histogram(
+    "weather_upstream_seconds", "Open-Meteo upstream call duration", ("kind", "outcome")
+)
+
+# ----------------- İSTEK ID'Sİ (X-Request-ID; loglarda request_id) -------------
+# En dışta: iç katmanların ve threadpool'daki endpoint'lerin logları aynı id'yi taşır
+app.add_middleware(RequestIdMiddleware)
 
 # ----------------- ZAMAN YARDIMCILARI (UTC + Z sonekli) ---------------------
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
 def utcnow() -> datetime:
     return datetime.now(timezone.utc)
 
@@ -88,6 +140,10 @@ def to_utc(dt: Optional[datetime]) -> datetime:
         return dt.replace(tzinfo=timezone.utc)
     return dt.astimezone(timezone.utc)
 
+def to_epoch_ns(dt: datetime) -> int:
+    """Aware/naive (UTC varsayılır) datetime -> epoch nanosaniye."""
+    return (to_utc(dt) - EPOCH) // timedelta(microseconds=1) * 1000
+
 def iso_z(dt: datetime) -> str:
     """ISO 8601 + Z (örn. 2025-10-19T19:45:12.345Z)."""
     return dt.astimezone(timezone.utc).isoformat().replace("+00:00", "Z")
@@ -115,12 +171,28 @@ def set_sqlite_pragma(dbapi_conn, connection_record):
     cursor.execute("PRAGMA foreign_keys=ON")
     cursor.close()
 
+# Okuma uç noktaları için aiosqlite: sorgu beklerken event loop serbest kalır,
+# threadpool'un (varsayılan 40 thread) kuyruğuna girilmez. Yazma yolu sync kalır.
+async_engine = create_async_engine(
+    "sqlite+aiosqlite:///./app.db",
+    echo=False,
+    connect_args={"timeout": 20.0},
+    pool_size=int(os.getenv("ASYNC_DB_POOL_SIZE", "20")),
+    max_overflow=int(os.getenv("ASYNC_DB_MAX_OVERFLOW", "20")),
+)
+event.listen(async_engine.sync_engine, "connect", set_sqlite_pragma)
+
+async def get_async_session():
+    async with AsyncSession(async_engine, expire_on_commit=False) as s:
+        yield s
+
 class ReadingDB(SQLModel, table=True):
     id: int | None = Field(default=None, primary_key=True)
     sensor_id: str
     type: str
     value: float
     ts: datetime  
+    ts_ms: int | None = Field(default=None, index=True)  # epoch ms; sorgular ve indeks bunu kullanır
 
 class ActuatorEventDB(SQLModel, table=True):
     id: int | None = Field(default=None, primary_key=True)
@@ -132,6 +204,28 @@ class ActuatorEventDB(SQLModel, table=True):
     ts: datetime
 
 
+class ActuatorSnapshotDB(SQLModel, table=True):
+    id: int | None = Field(default=None, primary_key=True)
+    last_event_id: int     # snapshot bu id'ye kadarki olayları içerir
+    payload: str           # JSON: {device: {mode, state, last_change}}
+    ts: datetime
+
+
+class AutomationRuleDB(SQLModel, table=True):
+    id: int | None = Field(default=None, primary_key=True)
+    name: str
+    plant: Optional[str] = None          # kuralın ait olduğu bitki (bilgi amaçlı)
+    sensor_type: str = Field(index=True) # "temp" | "humidity" | "co2"
+    sensor_id: Optional[str] = None      # boşsa o tipteki tüm sensörler
+    device: str                          # "fan" | "heater" | "humidifier"
+    direction: str                       # "above" | "below"
+    threshold: float
+    hysteresis: float = 0.0
+    alert_level: Optional[str] = "warning"
+    enabled: bool = True
+    created_at: datetime
+
+
 class AlertDB(SQLModel, table=True):
     id: int | None = Field(default=None, primary_key=True)
     level: str
@@ -148,9 +242,68 @@ class UserDB(SQLModel, table=True):
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     is_active: bool = True
 
+class RefreshTokenDB(SQLModel, table=True):
+    id: int | None = Field(default=None, primary_key=True)
+    user_id: int = Field(index=True)
+    token_hash: str = Field(unique=True, index=True)   # sha256(refresh token), token'ın kendisi saklanmaz
+    family_id: str = Field(index=True)                 # aynı girişten türeyen rotasyon zinciri
+    created_at: datetime
+    expires_at: datetime
+    revoked_at: Optional[datetime] = None
+    replaced_by_id: Optional[int] = None
+
+class TokenRevocationDB(SQLModel, table=True):
+    # Senkron imleci id; AUTOINCREMENT silinen id'lerin yeniden verilmesini engeller
+    __table_args__ = {"sqlite_autoincrement": True}
+    id: int | None = Field(default=None, primary_key=True)
+    jti: Optional[str] = Field(default=None, index=True)   # tek token iptali
+    user_id: Optional[int] = Field(default=None, index=True)  # jti yoksa: kullanıcının revoked_at öncesi tüm token'ları
+    revoked_at: datetime
+    expires_at: datetime   # bu andan sonra ilgili access token'lar zaten geçersiz
+
 @app.on_event("startup")
 def on_startup():
     SQLModel.metadata.create_all(engine)
+    READINGS_STORE.start()
+    ACTUATORS.start()
+    _sync_rules(force=True)
+    _purge_expired_tokens()
+    _sync_revocations()
+
+@app.on_event("startup")
+async def start_revocation_sync():
+    global _revocation_task
+    _revocation_task = asyncio.create_task(_revocation_sync_loop())
+
+@app.on_event("startup")
+async def start_reading_tasks():
+    global _retention_task
+    await _seed_recent_readings()
+    if READING_RETENTION_DAYS > 0 or READING_COMPACT_AFTER_DAYS > 0:
+        _retention_task = asyncio.create_task(_reading_maintenance_loop())
+
+@app.on_event("startup")
+async def start_weather_client():
+    await WEATHER.start()
+
+@app.on_event("shutdown")
+async def stop_weather_client():
+    await WEATHER.close()
+
+@app.on_event("shutdown")
+async def dispose_async_engine():
+    await async_engine.dispose()
+
+@app.on_event("shutdown")
+def on_shutdown():
+    if _revocation_task is not None:
+        _revocation_task.cancel()
+    if _retention_task is not None:
+        _retention_task.cancel()
+    PASSWORD_POOL.shutdown()
+    ACTUATORS.close()
+    READINGS_STORE.close()
+    SHARED.close()
 
 # ----------------- AUTHENTICATION -------------------------------------------
 
@@ -158,15 +311,39 @@ SECRET_KEY = os.getenv("SECRET_KEY")
 if not SECRET_KEY:
     
     SECRET_KEY = secrets.token_urlsafe(32)
-    print("⚠️  WARNING: SECRET_KEY environment variable bulunamadı!")
-    print("⚠️  Development modunda otomatik key oluşturuldu (her restart'ta değişir)")
-    print("⚠️  Production için: export SECRET_KEY='your-secret-key-here'")
+    log.warning(
+        "SECRET_KEY environment variable bulunamadı! Development modunda otomatik key oluşturuldu "
+        "(her restart'ta değişir). Production için: export SECRET_KEY='your-secret-key-here'"
+    )
     
 ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7  
+# Access token kısa ömürlü; oturum rotasyonlu refresh token ile uzatılır
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "15"))
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "30"))
+# Yeni rotasyona uğramış bir refresh token bu süre içinde tekrar gelirse hırsızlık değil
+# eşzamanlı refresh sayılır: reddedilir ama aile iptal edilmez
+REFRESH_REUSE_GRACE_SECONDS = float(os.getenv("REFRESH_REUSE_GRACE_SECONDS", "10"))
+# Başka süreçlerden (manage_users.py) gelen iptallerin ve diğer worker'lardaki
+# kural değişikliklerinin en geç görülme süresi
+REVOCATION_SYNC_SECONDS = float(os.getenv("REVOCATION_SYNC_SECONDS", "5"))
 
 security = HTTPBearer()
 
+# Her istekte DB'ye gitmemek için kullanıcıları kısa süre bellekte tut
+AUTH_CACHE_TTL_SECONDS = float(os.getenv("AUTH_CACHE_TTL_SECONDS", "60"))
+PRINCIPALS = PrincipalCache(ttl_seconds=AUTH_CACHE_TTL_SECONDS)
+
+# İptal edilen access token'lar / kullanıcılar; TokenRevocationDB'den senkronlanır
+REVOCATIONS = RevocationList(on_user_revoked=PRINCIPALS.invalidate)
+_revocation_task: Optional[asyncio.Task] = None
+
+# bcrypt işleri ortak threadpool yerine kendi küçük havuzunda çalışır
+PASSWORD_POOL = PasswordPool(
+    max_workers=int(os.getenv("AUTH_HASH_WORKERS", "2")),
+    max_pending=int(os.getenv("AUTH_HASH_MAX_PENDING", "16")),
+    per_key_limit=int(os.getenv("AUTH_HASH_PER_KEY", "2")),
+)
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Şifreyi doğrula - bcrypt direkt kullan"""
     try:
@@ -204,13 +381,173 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
         expire = utcnow() + expires_delta
     else:
         expire = utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
+    # iat saniye kesirli: aynı saniyede yapılan iptal ile yeni token ayrılabilsin
+    to_encode.update({"exp": expire, "iat": time.time(), "jti": uuid.uuid4().hex, "typ": "access"})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(
+def _hash_refresh_token(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+def _new_refresh_token(s: Session, user_id: int, family_id: Optional[str] = None) -> tuple:
+    """Yeni refresh token satırı ekler (commit çağırana ait); (ham token, satır) döner"""
+    raw = secrets.token_urlsafe(32)
+    now = utcnow()
+    row = RefreshTokenDB(
+        user_id=user_id,
+        token_hash=_hash_refresh_token(raw),
+        family_id=family_id or uuid.uuid4().hex,
+        created_at=now,
+        expires_at=now + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS),
+    )
+    s.add(row)
+    return raw, row
+
+def _issue_tokens(user: UserDB) -> dict:
+    """Giriş/kayıt yanıtı: access + refresh token çifti"""
+    with Session(engine) as s:
+        refresh_token, _ = _new_refresh_token(s, user.id)
+        s.commit()
+    return {
+        "access_token": create_access_token(data={"sub": str(user.id)}),
+        "refresh_token": refresh_token,
+        "token_type": "bearer",
+        "expires_in": ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+        "user": _user_payload(user),
+    }
+
+def _revoke_refresh_tokens(s: Session, *conditions) -> None:
+    s.execute(
+        update(RefreshTokenDB)
+        .where(RefreshTokenDB.revoked_at.is_(None), *conditions)
+        .values(revoked_at=utcnow())
+    )
+
+def _revoke_user_tokens(user_id: int) -> None:
+    """Kullanıcının tüm oturumlarını kapatır: refresh token'lar + şu ana kadar verilmiş access token'lar"""
+    now = utcnow()
+    with Session(engine) as s:
+        _revoke_refresh_tokens(s, RefreshTokenDB.user_id == user_id)
+        row = TokenRevocationDB(
+            user_id=user_id,
+            revoked_at=now,
+            expires_at=now + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES),
+        )
+        s.add(row)
+        s.commit()
+        s.refresh(row)
+    REVOCATIONS.revoke_user(user_id, now.timestamp(), row.expires_at.timestamp())
+
+def _revoke_access_token(claims: dict) -> None:
+    jti = claims.get("jti")
+    if not jti:
+        return
+    expires_at = datetime.fromtimestamp(claims["exp"], tz=timezone.utc)
+    with Session(engine) as s:
+        s.add(TokenRevocationDB(jti=jti, revoked_at=utcnow(), expires_at=expires_at))
+        s.commit()
+    REVOCATIONS.revoke_token(jti, expires_at.timestamp())
+
+def _rotate_refresh_token(raw: str) -> Optional[tuple]:
+    """
+    Refresh token'ı tek kullanımlık tüketir ve aynı aileden yenisini üretir.
+    Daha önce kullanılmış bir token tekrar gelirse token çalınmış sayılır:
+    tüm aile ve kullanıcının access token'ları iptal edilir. İstisna: son
+    REFRESH_REUSE_GRACE_SECONDS içinde yenisiyle değiştirilmiş token (aynı
+    istemciden eşzamanlı iki refresh) yalnızca reddedilir. Geçersizse None.
+    """
+    now = utcnow()
+    with Session(engine) as s:
+        row = s.exec(
+            select(RefreshTokenDB).where(RefreshTokenDB.token_hash == _hash_refresh_token(raw))
+        ).first()
+        if row is None:
+            return None
+        if row.revoked_at is not None:
+            if (
+                row.replaced_by_id is not None
+                and (now - to_utc(row.revoked_at)).total_seconds() <= REFRESH_REUSE_GRACE_SECONDS
+            ):
+                log.info(
+                    "Yeni değiştirilmiş refresh token tekrar kullanıldı (eşzamanlı refresh)",
+                    extra={"user_id": row.user_id},
+                )
+                return None
+            reused_user_id = row.user_id
+            _revoke_refresh_tokens(s, RefreshTokenDB.family_id == row.family_id)
+            s.commit()
+            log.warning("Refresh token yeniden kullanıldı, oturumlar kapatılıyor", extra={"user_id": reused_user_id})
+            _revoke_user_tokens(reused_user_id)
+            return None
+        if to_utc(row.expires_at) < now:
+            return None
+        user = s.get(UserDB, row.user_id)
+        if user is None or not user.is_active:
+            return None
+
+        # Koşullu güncelleme: eşzamanlı iki refresh'ten yalnızca biri kazanır
+        consumed = s.execute(
+            update(RefreshTokenDB)
+            .where(RefreshTokenDB.id == row.id, RefreshTokenDB.revoked_at.is_(None))
+            .values(revoked_at=now)
+        )
+        if consumed.rowcount != 1:
+            s.rollback()
+            return None
+        new_raw, new_row = _new_refresh_token(s, user.id, row.family_id)
+        s.flush()
+        s.execute(
+            update(RefreshTokenDB).where(RefreshTokenDB.id == row.id).values(replaced_by_id=new_row.id)
+        )
+        s.commit()
+        s.refresh(user)
+        return user, new_raw
+
+def _sync_revocations() -> None:
+    """TokenRevocationDB'deki yeni satırları bellekteki listeye uygular"""
+    with Session(engine) as s:
+        rows = s.exec(
+            select(TokenRevocationDB)
+            .where(TokenRevocationDB.id > REVOCATIONS.last_id, TokenRevocationDB.expires_at > utcnow())
+            .order_by(TokenRevocationDB.id)
+        ).all()
+    REVOCATIONS.apply(
+        (r.id, r.jti, r.user_id, to_utc(r.revoked_at).timestamp(), to_utc(r.expires_at).timestamp())
+        for r in rows
+    )
+    REVOCATIONS.prune()
+
+def _purge_expired_tokens() -> None:
+    now = utcnow()
+    with Session(engine) as s:
+        # En büyük id'li satır silinmez: AUTOINCREMENT'siz eski tablolarda SQLite id'leri
+        # max(id)+1'den verir; tablo boşalırsa id'ler 1'e döner ve diğer worker'ların
+        # `id > last_id` imleci yeni iptalleri hiç görmez
+        max_id = select(func.max(TokenRevocationDB.id)).scalar_subquery()
+        s.execute(
+            TokenRevocationDB.__table__.delete().where(
+                TokenRevocationDB.expires_at < now, TokenRevocationDB.id < max_id
+            )
+        )
+        s.execute(RefreshTokenDB.__table__.delete().where(RefreshTokenDB.expires_at < now))
+        s.commit()
+
+async def _revocation_sync_loop():
+    while True:
+        await asyncio.sleep(REVOCATION_SYNC_SECONDS)
+        try:
+            await run_in_threadpool(_sync_revocations)
+        except Exception as e:
+            log.warning("Revocation sync hatası: %s", e)
+        try:
+            await run_in_threadpool(_sync_rules)
+        except Exception as e:
+            log.warning("Kural senkron hatası: %s", e)
+
+async def get_token_claims(
     credentials: HTTPAuthorizationCredentials = Depends(security)
-) -> UserDB:
+) -> dict:
+    """Access token'ı doğrular; imza, süre, tür ve iptal listesi tamamen bellekte kontrol edilir"""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -220,22 +557,40 @@ async def get_current_user(
         token = credentials.credentials
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         user_id_str = payload.get("sub")
-        if user_id_str is None:
+        if user_id_str is None or payload.get("typ") != "access":
             raise credentials_exception
         
         try:
             user_id: int = int(user_id_str)
         except (ValueError, TypeError):
             raise credentials_exception
-    except JWTError:
+    except JWTError as e:
+        log.warning("Access token reddedildi: %s", type(e).__name__)
         raise credentials_exception
-    
-    with Session(engine) as s:
-        user = s.get(UserDB, user_id)
-        if user is None:
-            raise credentials_exception
+
+    if REVOCATIONS.is_revoked(payload.get("jti"), user_id, float(payload.get("iat", 0))):
+        log.warning("İptal edilmiş access token kullanıldı", extra={"user_id": user_id})
+        raise credentials_exception
+    payload["user_id"] = user_id
+    return payload
+
+async def get_current_user(claims: dict = Depends(get_token_claims)) -> UserDB:
+    user_id = claims["user_id"]
+    user = PRINCIPALS.get(user_id)
+    if user is not None:
         return user
 
+    async with AsyncSession(async_engine, expire_on_commit=False) as s:
+        user = await s.get(UserDB, user_id)
+        if user is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Could not validate credentials",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+    PRINCIPALS.put(user_id, user)
+    return user
+
 async def get_current_active_user(
     current_user: UserDB = Depends(get_current_user)
 ) -> UserDB:
@@ -243,9 +598,142 @@ async def get_current_active_user(
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
 
+def _client_ip(request: Request) -> str:
+    return request.client.host if request.client else ""
+
+async def _password_call(fn, *args, keys=()):
+    """bcrypt işini ayrı havuzda çalıştırır; havuz doluysa 503, anahtar limiti aşılırsa 429"""
+    try:
+        return await PASSWORD_POOL.run(fn, *args, keys=keys)
+    except PoolRejected as e:
+        raise HTTPException(
+            status_code=e.status_code,
+            detail=e.reason,
+            headers={"Retry-After": "1"},
+        )
+
+def _user_payload(user: UserDB) -> dict:
+    return {
+        "id": user.id,
+        "email": user.email,
+        "username": user.username,
+        "full_name": user.full_name,
+        "created_at": iso_z(user.created_at),
+    }
+
+def _get_user(user_id: int) -> Optional[UserDB]:
+    with Session(engine) as s:
+        return s.get(UserDB, user_id)
+
+def _find_login_user(username_or_email: str) -> Optional[UserDB]:
+    with Session(engine) as s:
+        return s.exec(
+            select(UserDB).where(
+                (UserDB.username == username_or_email) |
+                (UserDB.email == username_or_email)
+            )
+        ).first()
+
+def _registration_conflict(email: str, username: str) -> Optional[str]:
+    with Session(engine) as s:
+        if s.exec(select(UserDB).where(UserDB.email == email)).first():
+            return "Email already registered"
+        if s.exec(select(UserDB).where(UserDB.username == username)).first():
+            return "Username already taken"
+    return None
+
+def _create_user(user_data: "UserRegister", hashed_password: str) -> UserDB:
+    with Session(engine) as s:
+        new_user = UserDB(
+            email=user_data.email,
+            username=user_data.username,
+            hashed_password=hashed_password,
+            full_name=user_data.full_name,
+            created_at=utcnow(),
+            is_active=True
+        )
+        s.add(new_user)
+        s.commit()
+        s.refresh(new_user)
+        return new_user
+
+def _update_password(user_id: int, hashed_password: str) -> None:
+    with Session(engine) as s:
+        user = s.get(UserDB, user_id)
+        if user is not None:
+            user.hashed_password = hashed_password
+            s.add(user)
+            s.commit()
+
 # ----------------- In-memory (demo) -----------------------------------------
-READINGS: Deque[dict] = deque(maxlen=5000)
-ALERTS:   Deque[dict] = deque(maxlen=1000)
+# Süreçler arası paylaşılan durum (SHARED_STATE_BACKEND: local | sqlite | shm | redis);
+# "alerts" son alarmların sınırlı akışıdır
+SHARED = create_shared_state(
+    os.getenv("SHARED_STATE_BACKEND", "local"),
+    {"alerts": 1000},
+    base_dir=Path(__file__).resolve().parent,
+)
+
+# Veri sürümleri: yazma yolları DB'ye yazdıktan sonra artırır; GET uç noktalarının
+# ETag'leri bunlardan türetilir ve sürüm değişmediyse sorgu çalışmadan 304 dönülür
+VERSIONS = DataVersions(SHARED, ttl=float(os.getenv("HTTP_CACHE_VERSION_TTL_SECONDS", "1")))
+HTTP_CACHE = HttpCache(VERSIONS, {
+    "/api/v1/readings": CachePolicy(("readings",)),
+    "/api/v1/readings/recent": CachePolicy(("readings",), window=5),
+    "/api/v1/latest": CachePolicy(("readings",)),
+    "/api/v1/stats/series": CachePolicy(("readings",), window=60, max_age=30),
+    "/api/v1/alerts": CachePolicy(("alerts",)),
+    "/api/v1/actuator/history": CachePolicy(("actuators",)),
+    "/api/v1/fan/history": CachePolicy(("actuators",)),
+    "/api/v1/rules": CachePolicy(("rules",)),
+})
+
+# Son okumalar: sensör başına NumPy halka tampon (okuma başına 12 bayt).
+# Süreç içidir; paylaşılan backend ile çok worker'da pencere sorguları DB'den yapılır.
+RECENT = ReadingRing(capacity=int(os.getenv("READING_RING_CAPACITY", "2048")))
+
+# Okuma deposu (READING_STORE_BACKEND: sqlite | duckdb); duckdb'de toplamalar
+# arka planda SQLite'tan kopyalanan kolon bazlı bir DuckDB dosyasından yapılır
+READINGS_STORE = create_reading_store(
+    os.getenv("READING_STORE_BACKEND", "sqlite"),
+    engine,
+    async_engine,
+    base_dir=Path(__file__).resolve().parent,
+    on_sync=lambda: VERSIONS.bump("readings"),
+)
+
+
+async def _seed_recent_readings() -> None:
+    """Restart sonrası halka tamponu her sensörün son okumalarıyla doldurur"""
+    for sensor_id, kind in (await READINGS_STORE.sensors()).items():
+        rows = await READINGS_STORE.readings(sensor_id, RECENT.capacity + 1)
+        complete = len(rows) <= RECENT.capacity
+        rows = rows[: RECENT.capacity]
+        RECENT.seed(sensor_id, kind, [(r["ts_ms"] * 1_000_000, r["value"]) for r in reversed(rows)], complete)
+
+# Saklama: READING_RETENTION_DAYS'ten eski okumalar saatte bir silinir (0 = kapalı).
+# Bölümlemeli depoda tamamen süresi dolan bölümler DROP TABLE ile düşürülür.
+# READING_COMPACT_AFTER_DAYS'ten eski bölümler sıkıştırılmış saatlik bloklara taşınır (0 = kapalı).
+READING_RETENTION_DAYS = float(os.getenv("READING_RETENTION_DAYS", "0"))
+READING_COMPACT_AFTER_DAYS = float(os.getenv("READING_COMPACT_AFTER_DAYS", "0"))
+_retention_task: Optional[asyncio.Task] = None
+
+async def _reading_maintenance_loop():
+    while True:
+        if READING_RETENTION_DAYS > 0:
+            try:
+                await run_in_threadpool(READINGS_STORE.drop_before, utcnow() - timedelta(days=READING_RETENTION_DAYS))
+            except Exception:
+                log.exception("Okuma saklama hatası")
+        if READING_COMPACT_AFTER_DAYS > 0:
+            try:
+                await run_in_threadpool(
+                    READINGS_STORE.compact_before, utcnow() - timedelta(days=READING_COMPACT_AFTER_DAYS)
+                )
+            except Exception:
+                log.exception("Okuma sıkıştırma hatası")
+        VERSIONS.bump("readings")
+        await asyncio.sleep(3600)
 
 # Eşikler kaldırıldı - artık bitki bazlı eşikler kullanılıyor (frontend'de)
 LOW_CONFIDENCE_THRESHOLD = 0.5  # Düşük güven skorları için daha hassas uyarı
@@ -325,31 +813,24 @@ CLASS_INFO: Dict[str, Dict[str, Any]] = {
     },
 }
 
-FAN = {"mode": "auto", "state": "off", "last_change": None}
-HEATER = {"mode": "auto", "state": "off", "last_change": None}
-HUMIDIFIER = {"mode": "auto", "state": "off", "last_change": None}
-ACTUATORS = {
-    "fan": FAN,
-    "heater": HEATER,
-    "humidifier": HUMIDIFIER,
-}
+# Actuator durumu: ActuatorEventDB'den yeniden oynatılan bellek içi depo;
+# olaylar arka planda toplu yazılır (startup'ta başlatılır)
+ACTUATORS = ActuatorStore(
+    engine,
+    ActuatorEventDB,
+    ActuatorSnapshotDB,
+    format_ts=lambda dt: iso_z(to_utc(dt)),
+    snapshot_every=int(os.getenv("ACTUATOR_SNAPSHOT_EVERY", "500")),
+    shared=SHARED,
+    on_write=lambda: VERSIONS.bump("actuators"),
+)
 
-# Her actuator için 5 ardışık normal ölçüm sonrası otomatik kapatma
+# Her kural için 5 ardışık normal ölçüm sonrası otomatik kapatma
 NORMAL_OK_TARGET = 5
-NORMAL_OK_STREAK = {
-    "fan": 0,
-    "heater": 0,
-    "humidifier": 0,
-}
 
 
 def _actuator_snapshot(device: str) -> Dict[str, Any]:
-    data = ACTUATORS[device]
-    return {
-        "mode": data["mode"],
-        "state": data["state"],
-        "last_change": data["last_change"],
-    }
+    return ACTUATORS.get(device)
 
 # ----------------- ML MODELS -------------------------------------------------
 BASE_DIR = Path(__file__).resolve().parent
@@ -449,11 +930,32 @@ class UserLogin(BaseModel):
     username: str
     password: str
 
+class PasswordChange(BaseModel):
+    current_password: str
+    new_password: str
+
+    @field_validator("new_password")
+    @classmethod
+    def validate_new_password(cls, v: str):
+        if len(v) < 6:
+            raise ValueError("Şifre en az 6 karakter olmalıdır")
+        if len(v.encode('utf-8')) > 72:
+            raise ValueError("Şifre çok uzun (maksimum 72 karakter)")
+        return v
+
 class Token(BaseModel):
     access_token: str
+    refresh_token: str
     token_type: str = "bearer"
+    expires_in: int
     user: dict
 
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
+class LogoutRequest(BaseModel):
+    refresh_token: Optional[str] = None
+
 class UserResponse(BaseModel):
     id: int
     email: str
@@ -461,10 +963,47 @@ class UserResponse(BaseModel):
     full_name: Optional[str] = None
     created_at: datetime
 
+# Yüksek hacimli uç noktaların yanıt şemaları: yalnızca OpenAPI için; bu uç noktalar
+# FastJSONResponse döndürdüğünden satırlar tekrar doğrulanmaz/encode edilmez.
+class ReadingOut(BaseModel):
+    id: Optional[int] = None
+    sensor_id: str
+    type: str
+    value: float
+    ts: Optional[str] = None     # ts_format=iso
+    ts_ms: Optional[int] = None  # ts_format=ms
+
+class SeriesBucketOut(BaseModel):
+    bucket: str
+    count: int
+    min: float
+    max: float
+    avg: float
+
+class ActuatorEventOut(BaseModel):
+    id: int
+    device: str
+    action: str
+    reason: str
+    mode: str
+    state: str
+    ts: str
+
+class AlertOut(BaseModel):
+    id: int
+    level: str
+    source: str
+    message: str
+    ts: str
+
+# SQLite tarafında ISO + Z (ms); satırlar datetime nesnesine çevrilmeden tuple olarak gelir
+def _iso_ms_column(column):
+    return func.strftime("%Y-%m-%dT%H:%M:%fZ", column)
+
 # ----------------- Endpoints -------------------------------------------------
 
-@app.get("/api/v1/stats/series")
-def stats_series(
+@app.get("/api/v1/stats/series", response_model=List[SeriesBucketOut])
+async def stats_series(
     sensor: Literal["temp","humidity","co2"] = "temp",
     bucket: Literal["daily","hourly"] = "daily",
     days: int = 7,
@@ -476,52 +1015,18 @@ def stats_series(
     Dönen: [{bucket: "...", count, min, max, avg}]
     """
     now_utc = utcnow()
+    if bucket == "daily":
+        cutoff = now_utc - timedelta(days=max(days, 1))
+    else:  # hourly
+        cutoff = now_utc - timedelta(hours=max(hours, 1))
+    return FastJSONResponse(await READINGS_STORE.series(sensor, bucket, cutoff))
 
-    with Session(engine) as s:
-        if bucket == "daily":
-            cutoff = now_utc - timedelta(days=max(days, 1))
-            # SQLite: DATE(ts) ile grup
-            d_label = func.date(ReadingDB.ts).label("d")
-            q = (
-                s.query(
-                    d_label,
-                    func.count(ReadingDB.id).label("c"),
-                    func.min(ReadingDB.value).label("mn"),
-                    func.max(ReadingDB.value).label("mx"),
-                    func.avg(ReadingDB.value).label("av"),
-                )
-                .filter(ReadingDB.type == sensor, ReadingDB.ts >= cutoff)
-                .group_by(d_label)
-                .order_by(d_label.asc())
-            )
-            rows = q.all()
-            return [
-                {"bucket": d, "count": c, "min": mn, "max": mx, "avg": av}
-                for d, c, mn, mx, av in rows
-            ]
-
-        else:  # hourly
-            cutoff = now_utc - timedelta(hours=max(hours, 1))
-            # SQLite: strftime('%Y-%m-%d %H:00:00', ts) ile saat başına grup
-            h_expr = func.strftime("%Y-%m-%d %H:00:00", ReadingDB.ts).label("h")
-            q = (
-                s.query(
-                    h_expr,
-                    func.count(ReadingDB.id).label("c"),
-                    func.min(ReadingDB.value).label("mn"),
-                    func.max(ReadingDB.value).label("mx"),
-                    func.avg(ReadingDB.value).label("av"),
-                )
-                .filter(ReadingDB.type == sensor, ReadingDB.ts >= cutoff)
-                .group_by(h_expr)
-                .order_by(h_expr.asc())
-            )
-            rows = q.all()
-            return [
-                {"bucket": h, "count": c, "min": mn, "max": mx, "avg": av}
-                for h, c, mn, mx, av in rows
-            ]
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metin biçiminde metrikler (bu worker'ın). async: HTTP metriklerini
+    yazan event loop'ta okunur, kilitsiz histogramlar tutarlı görünür."""
+    return Response(METRICS.render(), media_type=METRICS_CONTENT_TYPE)
 
 @app.get("/api/v1/health")
 def health():
@@ -529,104 +1034,98 @@ def health():
 
 # ----------------- AUTH ENDPOINTS -------------------------------------------
 @app.post("/api/v1/auth/register", response_model=Token)
-def register(user_data: UserRegister):
+async def register(user_data: UserRegister, request: Request):
     """Kullanıcı kaydı"""
-    with Session(engine) as s:
-        # Email kontrolü
-        existing_email = s.exec(select(UserDB).where(UserDB.email == user_data.email)).first()
-        if existing_email:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Email already registered"
-            )
-        
-        
-        existing_username = s.exec(select(UserDB).where(UserDB.username == user_data.username)).first()
-        if existing_username:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Username already taken"
-            )
-        
-        
-        try:
-            hashed_password = get_password_hash(user_data.password)
-        except ValueError as e:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=str(e)
-            )
-        new_user = UserDB(
-            email=user_data.email,
-            username=user_data.username,
-            hashed_password=hashed_password,
-            full_name=user_data.full_name,
-            created_at=utcnow(),
-            is_active=True
+    conflict = await run_in_threadpool(_registration_conflict, user_data.email, user_data.username)
+    if conflict:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=conflict
         )
-        s.add(new_user)
-        s.commit()
-        s.refresh(new_user)
-        
-        # Token 
-        access_token = create_access_token(data={"sub": str(new_user.id)})
-        
-        return {
-            "access_token": access_token,
-            "token_type": "bearer",
-            "user": {
-                "id": new_user.id,
-                "email": new_user.email,
-                "username": new_user.username,
-                "full_name": new_user.full_name,
-                "created_at": iso_z(new_user.created_at),
-            }
-        }
+
+    try:
+        hashed_password = await _password_call(
+            get_password_hash, user_data.password, keys=(f"ip:{_client_ip(request)}",)
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    new_user = await run_in_threadpool(_create_user, user_data, hashed_password)
+
+    # Token 
+    return await run_in_threadpool(_issue_tokens, new_user)
 
 @app.post("/api/v1/auth/login", response_model=Token)
-def login(credentials: UserLogin):
+async def login(credentials: UserLogin, request: Request):
     """Kullanıcı girişi"""
-    with Session(engine) as s:
-        # Username veya email ile giriş yapılabilir
-        user = s.exec(
-            select(UserDB).where(
-                (UserDB.username == credentials.username) | 
-                (UserDB.email == credentials.username)
-            )
-        ).first()
-        
-        if not user:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Incorrect username or password"
-            )
-        
-        if not verify_password(credentials.password, user.hashed_password):
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Incorrect username or password"
-            )
-        
-        if not user.is_active:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Inactive user"
-            )
-        
-        # Token oluştur (JWT'de sub string olmalı)
-        access_token = create_access_token(data={"sub": str(user.id)})
-        
-        return {
-            "access_token": access_token,
-            "token_type": "bearer",
-            "user": {
-                "id": user.id,
-                "email": user.email,
-                "username": user.username,
-                "full_name": user.full_name,
-                "created_at": iso_z(user.created_at),
-            }
-        }
+    # Username veya email ile giriş yapılabilir
+    user = await run_in_threadpool(_find_login_user, credentials.username)
+    if not user:
+        log.warning("Login başarısız: kullanıcı yok", extra={"client_ip": _client_ip(request)})
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Incorrect username or password"
+        )
+
+    password_ok = await _password_call(
+        verify_password,
+        credentials.password,
+        user.hashed_password,
+        keys=(f"user:{user.id}", f"ip:{_client_ip(request)}"),
+    )
+    if not password_ok:
+        log.warning("Login başarısız: hatalı parola", extra={"user_id": user.id, "client_ip": _client_ip(request)})
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Incorrect username or password"
+        )
+
+    if not user.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Inactive user"
+        )
+
+    # Token oluştur (JWT'de sub string olmalı)
+    return await run_in_threadpool(_issue_tokens, user)
+
+@app.post("/api/v1/auth/refresh", response_model=Token)
+def refresh_session(payload: RefreshRequest):
+    """Refresh token'ı yenisiyle değiştirir ve yeni bir access token verir"""
+    rotated = _rotate_refresh_token(payload.refresh_token)
+    if rotated is None:
+        log.warning("Refresh token reddedildi")
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid refresh token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    user, refresh_token = rotated
+    return {
+        "access_token": create_access_token(data={"sub": str(user.id)}),
+        "refresh_token": refresh_token,
+        "token_type": "bearer",
+        "expires_in": ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+        "user": _user_payload(user),
+    }
+
+@app.post("/api/v1/auth/logout")
+def logout(payload: Optional[LogoutRequest] = None, claims: dict = Depends(get_token_claims)):
+    """Mevcut access token'ı ve (verildiyse) refresh token ailesini iptal eder"""
+    _revoke_access_token(claims)
+    if payload is not None and payload.refresh_token:
+        with Session(engine) as s:
+            row = s.exec(
+                select(RefreshTokenDB).where(
+                    RefreshTokenDB.token_hash == _hash_refresh_token(payload.refresh_token)
+                )
+            ).first()
+            if row is not None and row.user_id == claims["user_id"]:
+                _revoke_refresh_tokens(s, RefreshTokenDB.family_id == row.family_id)
+                s.commit()
+    return {"ok": True}
 
 @app.get("/api/v1/auth/me", response_model=UserResponse)
 def get_current_user_info(current_user: UserDB = Depends(get_current_active_user)):
@@ -639,56 +1138,80 @@ def get_current_user_info(current_user: UserDB = Depends(get_current_active_user
         created_at=current_user.created_at,
     )
 
+@app.post("/api/v1/auth/change-password")
+async def change_password(
+    payload: PasswordChange,
+    request: Request,
+    current_user: UserDB = Depends(get_current_active_user),
+):
+    """Şifre değiştirir, kullanıcının diğer oturumlarını kapatır ve yeni token çifti döner"""
+    keys = (f"user:{current_user.id}", f"ip:{_client_ip(request)}")
+    user = await run_in_threadpool(_get_user, current_user.id)
+    if user is None or not await _password_call(
+        verify_password, payload.current_password, user.hashed_password, keys=keys
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Incorrect password"
+        )
+    hashed_password = await _password_call(get_password_hash, payload.new_password, keys=keys)
+    await run_in_threadpool(_update_password, current_user.id, hashed_password)
+    # Diğer tüm oturumlar kapanır; bu istemci yeni token çifti ile devam eder
+    await run_in_threadpool(_revoke_user_tokens, current_user.id)
+    PRINCIPALS.invalidate(current_user.id)
+    tokens = await run_in_threadpool(_issue_tokens, current_user)
+    return {"ok": True, **tokens}
+
+@app.get("/api/v1/auth/pool-stats")
+def auth_pool_stats():
+    """bcrypt havuzunun kuyruk derinliği ve red sayaçları"""
+    return PASSWORD_POOL.stats()
+
 @app.post("/api/v1/ingest")
 def ingest(r: ReadingIn):
     """
-    Sensör verisini alır ve DB'ye yazar (UTC aware).
-    Eşik kontrolleri artık frontend'de bitki bazlı yapılıyor.
+    Sensör verisini alır, DB'ye yazar (UTC aware) ve otomasyon kurallarını
+    çalıştırır. Bitki bazlı eşikler AutomationRuleDB kurallarıdır.
     """
     try:
         ts_utc = to_utc(r.ts)
 
         # In-memory log 
-        READINGS.append({
-            "sensor_id": r.sensor_id,
-            "type": r.type,
-            "value": float(r.value),
-            "ts": iso_z(ts_utc),
-        })
-
-        # DB: reading insert (aware datetime) - retry logic
-        db_success = False
-        for attempt in range(3):  
-            try:
-                with Session(engine) as s:
-                    s.add(ReadingDB(
-                        sensor_id=r.sensor_id,
-                        type=r.type,
-                        value=float(r.value),
-                        ts=ts_utc,
-                    ))
-                    s.commit()
-                db_success = True
-                break
-            except Exception as db_err:
-                if attempt < 2:  
-                    import time
-                    time.sleep(0.1 * (attempt + 1))  
-                else:
-                    
-                    pass
+        RECENT.append(r.sensor_id, r.type, float(r.value), to_epoch_ns(ts_utc))
 
-        
+        # DB: reading insert (UTC) - kilit hatalarında depo kendisi tekrar dener
+        with INGEST_DB_SECONDS.time():
+            written = READINGS_STORE.write(r.sensor_id, r.type, float(r.value), ts_utc)
+        if written:
+            VERSIONS.bump("readings")
+
+        # Otomasyon kuralları: yalnızca bu sensör tipinin kuralları değerlendirilir
+        try:
+            RULES.evaluate(r.sensor_id, r.type, float(r.value))
+        except Exception:
+            log.exception("Rule evaluation error", extra={"sensor_id": r.sensor_id})
+
+        # Spike tespiti (sensör başına EWMA z-score)
+        try:
+            ANOMALIES.update(r.sensor_id, r.type, float(r.value), ts_utc.timestamp())
+        except Exception:
+            log.exception("Anomaly detection error", extra={"sensor_id": r.sensor_id})
 
         return {"ok": True}
     
     except Exception as e:
-        import traceback
-        error_msg = f"Ingest error: {str(e)}\n{traceback.format_exc()}"
-        print(error_msg)
-        
+        # Hatalı sensör yağmurunda imza başına örneklenir; traceback log thread'inde biçimlenir
+        log.exception("Ingest error", extra={"sensor_id": r.sensor_id, "sensor_type": r.type})
         return {"ok": False, "error": str(e)}
 
+# Open-Meteo proxy: havuzlu HTTP client + TTL önbellek + istek birleştirme
+WEATHER = WeatherService(
+    forecast_ttl=float(os.getenv("WEATHER_CACHE_TTL_SECONDS", "600")),
+    geocode_ttl=float(os.getenv("WEATHER_GEOCODE_TTL_SECONDS", "86400")),
+    stale_seconds=float(os.getenv("WEATHER_STALE_SECONDS", "3600")),
+    on_upstream=lambda kind, seconds, ok: WEATHER_UPSTREAM_SECONDS.labels(kind, "ok" if ok else "error").observe(seconds),
+)
+
 @app.get("/api/v1/weather")
 async def get_weather(city: str = "Istanbul", country_code: str = "TR", lat: Optional[float] = None, lon: Optional[float] = None):
     """
@@ -703,164 +1226,27 @@ async def get_weather(city: str = "Istanbul", country_code: str = "TR", lat: Opt
         coords = {"lat": lat, "lon": lon}
         city_name = city  # Şehir adını parametre olarak kullan
     else:
-        # Şehir adından koordinat bulmak için Open-Meteo Geocoding API kullan
+        # Şehir adından koordinat bulmak için Open-Meteo Geocoding API kullan (önbellekli)
         try:
-            geocoding_url = "https://geocoding-api.open-meteo.com/v1/search"
-            geocoding_params = {
-                "name": city,
-                "count": 1,
-                "language": "tr",
-                "format": "json",
-            }
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                geo_response = await client.get(geocoding_url, params=geocoding_params)
-                geo_response.raise_for_status()
-                geo_data = geo_response.json()
-            
-            if geo_data.get("results") and len(geo_data["results"]) > 0:
-                result = geo_data["results"][0]
-                coords = {"lat": result["latitude"], "lon": result["longitude"]}
-                city_name = result.get("name", city)  # API'den gelen şehir adı
+            geo = await WEATHER.geocode(city)
+            if geo is not None:
+                coords = {"lat": geo["lat"], "lon": geo["lon"]}
+                city_name = geo["name"]  # API'den gelen şehir adı
             else:
                 # Geocoding başarısız, default Istanbul kullan
                 coords = {"lat": 41.0082, "lon": 28.9784}
                 city_name = "Istanbul"
         except Exception as e:
-            print(f"Geocoding error: {e}")
+            log.warning("Geocoding error: %s", e)
             # Hata durumunda default Istanbul kullan
             coords = {"lat": 41.0082, "lon": 28.9784}
             city_name = "Istanbul"
     
     try:
-        # Open-Meteo API - tamamen ücretsiz, API key gerektirmez
-        url = "https://api.open-meteo.com/v1/forecast"
-        params = {
-            "latitude": coords["lat"],
-            "longitude": coords["lon"],
-            "current": "temperature_2m,relative_humidity_2m,weather_code,wind_speed_10m,apparent_temperature",
-            "daily": "weather_code,temperature_2m_max,temperature_2m_min",
-            "timezone": "Europe/Istanbul",
-            "forecast_days": 7,  # 7 günlük tahmin
-        }
-        
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.get(url, params=params)
-            response.raise_for_status()
-            data = response.json()
-        
-        current = data["current"]
-        temp = current["temperature_2m"]
-        feels_like = current["apparent_temperature"]
-        humidity = current["relative_humidity_2m"]
-        wind_speed = current["wind_speed_10m"]
-        weather_code = int(current["weather_code"])
-        
-        # WMO Weather interpretation codes (WW) -> Türkçe açıklama
-        weather_codes = {
-            0: "Açık",
-            1: "Çoğunlukla açık",
-            2: "Kısmen bulutlu",
-            3: "Kapalı",
-            45: "Sisli",
-            48: "Donan sisli",
-            51: "Hafif çiseleyen yağmur",
-            53: "Orta çiseleyen yağmur",
-            55: "Yoğun çiseleyen yağmur",
-            56: "Hafif donan çiseleme",
-            57: "Yoğun donan çiseleme",
-            61: "Hafif yağmur",
-            63: "Orta yağmur",
-            65: "Yoğun yağmur",
-            66: "Hafif donan yağmur",
-            67: "Yoğun donan yağmur",
-            71: "Hafif kar",
-            73: "Orta kar",
-            75: "Yoğun kar",
-            77: "Kar taneleri",
-            80: "Hafif sağanak",
-            81: "Orta sağanak",
-            82: "Yoğun sağanak",
-            85: "Hafif kar sağanağı",
-            86: "Yoğun kar sağanağı",
-            95: "Fırtına",
-            96: "Dolu ile fırtına",
-            99: "Şiddetli dolu ile fırtına",
-        }
-        
-        description = weather_codes.get(weather_code, "Bilinmiyor")
-        
-        # Icon seçimi (basit mapping)
-        if weather_code in [0, 1]:
-            icon = "clear"
-        elif weather_code in [2, 3]:
-            icon = "clouds"
-        elif weather_code in [45, 48]:
-            icon = "mist"
-        elif weather_code in range(51, 68):
-            icon = "rain"
-        elif weather_code in range(71, 78):
-            icon = "snow"
-        elif weather_code in range(80, 83):
-            icon = "rain"
-        elif weather_code in range(95, 100):
-            icon = "thunderstorm"
-        else:
-            icon = "clouds"
-        
-        # Haftalık tahmin verilerini al
-        daily_forecast = []
-        if "daily" in data:
-            daily = data["daily"]
-            daily_codes = daily.get("weather_code", [])
-            daily_max = daily.get("temperature_2m_max", [])
-            daily_min = daily.get("temperature_2m_min", [])
-            daily_time = daily.get("time", [])
-            
-            for i in range(min(7, len(daily_codes))):
-                day_code = int(daily_codes[i])
-                day_description = weather_codes.get(day_code, "Bilinmiyor")
-                
-                # Icon seçimi
-                if day_code in [0, 1]:
-                    day_icon = "clear"
-                elif day_code in [2, 3]:
-                    day_icon = "clouds"
-                elif day_code in [45, 48]:
-                    day_icon = "mist"
-                elif day_code in range(51, 68):
-                    day_icon = "rain"
-                elif day_code in range(71, 78):
-                    day_icon = "snow"
-                elif day_code in range(80, 83):
-                    day_icon = "rain"
-                elif day_code in range(95, 100):
-                    day_icon = "thunderstorm"
-                else:
-                    day_icon = "clouds"
-                
-                daily_forecast.append({
-                    "date": daily_time[i] if i < len(daily_time) else "",
-                    "max_temp": round(daily_max[i], 1) if i < len(daily_max) else 0.0,
-                    "min_temp": round(daily_min[i], 1) if i < len(daily_min) else 0.0,
-                    "weather_code": day_code,
-                    "description": day_description,
-                    "icon": day_icon,
-                })
-        
-        return {
-            "temp": round(temp, 1),
-            "feels_like": round(feels_like, 1),
-            "humidity": int(humidity),
-            "wind_speed": round(wind_speed * 3.6, 1),  # m/s'den km/h'ye çevir
-            "description": description,
-            "icon": icon,
-            "weather_code": weather_code,  # Frontend'de ikon seçimi için
-            "city": city_name,
-            "country": country_code,
-            "forecast": daily_forecast,  # 7 günlük tahmin
-        }
+        # Open-Meteo API - tamamen ücretsiz; forecast ve hazır yanıt önbellekli
+        return await WEATHER.report(coords["lat"], coords["lon"], city_name, country_code)
     except Exception as e:
-        print(f"Weather API error: {e}")
+        log.warning("Weather API error: %s", e)
         # Hata durumunda mock data dön
         return {
             "temp": 23.0,
@@ -875,142 +1261,142 @@ async def get_weather(city: str = "Istanbul", country_code: str = "TR", lat: Opt
             "forecast": [],  # Mock data'da tahmin yok
         }
 
+@app.get("/api/v1/http-cache/stats")
+def http_cache_stats():
+    """304/200 sayaçları ve güncel veri sürümleri"""
+    return HTTP_CACHE.stats()
+
+
+@app.get("/api/v1/logging/stats")
+def logging_queue_stats():
+    """Log kuyruğu derinliği, düşen ve örneklemeyle bastırılan kayıtlar"""
+    return logging_stats()
+
+@app.get("/api/v1/weather/stats")
+def weather_stats():
+    """Hava durumu önbelleği isabet/upstream sayaçları"""
+    return WEATHER.stats()
+
+@app.get("/api/v1/shared-state")
+def shared_state_info(limit: int = 5):
+    """Bu worker'ın pid'i ve paylaşılan durumdan okuduğu son kayıtlar (worker tutarlılığı kontrolü)"""
+    return {
+        "backend": SHARED.name,
+        "pid": os.getpid(),
+        "actuators": ACTUATORS.all(),
+        "alerts": SHARED.recent("alerts", limit),
+    }
+
 @app.get("/api/v1/latest")
-def latest():
+async def latest():
     """Her sensör tipi için en son okumayı döner."""
-    with Session(engine) as s:
-        temp = s.exec(
-            select(ReadingDB)
-            .where(ReadingDB.type == "temp")
-            .order_by(ReadingDB.ts.desc())
-            .limit(1)
-        ).first()
-        humidity = s.exec(
-            select(ReadingDB)
-            .where(ReadingDB.type == "humidity")
-            .order_by(ReadingDB.ts.desc())
-            .limit(1)
-        ).first()
-        co2 = s.exec(
-            select(ReadingDB)
-            .where(ReadingDB.type == "co2")
-            .order_by(ReadingDB.ts.desc())
-            .limit(1)
-        ).first()
-        
-        return {
-            "temp": temp.value if temp else 0.0,
-            "humidity": humidity.value if humidity else 0.0,
-            "co2": co2.value if co2 else 0.0,
-        }
+    values = await READINGS_STORE.latest(("temp", "humidity", "co2"))
+    return {kind: value if value is not None else 0.0 for kind, value in values.items()}
+
+def _with_ts(rows: List[Dict[str, Any]], stamps: List[int], ts_format: str) -> List[Dict[str, Any]]:
+    """ts_format=ms: `ts_ms` sayısı olduğu gibi; iso: `ts` Z'li ISO string (toplu biçimlendirilir)."""
+    if ts_format == "ms":
+        for r, ms in zip(rows, stamps):
+            r["ts_ms"] = ms
+    else:
+        for r, iso in zip(rows, iso_z_ms(stamps)):
+            r["ts"] = iso
+    return rows
+
+@app.get("/api/v1/readings", response_model=List[ReadingOut])
+async def readings(sensor_id: Optional[str] = None, limit: int = 100, ts_format: Literal["iso", "ms"] = "iso"):
+    """DB'den okur; ts'ler Z'li ISO string ya da (ts_format=ms) epoch milisaniye."""
+    rows = await READINGS_STORE.readings(sensor_id, limit)
+    stamps = [r.pop("ts_ms") for r in rows]
+    return FastJSONResponse(_with_ts(rows, stamps, ts_format))
+
+@app.get("/api/v1/readings/store-stats")
+def readings_store_stats():
+    """Okuma deposu backend'i ve (duckdb ise) senkron durumu"""
+    return READINGS_STORE.stats()
+
+@app.get("/api/v1/readings/recent", response_model=List[ReadingOut])
+async def readings_recent(
+    minutes: float = 10,
+    sensor_id: Optional[str] = None,
+    limit: int = 1000,
+    ts_format: Literal["iso", "ms"] = "iso",
+):
+    """
+    Son `minutes` dakikanın okumaları (en yeni önce). Pencere bellekteki halka
+    tampona sığıyorsa SQLite'a gidilmez; `X-Readings-Source` memory/db döner.
+    """
+    since = utcnow() - timedelta(minutes=minutes)
+    since_ns = to_epoch_ns(since)
+    if SHARED.name == "local" and RECENT.covers(since_ns, sensor_id):
+        window = RECENT.window(since_ns, sensor_id=sensor_id, limit=limit)
+        rows = [{"sensor_id": sid, "type": kind, "value": value} for sid, kind, _, value in window]
+        return FastJSONResponse(
+            _with_ts(rows, [ts_ns // 1_000_000 for _, _, ts_ns, _ in window], ts_format),
+            headers={"X-Readings-Source": "memory"},
+        )
 
-@app.get("/api/v1/readings")
-def readings(sensor_id: Optional[str] = None, limit: int = 100):
-    """DB'den okur, ts'leri Z'li ISO string olarak döner."""
-    with Session(engine) as s:
-        if sensor_id:
-            stmt = (
-                select(ReadingDB)
-                .where(ReadingDB.sensor_id == sensor_id)
-                .order_by(ReadingDB.ts.desc())
-                .limit(limit)
-            )
-        else:
-            stmt = select(ReadingDB).order_by(ReadingDB.ts.desc()).limit(limit)
-        rows = s.exec(stmt).all()
-        out = []
-        for r in rows:
-            # Eski (naive) kayıtlar varsa UTC varsay
-            ts = to_utc(r.ts)
-            out.append({
-                "id": r.id,
-                "sensor_id": r.sensor_id,
-                "type": r.type,
-                "value": r.value,
-                "ts": iso_z(ts),
-            })
-        return out
-
-@app.get("/api/v1/fan/history")
-def fan_history(limit: int = 100):
+    found = await READINGS_STORE.readings(sensor_id, limit, since=since)
+    rows = [{"sensor_id": r["sensor_id"], "type": r["type"], "value": r["value"]} for r in found]
+    return FastJSONResponse(_with_ts(rows, [r["ts_ms"] for r in found], ts_format), headers={"X-Readings-Source": "db"})
+
+@app.get("/api/v1/readings/ring-stats")
+def readings_ring_stats():
+    """Halka tamponun sensör sayısı ve bellek kullanımı"""
+    return RECENT.stats()
+
+@app.get("/api/v1/fan/history", response_model=List[ActuatorEventOut])
+async def fan_history(limit: int = 100, s: AsyncSession = Depends(get_async_session)):
     """Backward compatibility için fan history endpoint'i"""
-    return actuator_history(device="fan", limit=limit)
+    return await actuator_history(device="fan", limit=limit, s=s)
+
+ACTUATOR_EVENT_FIELDS = ("id", "device", "action", "reason", "mode", "state", "ts")
 
-@app.get("/api/v1/actuator/history")
-def actuator_history(device: Optional[str] = None, limit: int = 100):
+@app.get("/api/v1/actuator/history", response_model=List[ActuatorEventOut])
+async def actuator_history(
+    device: Optional[str] = None,
+    limit: int = 100,
+    s: AsyncSession = Depends(get_async_session),
+):
     """Tüm actuator'lar veya belirli bir actuator için event history"""
-    with Session(engine) as s:
-        query = select(ActuatorEventDB).order_by(ActuatorEventDB.ts.desc())
-        if device:
-            query = query.where(ActuatorEventDB.device == device)
-        query = query.limit(limit)
-        rows = s.exec(query).all()
-        out = []
-        for e in rows:
-            out.append({
-                "id": e.id,
-                "device": e.device,
-                "action": e.action,
-                "reason": e.reason,
-                "mode": e.mode,
-                "state": e.state,
-                "ts": iso_z(to_utc(e.ts)),
-            })
-        return out
-
-
-@app.get("/api/v1/alerts")
-def alerts(limit: int = 100):
-    with Session(engine) as s:
-        rows = s.exec(select(AlertDB).order_by(AlertDB.ts.desc()).limit(limit)).all()
-        out = []
-        for a in rows:
-            ts = to_utc(a.ts)
-            out.append({
-                "id": a.id,
-                "level": a.level,
-                "source": a.source,
-                "message": a.message,
-                "ts": iso_z(ts),
-            })
-        return out
+    e = ActuatorEventDB
+    query = select(e.id, e.device, e.action, e.reason, e.mode, e.state, _iso_ms_column(e.ts)).order_by(e.ts.desc())
+    if device:
+        query = query.where(e.device == device)
+    rows = (await s.exec(query.limit(limit))).all()
+    return FastJSONResponse([dict(zip(ACTUATOR_EVENT_FIELDS, row)) for row in rows])
 
-class ControlPayload(BaseModel):
-    action: Literal["on", "off", "auto"]
 
+ALERT_FIELDS = ("id", "level", "source", "message", "ts")
 
-def _set_actuator(device: str, action: str):
-    actuator = ACTUATORS[device]
-    actuator["last_change"] = iso_z(utcnow())
-    if action in {"on", "off"}:
-        actuator["mode"] = "manual"
-        actuator["state"] = action
-    else:
-        actuator["mode"] = "auto"
-        # Otomatik moda geçerken cihazı kapalı varsay
-        actuator["state"] = "off"
+@app.get("/api/v1/alerts", response_model=List[AlertOut])
+async def alerts(limit: int = 100, s: AsyncSession = Depends(get_async_session)):
+    a = AlertDB
+    query = select(a.id, a.level, a.source, a.message, _iso_ms_column(a.ts)).order_by(a.ts.desc()).limit(limit)
+    rows = (await s.exec(query)).all()
+    return FastJSONResponse([dict(zip(ALERT_FIELDS, row)) for row in rows])
+
+class ControlPayload(BaseModel):
+    action: Literal["on", "off", "auto"]
 
-    # Tüm actuator'lar için event kaydı
-    try:
-        with Session(engine) as s:
-            s.add(ActuatorEventDB(
-                device=device,
-                action=action,
-                reason="manual",
-                mode=actuator["mode"],
-                state=actuator["state"],
-                ts=utcnow(),
-            ))
-            s.commit()
-    except Exception as db_err:
-        print(f"ActuatorEvent DB insert error: {db_err}")
 
+def _set_actuator(device: str, action: str, reason: str = "manual"):
+    # Bellek hemen güncellenir; event kaydı writer thread'inde toplu yazılır
+    actuator = ACTUATORS.apply(device, action, reason)
+    if action == "auto" and RULES.resume(device):
+        actuator = ACTUATORS.get(device)
     return {"ok": True, "device": device, "state": actuator}
 
 
 @app.get("/api/v1/actuators")
 def actuator_list():
-    return {device: _actuator_snapshot(device) for device in ACTUATORS}
+    return ACTUATORS.all()
+
+
+@app.get("/api/v1/actuators/store-stats")
+def actuator_store_stats():
+    """Actuator olay yazıcısının kuyruk/snapshot sayaçları"""
+    return ACTUATORS.stats()
 
 
 @app.get("/api/v1/actuator/{device}")
@@ -1030,14 +1416,182 @@ def fan_control(action: str):
     return _set_actuator("fan", action)
 
 
+# ----------------- OTOMASYON KURALLARI -----------------
+class RuleIn(BaseModel):
+    name: str
+    plant: Optional[str] = None
+    sensor_type: Literal["temp", "humidity", "co2"]
+    sensor_id: Optional[str] = None
+    device: Literal["fan", "heater", "humidifier"]
+    direction: Literal["above", "below"]
+    threshold: float
+    hysteresis: float = 0.0
+    alert_level: Optional[Literal["info", "warning", "critical"]] = "warning"
+    enabled: bool = True
+
+    @field_validator("hysteresis")
+    @classmethod
+    def check_hysteresis(cls, v: float):
+        if v < 0:
+            raise ValueError("hysteresis must be >= 0")
+        return v
+
+
+def _record_alert(level: str, source: str, message: str) -> None:
+    try:
+        with Session(engine) as s:
+            s.add(AlertDB(level=level, source=source, message=message, ts=utcnow()))
+            s.commit()
+        VERSIONS.bump("alerts")
+    except Exception:
+        log.exception("Alert DB insert error", extra={"source": source})
+    SHARED.append("alerts", {"level": level, "source": source, "message": message, "ts": iso_z(utcnow())})
+
+
+def _rule_payload(rule: AutomationRuleDB) -> dict:
+    return {
+        "id": rule.id,
+        "name": rule.name,
+        "plant": rule.plant,
+        "sensor_type": rule.sensor_type,
+        "sensor_id": rule.sensor_id,
+        "device": rule.device,
+        "direction": rule.direction,
+        "threshold": rule.threshold,
+        "hysteresis": rule.hysteresis,
+        "alert_level": rule.alert_level,
+        "enabled": rule.enabled,
+        "created_at": iso_z(to_utc(rule.created_at)),
+    }
+
+
+_rules_version = 0
+
+
+def _load_rules() -> None:
+    with Session(engine) as s:
+        RULES.load(s.exec(select(AutomationRuleDB)).all())
+
+
+def _reload_rules() -> None:
+    """Kural değişikliğinden sonra: bu worker'da yükler, sürümü artırıp diğerlerine duyurur"""
+    global _rules_version
+    _load_rules()
+    _rules_version = VERSIONS.bump("rules") or _rules_version
+
+
+def _sync_rules(force: bool = False) -> None:
+    """Başka bir worker kuralları değiştirdiyse ("rules" sürümü ilerlediyse) yeniden yükler"""
+    global _rules_version
+    version = VERSIONS.get("rules")  # yüklemeden önce: yükleme sırasındaki değişiklik sonraki turda görülür
+    if force or version != _rules_version:
+        _load_rules()
+        _rules_version = version
+
+
+RULES = RuleEngine(
+    actuate=_set_actuator,
+    alert=_record_alert,
+    is_auto=lambda device: ACTUATORS.get(device)["mode"] == "auto",
+    normal_ok_target=NORMAL_OK_TARGET,
+)
+
+
+@app.get("/api/v1/rules")
+async def list_rules(s: AsyncSession = Depends(get_async_session)):
+    rows = (await s.exec(select(AutomationRuleDB).order_by(AutomationRuleDB.id))).all()
+    return [_rule_payload(r) for r in rows]
+
+
+@app.post("/api/v1/rules")
+def create_rule(payload: RuleIn):
+    with Session(engine) as s:
+        rule = AutomationRuleDB(**payload.model_dump(), created_at=utcnow())
+        s.add(rule)
+        s.commit()
+        s.refresh(rule)
+        out = _rule_payload(rule)
+    _reload_rules()
+    return out
+
+
+@app.put("/api/v1/rules/{rule_id}")
+def update_rule(rule_id: int, payload: RuleIn):
+    with Session(engine) as s:
+        rule = s.get(AutomationRuleDB, rule_id)
+        if rule is None:
+            raise HTTPException(status_code=404, detail="Rule not found")
+        for key, value in payload.model_dump().items():
+            setattr(rule, key, value)
+        s.add(rule)
+        s.commit()
+        s.refresh(rule)
+        out = _rule_payload(rule)
+    _reload_rules()
+    return out
+
+
+@app.delete("/api/v1/rules/{rule_id}")
+def delete_rule(rule_id: int):
+    with Session(engine) as s:
+        rule = s.get(AutomationRuleDB, rule_id)
+        if rule is None:
+            raise HTTPException(status_code=404, detail="Rule not found")
+        s.delete(rule)
+        s.commit()
+    _reload_rules()
+    return {"ok": True}
+
+
+def _anomaly_alert(marker: Dict[str, Any]) -> None:
+    direction = "yüksek" if marker["value"] > marker["expected"] else "düşük"
+    _record_alert(
+        "warning",
+        f"anomaly:{marker['sensor_id']}",
+        f"{marker['sensor_id']} {marker['type']}={marker['value']:g} beklenenden {direction} "
+        f"(beklenen≈{marker['expected']:g}, z={marker['z']:g})",
+    )
+
+
+ANOMALIES = AnomalyDetector(
+    alpha=float(os.getenv("ANOMALY_ALPHA", "0.1")),
+    threshold=float(os.getenv("ANOMALY_Z_THRESHOLD", "4.0")),
+    suppress_seconds=float(os.getenv("ANOMALY_SUPPRESS_SECONDS", "300")),
+    on_alert=_anomaly_alert,
+)
+
+
+@app.get("/api/v1/anomalies")
+def anomalies(sensor_id: Optional[str] = None, limit: int = 100):
+    """Son spike işaretleri (en yeni önce); `alert` alanı alarm üretilip üretilmediğini gösterir"""
+    out = []
+    for marker in ANOMALIES.markers(sensor_id=sensor_id, limit=limit):
+        out.append({**marker, "ts": iso_z(datetime.fromtimestamp(marker["ts"], tz=timezone.utc))})
+    return out
+
+
+@app.get("/api/v1/anomalies/state")
+def anomalies_state():
+    """Sensör başına EWMA tabanı ve dedektör sayaçları"""
+    return {"stats": ANOMALIES.stats, "sensors": ANOMALIES.baseline()}
+
+
+@app.get("/api/v1/rules/state")
+def rules_state():
+    """Aktif kurallar, normal okuma serileri ve cihaz başına aktif kural listesi"""
+    return RULES.state()
+
+
 # ----------------- MODEL METRİKLERİ ENDPOINT -----------------
 @app.get("/api/v1/model-metrics")
-async def get_model_metrics(
+def get_model_metrics(
     current_user: UserDB = Depends(get_current_active_user),
 ):
     """
     Model metriklerini döndürür: Confusion Matrix, Accuracy, Precision, Recall, F1-Score
     Test seti üzerinde değerlendirme yapar.
+    Tüm test setini modelden geçirdiği için sync tanımlı: FastAPI threadpool'da
+    çalıştırır, event loop bloklanmaz.
     """
     try:
         import torch
@@ -1205,9 +1759,7 @@ async def get_model_metrics(
         }
 
     except Exception as e:
-        import traceback
-        error_msg = f"Model metrikleri hesaplanırken hata: {str(e)}\n{traceback.format_exc()}"
-        print(error_msg)
+        log.exception("Model metrikleri hesaplanırken hata")
         raise HTTPException(
             status_code=500,
             detail={"error": "METRICS_ERROR", "message": str(e)}
@@ -1215,32 +1767,47 @@ async def get_model_metrics(
 
 
 # ----------------- BİTKİ ANALİZİ ENDPOINT -----------------
+def _predict_image(contents: bytes, model_keys: List[str]) -> tuple:
+    with ANALYZE_STAGE_SECONDS.labels("", "decode").time():
+        img = Image.open(io.BytesIO(contents))
+        img.load()  # Image.open tembel; çözme süresi preprocess'e karışmasın
+        if img.mode != "RGB":
+            img = img.convert("RGB")
+    model_results = []
+    for key in model_keys:
+        clf = MODEL_REGISTRY[key]
+        try:
+            timings: Dict[str, float] = {}
+            pred = clf.predict(img, timings=timings)
+            pred["model"] = key
+            model_results.append(pred)
+            for stage, seconds in timings.items():
+                ANALYZE_STAGE_SECONDS.labels(key, stage).observe(seconds)
+        except Exception:
+            log.exception("Model inference error (%s)", key)
+    return img.size, model_results
+
+def _class_probabilities(names: List[str], probabilities: List[float]) -> Dict[str, float]:
+    """Sınıf adı -> olasılık, büyükten küçüğe"""
+    return dict(sorted(zip(names, probabilities), key=lambda item: item[1], reverse=True))
+
 @app.post("/api/v1/analyze-plant")
 async def analyze_plant(
     image: UploadFile = File(...),
     model: Literal["auto", "outdoor", "plantvillage"] = "auto",
+    include_probabilities: bool = False,
     current_user: UserDB = Depends(get_current_active_user),
 ):
     """
     Bitki fotoğrafını analiz eder. Indoor/outdoor sınıflandırıcılarını kullanır.
+    include_probabilities=true: sınıf başına olasılıklar da döner (varsayılan
+    kapalı; sınıf sayısı kadar alan, mobil istemcilerde gereksiz aktarım).
     """
     try:
         contents = await image.read()
-        img = Image.open(io.BytesIO(contents))
-        if img.mode != "RGB":
-            img = img.convert("RGB")
-        width, height = img.size
-
         model_keys = available_models(None if model == "auto" else model)
-        model_results = []
-        for key in model_keys:
-            clf = MODEL_REGISTRY[key]
-            try:
-                pred = clf.predict(img)
-                pred["model"] = key
-                model_results.append(pred)
-            except Exception as clf_err:
-                print(f"Model inference error ({key}): {clf_err}")
+        # Decode + inference CPU'ya bağlı; event loop'u bloklamasın diye threadpool'da
+        (width, height), model_results = await run_in_threadpool(_predict_image, contents, model_keys)
 
         if not model_results:
             raise HTTPException(
@@ -1339,7 +1906,14 @@ async def analyze_plant(
                 }
                 for r in model_results[:5]
             ]
-            
+
+            plant_analysis = {"name": plant_info["class_name"], "confidence": plant_info["confidence"]}
+            health_analysis = {"status": health_info["class_name"], "confidence": health_info["confidence"]}
+            if include_probabilities:
+                clf = MODEL_REGISTRY["plantvillage"]
+                plant_analysis["probabilities"] = _class_probabilities(clf.plant_names, plant_info["probabilities"])
+                health_analysis["probabilities"] = _class_probabilities(clf.status_names, health_info["probabilities"])
+
             return {
                 "status": status,
                 "message": message,
@@ -1351,14 +1925,8 @@ async def analyze_plant(
                 "analysis": {
                     "model": "plantvillage",
                     "confidence": primary_confidence,
-                    "plant": {
-                        "name": plant_info["class_name"],
-                        "confidence": plant_info["confidence"],
-                    },
-                    "health": {
-                        "status": health_info["class_name"],
-                        "confidence": health_info["confidence"],
-                    },
+                    "plant": plant_analysis,
+                    "health": health_analysis,
                     "alternatives": alternatives,
                 },
                 "recommendations": recommendations,
@@ -1385,6 +1953,10 @@ async def analyze_plant(
             }
             for r in model_results[:5]
         ]
+        if include_probabilities:
+            for alt, r in zip(alternatives, model_results):
+                if "probabilities" in r:
+                    alt["probabilities"] = _class_probabilities(MODEL_REGISTRY[r["model"]].class_names, r["probabilities"])
 
         primary_display = CLASS_INFO.get(best_class_name, {}).get(
             "display", best_class_name.replace("_", " ")
@@ -1,5 +1,6 @@
 #!/usr/bin/env python3
 """Kullanıcı yönetim scripti - kullanıcıları listele ve ekle"""
+import os
 import sys
 from pathlib import Path
 
@@ -8,10 +9,12 @@ backend_dir = Path(__file__).parent
 sys.path.insert(0, str(backend_dir))
 
 from sqlmodel import SQLModel, create_engine, Session, select
-from datetime import datetime, timezone
+from sqlalchemy import update
+from datetime import datetime, timezone, timedelta
 import bcrypt
 from typing import Optional
 from sqlmodel import Field
+from dotenv import load_dotenv
 
 class UserDB(SQLModel, table=True):
     id: int | None = Field(default=None, primary_key=True)
@@ -22,6 +25,28 @@ class UserDB(SQLModel, table=True):
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     is_active: bool = True
 
+# main.py'deki tablolarla aynı şema; deactivate komutu oturumları buradan kapatır
+class RefreshTokenDB(SQLModel, table=True):
+    id: int | None = Field(default=None, primary_key=True)
+    user_id: int = Field(index=True)
+    token_hash: str = Field(unique=True, index=True)
+    family_id: str = Field(index=True)
+    created_at: datetime
+    expires_at: datetime
+    revoked_at: Optional[datetime] = None
+    replaced_by_id: Optional[int] = None
+
+class TokenRevocationDB(SQLModel, table=True):
+    id: int | None = Field(default=None, primary_key=True)
+    jti: Optional[str] = Field(default=None, index=True)
+    user_id: Optional[int] = Field(default=None, index=True)
+    revoked_at: datetime
+    expires_at: datetime
+
+# main.py ile aynı .env: iptal kaydı sunucunun access token ömründen önce silinmesin
+load_dotenv(dotenv_path=backend_dir / ".env")
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "15"))
+
 def get_password_hash(password: str) -> str:
     """Şifreyi hash'le - bcrypt direkt kullan"""
     password_bytes = password.encode('utf-8')
@@ -97,9 +122,42 @@ with Session(engine) as s:
         print(f"\n✅ Kullanıcı başarıyla oluşturuldu!")
         print(f"   Email: {email}")
         print(f"   Username: {username}")
+    elif len(sys.argv) > 1 and sys.argv[1] == "deactivate":
+        if len(sys.argv) < 3:
+            print("\nHata: Eksik parametreler!")
+            print("Kullanım: python3 manage_users.py deactivate <username|email>")
+            sys.exit(1)
+
+        target = sys.argv[2]
+        user = s.exec(
+            select(UserDB).where((UserDB.username == target) | (UserDB.email == target))
+        ).first()
+        if not user:
+            print(f"\nHata: Kullanıcı bulunamadı: {target}")
+            sys.exit(1)
+
+        # Hesabı kapat, refresh token'ları iptal et ve mevcut access token'ları
+        # iptal listesine ekle (çalışan backend birkaç saniye içinde görür)
+        now = datetime.now(timezone.utc)
+        user.is_active = False
+        s.add(user)
+        s.execute(
+            update(RefreshTokenDB)
+            .where(RefreshTokenDB.user_id == user.id, RefreshTokenDB.revoked_at.is_(None))
+            .values(revoked_at=now)
+        )
+        s.add(TokenRevocationDB(
+            user_id=user.id,
+            revoked_at=now,
+            expires_at=now + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES),
+        ))
+        s.commit()
+        print(f"\n✅ Kullanıcı devre dışı bırakıldı ve oturumları kapatıldı: {user.username}")
     else:
         print("\nYeni kullanıcı eklemek için:")
         print("  python3 manage_users.py add <email> <username> <password>")
+        print("\nKullanıcıyı devre dışı bırakmak için:")
+        print("  python3 manage_users.py deactivate <username|email>")
         print("\nÖrnek:")
         print("  python3 manage_users.py add user@example.com myuser mypassword123")
 
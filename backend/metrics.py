@@ -0,0 +1,310 @@
+"""
+Süreç içi metrikler ve Prometheus metin biçimi (prometheus_client gerekmez).
+
+- `Counter`, `Gauge`, `Histogram`: etiket değerleri tuple'ı başına bir çocuk.
+  Kayıt yolu bir dict araması, bisect ve kısa bir kilittir (threadpool'daki
+  sync endpoint'ler de yazar). Yalnızca event loop'tan yazılan aileler
+  `threadsafe=False` ile kilitsiz kaydeder.
+- `MetricsMiddleware`: saf ASGI middleware'i. Route şablonu (`/api/v1/actuator/{device}`)
+  ve method başına süre/yanıt boyutu histogramı, status sayacı, istek gövdesi
+  boyutu ve anlık istek sayısı tutar. Route etiketi yönlendirmeden sonra
+  scope'tan okunur; yönlendirmeye ulaşmadan dönen 304'ler (HttpCache, sabit
+  yollar) yolun kendisiyle, diğer eşleşmeyen istekler `unmatched` ile
+  etiketlenir (etiket sayısı route sayısıyla sınırlı kalır).
+- `Registry.render()`: `GET /metrics` gövdesi (text/plain; version=0.0.4).
+
+Metrikler worker başınadır; `--workers N` ile her worker ayrı kazınmalı ya
+da toplamlar worker'lar üzerinden alınmalıdır.
+"""
+
+from __future__ import annotations
+
+import math
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return str(value) if isinstance(value, int) else repr(float(value))
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _CounterChild:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self, threadsafe: bool = True) -> None:
+        self.value = 0.0
+        self._lock = threading.Lock() if threadsafe else None
+
+    def inc(self, amount: float = 1.0) -> None:
+        if self._lock is None:
+            self.value += amount
+            return
+        with self._lock:
+            self.value += amount
+
+
+class _GaugeChild(_CounterChild):
+    __slots__ = ()
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.inc(-amount)
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class _Timer:
+    __slots__ = ("_child", "_start")
+
+    def __init__(self, child: "_HistogramChild") -> None:
+        self._child = child
+
+    def __enter__(self) -> "_Timer":
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._child.observe(time.perf_counter() - self._start)
+
+
+class _HistogramChild:
+    __slots__ = ("_upper", "counts", "sum", "_lock")
+
+    def __init__(self, upper: Tuple[float, ...], threadsafe: bool = True) -> None:
+        self._upper = upper
+        self.counts = [0] * (len(upper) + 1)  # son kova +Inf
+        self.sum = 0.0
+        self._lock = threading.Lock() if threadsafe else None
+
+    def observe(self, value: float) -> None:
+        i = bisect_left(self._upper, value)
+        if self._lock is None:
+            self.counts[i] += 1
+            self.sum += value
+            return
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+
+    def snapshot(self) -> Tuple[List[int], float]:
+        if self._lock is None:
+            return list(self.counts), self.sum
+        with self._lock:
+            return list(self.counts), self.sum
+
+    def time(self) -> _Timer:
+        """`with h.time():` bloğun süresini saniye olarak gözlemler."""
+        return _Timer(self)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        *,
+        threadsafe: bool = True,
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.threadsafe = threadsafe
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values: str):
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild(self.threadsafe)
+
+    def _samples(self):
+        for values, child in list(self._children.items()):
+            yield f"{self.name}{_labels(self.labelnames, values)} {_format_value(child.value)}"
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild(self.threadsafe)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+        *,
+        threadsafe: bool = True,
+    ) -> None:
+        super().__init__(name, documentation, labelnames, threadsafe=threadsafe)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets, self.threadsafe)
+
+    def _samples(self):
+        for values, child in list(self._children.items()):
+            counts, total = child.snapshot()
+            cumulative = 0
+            for upper, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                le = f'le="{_format_value(upper)}"'
+                yield f"{self.name}_bucket{_labels(self.labelnames, values, le)} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labelnames, values)} {_format_value(total)}"
+            yield f"{self.name}_count{_labels(self.labelnames, values)} {cumulative}"
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = (), **kwargs) -> Counter:
+        return self.register(Counter(name, documentation, labelnames, **kwargs))
+
+    def gauge(self, name: str, documentation: str, labelnames: Iterable[str] = (), **kwargs) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames, **kwargs))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+        **kwargs,
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets, **kwargs))
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self._metrics) + "\n"
+
+
+def _route_label(scope: Scope, status: int) -> str:
+    route = scope.get("route")
+    path = getattr(route, "path", None)
+    if path:
+        return path
+    if status == 304:
+        # HttpCache yönlendirmeden önce döner; politika tablosu yalnızca sabit yollar içerir
+        return scope.get("path", "")
+    return "unmatched"
+
+
+def _content_length(scope: Scope) -> Optional[int]:
+    for key, value in scope["headers"]:
+        if key == b"content-length":
+            try:
+                return int(value)
+            except ValueError:
+                return None
+    return None
+
+
+class MetricsMiddleware:
+    def __init__(self, app: ASGIApp, *, registry: Registry, skip_paths: Iterable[str] = ("/metrics",)) -> None:
+        self.app = app
+        self.skip_paths = frozenset(skip_paths)
+        # Middleware yalnızca event loop thread'inde çalışır: tek yazar, kilit gerekmez
+        self.duration = registry.histogram(
+            "http_request_duration_seconds", "HTTP request latency until the last body chunk is sent",
+            ("method", "route"), threadsafe=False,
+        )
+        self.requests = registry.counter(
+            "http_requests_total", "HTTP responses by status code", ("method", "route", "status"),
+            threadsafe=False,
+        )
+        self.response_size = registry.histogram(
+            "http_response_size_bytes", "HTTP response body size as sent (after compression)",
+            ("method", "route"), SIZE_BUCKETS, threadsafe=False,
+        )
+        self.request_size = registry.histogram(
+            "http_request_size_bytes", "HTTP request body size from Content-Length",
+            ("method", "route"), SIZE_BUCKETS, threadsafe=False,
+        )
+        self.in_flight = registry.gauge(
+            "http_requests_in_flight", "HTTP requests currently being served", threadsafe=False
+        ).labels()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] in self.skip_paths:
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+        size = 0
+
+        async def send_counted(message: Message) -> None:
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        self.in_flight.inc()
+        try:
+            await self.app(scope, receive, send_counted)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.in_flight.dec()
+            key = (scope["method"], _route_label(scope, status))
+            self.duration.labels(*key).observe(elapsed)
+            self.response_size.labels(*key).observe(size)
+            self.requests.labels(*key, str(status)).inc()
+            length = _content_length(scope)
+            if length is not None:
+                self.request_size.labels(*key).observe(length)
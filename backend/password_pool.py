@@ -0,0 +1,114 @@
+"""
+bcrypt işlemleri için ayrılmış, boyutu sınırlı thread havuzu.
+
+bcrypt (rounds=12) her çağrıda ~250 ms saf CPU harcar. Bu işler FastAPI'nin
+ortak threadpool'unda koşarsa bir giriş fırtınası ingest/readings isteklerini
+aç bırakır. PasswordPool bu işleri kendi küçük havuzunda çalıştırır:
+
+- bekleyen + çalışan iş sayısı `max_pending`'i aşarsa yeni istek hemen
+  reddedilir (503) — kuyruk sınırsız büyümez,
+- aynı anahtar (hesap veya IP) için aynı anda en fazla `per_key_limit` iş
+  çalışır, fazlası 429 ile reddedilir.
+
+Kuyruk ve anahtar sayaçları yalnızca event loop thread'inde güncellenir;
+worker thread'lerinin dokunduğu `running` sayacı kilitle korunur.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Tuple
+
+
+class PoolRejected(Exception):
+    """İş havuza alınmadı; `status_code` 429 (anahtar limiti) veya 503 (kuyruk dolu)."""
+
+    def __init__(self, status_code: int, reason: str) -> None:
+        super().__init__(reason)
+        self.status_code = status_code
+        self.reason = reason
+
+
+class PasswordPool:
+    def __init__(self, max_workers: int = 2, max_pending: int = 16, per_key_limit: int = 2) -> None:
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.per_key_limit = per_key_limit
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bcrypt")
+        self._pending = 0
+        self._running = 0
+        self._running_lock = threading.Lock()
+        self._active_keys: Dict[str, int] = {}
+        self._stats = {
+            "submitted": 0,
+            "completed": 0,
+            "rejected_queue_full": 0,
+            "rejected_key_limit": 0,
+            "max_pending_seen": 0,
+            "wait_seconds_total": 0.0,
+            "run_seconds_total": 0.0,
+        }
+
+    async def run(self, fn: Callable[..., Any], *args: Any, keys: Iterable[str] = ()) -> Any:
+        keys = tuple(k for k in keys if k)
+        if self._pending >= self.max_pending:
+            self._stats["rejected_queue_full"] += 1
+            raise PoolRejected(503, "Authentication service busy, please retry")
+        if any(self._active_keys.get(k, 0) >= self.per_key_limit for k in keys):
+            self._stats["rejected_key_limit"] += 1
+            raise PoolRejected(429, "Too many concurrent authentication attempts")
+
+        self._pending += 1
+        self._stats["submitted"] += 1
+        self._stats["max_pending_seen"] = max(self._stats["max_pending_seen"], self._pending)
+        for k in keys:
+            self._active_keys[k] = self._active_keys.get(k, 0) + 1
+        try:
+            loop = asyncio.get_running_loop()
+            result, wait_s, run_s = await loop.run_in_executor(
+                self._executor, self._timed, fn, args, time.perf_counter()
+            )
+            self._stats["completed"] += 1
+            self._stats["wait_seconds_total"] += wait_s
+            self._stats["run_seconds_total"] += run_s
+            return result
+        finally:
+            self._pending -= 1
+            for k in keys:
+                left = self._active_keys[k] - 1
+                if left:
+                    self._active_keys[k] = left
+                else:
+                    del self._active_keys[k]
+
+    def _timed(self, fn: Callable[..., Any], args: Tuple[Any, ...], submitted_at: float) -> Tuple[Any, float, float]:
+        started = time.perf_counter()
+        with self._running_lock:
+            self._running += 1
+        try:
+            result = fn(*args)
+        finally:
+            with self._running_lock:
+                self._running -= 1
+        return result, started - submitted_at, time.perf_counter() - started
+
+    def stats(self) -> Dict[str, Any]:
+        completed = self._stats["completed"] or 1
+        return {
+            "workers": self.max_workers,
+            "max_pending": self.max_pending,
+            "per_key_limit": self.per_key_limit,
+            "pending": self._pending,
+            "running": self._running,
+            "queue_depth": max(0, self._pending - self._running),
+            "active_keys": len(self._active_keys),
+            **self._stats,
+            "avg_wait_ms": self._stats["wait_seconds_total"] / completed * 1000,
+            "avg_run_ms": self._stats["run_seconds_total"] / completed * 1000,
+        }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
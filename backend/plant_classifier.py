@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import threading
+import time
 from pathlib import Path
 from typing import Any, Dict, Optional
 
@@ -33,6 +34,13 @@ class PlantClassifier:
     def is_ready(self) -> bool:
         return self.weights_path.exists()
 
+    @property
+    def class_names(self) -> list[str]:
+        """`predict()["probabilities"]` sırasıyla sınıf adları."""
+        self._ensure_loaded()
+        assert self._classes is not None
+        return self._classes
+
     def _load_bundle(self) -> Dict[str, Any]:
         if not self.weights_path.exists():
             raise FileNotFoundError(f"Model weights not found at {self.weights_path}")
@@ -78,14 +86,20 @@ class PlantClassifier:
         )
         return tfm(image).unsqueeze(0)
 
-    def predict(self, image: Image.Image) -> Dict[str, Any]:
+    def predict(self, image: Image.Image, timings: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+        """`timings` verilirse "preprocess" ve "forward" süreleri (sn) yazılır."""
         self._ensure_loaded()
         assert self._model is not None and self._classes is not None
 
+        started = time.perf_counter()
         tensor = self._preprocess(image).to(self._device)
+        preprocessed = time.perf_counter()
         with torch.no_grad():
             logits = self._model(tensor)
             probabilities = torch.softmax(logits, dim=1).cpu().numpy()[0]
+        if timings is not None:
+            timings["preprocess"] = preprocessed - started
+            timings["forward"] = time.perf_counter() - preprocessed
 
         top_idx = int(probabilities.argmax())
         return {
@@ -21,6 +21,7 @@ PlantVillageClassifier ile yüklüyoruz.
 """
 
 import threading
+import time
 from pathlib import Path
 from typing import Any, Dict, Optional
 
@@ -93,6 +94,20 @@ class PlantVillageClassifier:
         """Model dosyası mevcut mu?"""
         return self.weights_path.exists()
 
+    @property
+    def plant_names(self) -> list[str]:
+        """`predict()["plant"]["probabilities"]` sırasıyla bitki adları."""
+        self._ensure_loaded()
+        assert self._plant_names is not None
+        return self._plant_names
+
+    @property
+    def status_names(self) -> list[str]:
+        """`predict()["health"]["probabilities"]` sırasıyla sağlık durumu adları."""
+        self._ensure_loaded()
+        assert self._status_names is not None
+        return self._status_names
+
     def _load_bundle(self) -> Dict[str, Any]:
         if not self.weights_path.exists():
             raise FileNotFoundError(f"PlantVillage model weights not found at {self.weights_path}")
@@ -227,20 +242,26 @@ class PlantVillageClassifier:
         ])
         return tfm(image).unsqueeze(0)
 
-    def predict(self, image: Image.Image) -> Dict[str, Any]:
+    def predict(self, image: Image.Image, timings: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
         """
         Tek görüntü için tahmin üretir.
+        `timings` verilirse "preprocess" ve "forward" süreleri (sn) yazılır.
         """
         self._ensure_loaded()
         assert self._model is not None
         assert self._plant_names is not None
         assert self._status_names is not None
 
+        started = time.perf_counter()
         tensor = self._preprocess(image).to(self._device)
+        preprocessed = time.perf_counter()
         with torch.no_grad():
             plant_logits, health_logits = self._model(tensor)
             plant_probs = torch.softmax(plant_logits, dim=1).cpu().numpy()[0]
             health_probs = torch.softmax(health_logits, dim=1).cpu().numpy()[0]
+        if timings is not None:
+            timings["preprocess"] = preprocessed - started
+            timings["forward"] = time.perf_counter() - preprocessed
 
         plant_idx = int(plant_probs.argmax())
         health_idx = int(health_probs.argmax())
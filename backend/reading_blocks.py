@@ -0,0 +1,287 @@
+"""
+Soğuk okumalar için sıkıştırılmış blok deposu.
+
+Her blok bir sensörün bir saatlik okumalarıdır (`reading_blocks`, anahtar
+(sensor, hour); sensor, `reading_sensors` sözlüğündeki tamsayı id'dir):
+
+- zaman damgaları (epoch µs): ilk değer ve ilk fark başlıkta, geri kalanı
+  delta-of-delta. Zigzag ile işaretsiz yapılır, bloktaki en büyük değere
+  yetecek en dar tamsayı genişliğinde (1/2/4/8 bayt) yazılıp zlib'lenir;
+  düzenli aralıklı seride delta-of-delta ~0 olduğundan çoğu blok 1 bayta iner.
+- değerler (float64): her değer bir öncekiyle XOR'lanır (Gorilla'daki gibi;
+  yavaş değişen seride işaret/üs baytları sıfırlanır), baytlar sütun sütun
+  dizilir (byte shuffle) ve zlib'lenir. Gorilla'nın bit düzeyi kodlaması
+  yerine bu yol seçildi: çözümü döngüsüz, tamamen NumPy ile yapılır.
+- count/min/max/sum blok satırında ayrıca tutulur; tam saatleri kapsayan
+  toplamalar blok çözülmeden SQL ile yapılır.
+
+İki kodlama da kayıpsızdır.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import struct
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import text
+
+HOUR_US = 3_600_000_000
+HOUR_MS = 3_600_000
+_TS_HEADER = struct.Struct("<qqB")
+_WIDTHS = (np.uint8, np.uint16, np.uint32, np.uint64)
+
+
+def _zigzag(x: np.ndarray) -> np.ndarray:
+    return ((x << 1) ^ (x >> 63)).view(np.uint64)
+
+
+def _unzigzag(u: np.ndarray) -> np.ndarray:
+    return (u >> np.uint64(1)).astype(np.int64) ^ -(u & np.uint64(1)).astype(np.int64)
+
+
+def encode_timestamps(ts_us: np.ndarray) -> bytes:
+    """Artan sıralı epoch µs dizisi -> blob."""
+    ts_us = np.asarray(ts_us, dtype=np.int64)
+    ts0 = int(ts_us[0])
+    d0 = int(ts_us[1] - ts_us[0]) if ts_us.size > 1 else 0
+    zz = _zigzag(np.diff(ts_us, n=2)) if ts_us.size > 2 else np.empty(0, dtype=np.uint64)
+    peak = int(zz.max()) if zz.size else 0
+    width = next(i for i, t in enumerate(_WIDTHS) if peak <= np.iinfo(t).max)
+    return _TS_HEADER.pack(ts0, d0, width) + zlib.compress(zz.astype(_WIDTHS[width]).tobytes(), 6)
+
+
+def decode_timestamps(blob: bytes, count: int) -> np.ndarray:
+    ts0, d0, width = _TS_HEADER.unpack_from(blob)
+    out = np.empty(count, dtype=np.int64)
+    out[0] = ts0
+    if count > 1:
+        dd = _unzigzag(np.frombuffer(zlib.decompress(blob[_TS_HEADER.size:]), dtype=_WIDTHS[width]).astype(np.uint64))
+        deltas = np.empty(count - 1, dtype=np.int64)
+        deltas[0] = d0
+        deltas[1:] = d0 + np.cumsum(dd)
+        out[1:] = ts0 + np.cumsum(deltas)
+    return out
+
+
+def encode_values(values: np.ndarray) -> bytes:
+    bits = np.ascontiguousarray(values, dtype=np.float64).view(np.uint64)
+    xored = bits.copy()
+    xored[1:] ^= bits[:-1]
+    # (n, 8) bayt matrisinin transpozu: önce tüm 0. baytlar, sonra 1. baytlar...
+    return zlib.compress(xored.view(np.uint8).reshape(-1, 8).T.tobytes(), 6)
+
+
+def decode_values(blob: bytes, count: int) -> np.ndarray:
+    planes = np.frombuffer(zlib.decompress(blob), dtype=np.uint8).reshape(8, count)
+    xored = np.ascontiguousarray(planes.T).view(np.uint64).ravel()
+    return np.bitwise_xor.accumulate(xored).view(np.float64)
+
+
+def encode_block(ts_us: np.ndarray, values: np.ndarray) -> Tuple[bytes, bytes]:
+    return encode_timestamps(ts_us), encode_values(values)
+
+
+def decode_block(count: int, ts_blob: bytes, val_blob: bytes) -> Tuple[np.ndarray, np.ndarray]:
+    return decode_timestamps(ts_blob, count), decode_values(val_blob, count)
+
+
+def ts_text_array(ts_us: np.ndarray) -> List[str]:
+    """epoch µs -> ReadingDB.ts metin biçimi ("YYYY-MM-DD HH:MM:SS.ffffff")."""
+    return [s.replace("T", " ") for s in np.datetime_as_string(ts_us.view("datetime64[us]"), unit="us").tolist()]
+
+
+class BlockStore:
+    TABLE = "reading_blocks"
+
+    def __init__(self, sensors_table: str) -> None:
+        self.sensors_table = sensors_table
+
+    def create(self, conn) -> None:
+        conn.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {self.TABLE} (sensor INTEGER NOT NULL, hour INTEGER NOT NULL, "
+            f"count INTEGER NOT NULL, vmin FLOAT NOT NULL, vmax FLOAT NOT NULL, vsum FLOAT NOT NULL, "
+            f"ts_blob BLOB NOT NULL, val_blob BLOB NOT NULL, PRIMARY KEY (sensor, hour))"
+        ))
+        conn.execute(text(f"CREATE INDEX IF NOT EXISTS ix_{self.TABLE}_hour ON {self.TABLE} (hour)"))
+
+    # ---- yazma (sync; bakım görevinde çalışır) ----
+    def compact(self, conn, keys: np.ndarray, ts_us: np.ndarray, values: np.ndarray) -> int:
+        """(sensor key, ts µs, value) satırlarını saatlik bloklara yazar; var olan bloklarla birleştirir."""
+        if keys.size == 0:
+            return 0
+        hours = ts_us // HOUR_US
+        order = np.lexsort((ts_us, hours, keys))
+        keys, hours, ts_us, values = keys[order], hours[order], ts_us[order], values[order]
+        starts = np.flatnonzero(np.r_[True, (keys[1:] != keys[:-1]) | (hours[1:] != hours[:-1])])
+        ends = np.r_[starts[1:], keys.size]
+
+        existing = self._existing(conn, int(hours.min()), int(hours.max()))
+        rows = []
+        for start, end in zip(starts.tolist(), ends.tolist()):
+            key, hour = int(keys[start]), int(hours[start])
+            block_ts, block_values = ts_us[start:end], values[start:end]
+            prev = existing.get((key, hour))
+            if prev is not None:
+                old_ts, old_values = decode_block(*prev)
+                merged_ts = np.concatenate((old_ts, block_ts))
+                merged_order = np.argsort(merged_ts, kind="stable")
+                block_ts, block_values = merged_ts[merged_order], np.concatenate((old_values, block_values))[merged_order]
+            ts_blob, val_blob = encode_block(block_ts, block_values)
+            rows.append({
+                "sensor": key, "hour": hour, "count": int(block_ts.size),
+                "vmin": float(block_values.min()), "vmax": float(block_values.max()), "vsum": float(block_values.sum()),
+                "ts_blob": ts_blob, "val_blob": val_blob,
+            })
+        conn.execute(
+            text(f"INSERT OR REPLACE INTO {self.TABLE} (sensor, hour, count, vmin, vmax, vsum, ts_blob, val_blob) "
+                 f"VALUES (:sensor, :hour, :count, :vmin, :vmax, :vsum, :ts_blob, :val_blob)"),
+            rows,
+        )
+        return int(keys.size)
+
+    def _existing(self, conn, lo: int, hi: int) -> Dict[Tuple[int, int], Tuple[int, bytes, bytes]]:
+        rows = conn.execute(
+            text(f"SELECT sensor, hour, count, ts_blob, val_blob FROM {self.TABLE} WHERE hour BETWEEN :lo AND :hi"),
+            {"lo": lo, "hi": hi},
+        )
+        return {(sensor, hour): (count, ts_blob, val_blob) for sensor, hour, count, ts_blob, val_blob in rows}
+
+    def drop_before(self, conn, boundary_ms: int) -> None:
+        conn.execute(text(f"DELETE FROM {self.TABLE} WHERE hour < :h"), {"h": boundary_ms // HOUR_MS})
+
+    def _range_sql(self):
+        # Ayrı alt sorgular: SQLite min/max'ı yalnızca tek başınayken indeksten okur
+        return text(f"SELECT (SELECT min(hour) FROM {self.TABLE}), (SELECT max(hour) FROM {self.TABLE})")
+
+    def range(self, conn) -> Optional[Tuple[int, int]]:
+        """(ilk saatin başı, son saatin sonu) epoch ms; blok yoksa None."""
+        lo, hi = conn.execute(self._range_sql()).one()
+        return None if lo is None else (lo * HOUR_MS, (hi + 1) * HOUR_MS)
+
+    async def range_async(self, conn) -> Optional[Tuple[int, int]]:
+        lo, hi = (await conn.execute(self._range_sql())).one()
+        return None if lo is None else (lo * HOUR_MS, (hi + 1) * HOUR_MS)
+
+    # ---- okuma (async; sorgular event loop'ta, çözme thread'de) ----
+    def _filter_sql(self, filters: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+        conditions, params = [], {}
+        if filters.get("sensor_id"):
+            conditions.append("s.sensor_id = :sid")
+            params["sid"] = filters["sensor_id"]
+        if filters.get("type"):
+            conditions.append("s.type = :type")
+            params["type"] = filters["type"]
+        return "".join(f" AND {c}" for c in conditions), params
+
+    async def top(self, conn, filters: Dict[str, Any], limit: int, first_hour: int, last_hour: int) -> List[Tuple]:
+        """En yeni `limit` satır (id None); bloklar günlük pencerelerle yeniden eskiye çözülür."""
+        extra, params = self._filter_sql(filters)
+        since_ms = filters.get("since")
+        if since_ms is not None:
+            first_hour = max(first_hour, since_ms // HOUR_MS)
+        sql = text(
+            f"SELECT s.sensor_id, s.type, b.count, b.ts_blob, b.val_blob FROM {self.TABLE} b "
+            f"JOIN {self.sensors_table} s ON s.id = b.sensor WHERE b.hour BETWEEN :lo AND :hi{extra}"
+        )
+        rows: List[Tuple] = []
+        hi = last_hour
+        while hi >= first_hour:
+            lo = max(hi - 23, first_hour)
+            blocks = (await conn.execute(sql, {**params, "lo": lo, "hi": hi})).all()
+            if blocks:
+                rows.extend(await asyncio.to_thread(self._decode_rows, blocks, since_ms, limit))
+                rows.sort(key=lambda r: r[4], reverse=True)
+                del rows[limit:]
+                # Daha eski pencereler ilk k'daki en eski satırdan yeni olamaz
+                if len(rows) >= limit and rows[-1][4] >= lo * HOUR_MS:
+                    break
+            hi = lo - 1
+        return rows
+
+    @staticmethod
+    def _decode_rows(blocks, since_ms: Optional[int], limit: int) -> List[Tuple]:
+        out = []
+        for sensor_id, kind, count, ts_blob, val_blob in blocks:
+            ts, values = decode_block(count, ts_blob, val_blob)
+            ts = ts // 1000
+            if since_ms is not None:
+                keep = ts >= since_ms
+                ts, values = ts[keep], values[keep]
+            # Blok içinde artan sıralı: en yeni `limit` tanesi yeter
+            ts, values = ts[-limit:], values[-limit:]
+            out.extend((None, sensor_id, kind, v, t) for t, v in zip(ts.tolist(), values.tolist()))
+        return out
+
+    async def series(self, conn, sensor_type: str, width_ms: int, since_ms: int) -> List[Tuple]:
+        """[(bucket indeksi, count, min, max, sum)]; tam saatler blok özetlerinden, kısmi saat çözülerek."""
+        first_full = -(-since_ms // HOUR_MS)
+        out = list((await conn.execute(
+            text(
+                f"SELECT b.hour * {HOUR_MS} / :width AS bk, sum(b.count), min(b.vmin), max(b.vmax), sum(b.vsum) "
+                f"FROM {self.TABLE} b JOIN {self.sensors_table} s ON s.id = b.sensor "
+                f"WHERE s.type = :type AND b.hour >= :h GROUP BY bk"
+            ),
+            {"width": width_ms, "type": sensor_type, "h": first_full},
+        )).all())
+        if since_ms % HOUR_MS:
+            partial = (await conn.execute(
+                text(
+                    f"SELECT b.count, b.ts_blob, b.val_blob FROM {self.TABLE} b "
+                    f"JOIN {self.sensors_table} s ON s.id = b.sensor WHERE s.type = :type AND b.hour = :h"
+                ),
+                {"type": sensor_type, "h": since_ms // HOUR_MS},
+            )).all()
+            values = [v[ts // 1000 >= since_ms] for ts, v in (decode_block(*row) for row in partial)]
+            values = np.concatenate(values) if values else np.empty(0)
+            if values.size:
+                # Saat, bucket genişliğinin (saat/gün) içinde kalır: kısmi saat tek bucket'a düşer
+                out.append((since_ms // width_ms, int(values.size), float(values.min()), float(values.max()),
+                            float(values.sum())))
+        return out
+
+    def scan(self, conn, after: Tuple[int, int], limit: int) -> Tuple[Optional[Tuple[int, int]], Dict[str, np.ndarray]]:
+        """(hour, sensor) > `after` olan en fazla `limit` bloğu çözer: (son anahtar, kolon dizileri); bitti ise (None, {})."""
+        blocks = conn.execute(
+            text(
+                f"SELECT b.hour, b.sensor, s.sensor_id, s.type, b.count, b.ts_blob, b.val_blob FROM {self.TABLE} b "
+                f"JOIN {self.sensors_table} s ON s.id = b.sensor WHERE (b.hour, b.sensor) > (:h, :s) "
+                f"ORDER BY b.hour, b.sensor LIMIT :limit"
+            ),
+            {"h": after[0], "s": after[1], "limit": limit},
+        ).all()
+        if not blocks:
+            return None, {}
+        ts_parts, value_parts, sensor_ids, types = [], [], [], []
+        for _, _, sensor_id, kind, count, ts_blob, val_blob in blocks:
+            ts, values = decode_block(count, ts_blob, val_blob)
+            ts_parts.append(ts)
+            value_parts.append(values)
+            sensor_ids.append(np.full(count, sensor_id, dtype=object))
+            types.append(np.full(count, kind, dtype=object))
+        batch = {
+            "sensor_id": np.concatenate(sensor_ids),
+            "type": np.concatenate(types),
+            "value": np.concatenate(value_parts),
+            "ts": np.concatenate(ts_parts).view("datetime64[us]"),
+        }
+        return (blocks[-1][0], blocks[-1][1]), batch
+
+    async def sensors(self, conn) -> List[Tuple[str, str]]:
+        return (await conn.execute(text(
+            f"SELECT sensor_id, type FROM {self.sensors_table} WHERE id IN (SELECT DISTINCT sensor FROM {self.TABLE})"
+        ))).all()
+
+    def stats(self, conn) -> Dict[str, Any]:
+        blocks, readings, size = conn.execute(text(
+            f"SELECT count(*), coalesce(sum(count), 0), coalesce(sum(length(ts_blob) + length(val_blob)), 0) "
+            f"FROM {self.TABLE}"
+        )).one()
+        return {
+            "blocks": blocks,
+            "readings": readings,
+            "bytes": size,
+            "bytes_per_reading": round(size / readings, 2) if readings else None,
+        }
@@ -0,0 +1,149 @@
+"""
+Son sensör okumaları için tipli, sensör başına halka tampon.
+
+Her sensör için iki sabit boyutlu NumPy dizisi tutulur: epoch-ns zaman
+damgaları (int64) ve değerler (float32) — okuma başına 12 bayt. Sensör
+id'leri intern edilip küçük tamsayı indekslere eşlenir; okuma başına
+string/dict nesnesi oluşmaz.
+
+`window()` son N dakikayı SQLite'a gitmeden döner. Bir sensör için tampon
+taşmışsa (en eski kayıtlar ezilmişse) `covers()` pencerenin tamamının
+bellekte olup olmadığını söyler; değilse çağıran DB'ye düşmelidir.
+"""
+
+from __future__ import annotations
+
+import sys
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+NEG_INF_NS = np.iinfo(np.int64).min
+
+
+class ReadingRing:
+    def __init__(self, capacity: int = 2048) -> None:
+        self.capacity = capacity
+        self._index: Dict[str, int] = {}
+        self._sensor_ids: List[str] = []
+        self._types: List[str] = []
+        self._ts: List[np.ndarray] = []
+        self._values: List[np.ndarray] = []
+        self._count: List[int] = []
+        # Bu andan itibaren sensörün tüm okumaları tampondadır
+        self._complete_since: List[int] = []
+        self._lock = threading.Lock()
+
+    def _slot(self, sensor_id: str, sensor_type: str) -> int:
+        slot = self._index.get(sensor_id)
+        if slot is None:
+            slot = len(self._sensor_ids)
+            sensor_id = sys.intern(sensor_id)
+            self._index[sensor_id] = slot
+            self._sensor_ids.append(sensor_id)
+            self._types.append(sys.intern(sensor_type))
+            self._ts.append(np.zeros(self.capacity, dtype=np.int64))
+            self._values.append(np.zeros(self.capacity, dtype=np.float32))
+            self._count.append(0)
+            self._complete_since.append(NEG_INF_NS)
+        return slot
+
+    def append(self, sensor_id: str, sensor_type: str, value: float, ts_ns: int) -> None:
+        with self._lock:
+            slot = self._slot(sensor_id, sensor_type)
+            n = self._count[slot]
+            pos = n % self.capacity
+            if n >= self.capacity:
+                # Zaman damgaları sıralı olmayabilir: ezilen kaydın kendi ts'sinden sonrası
+                # ancak tam sayılabilir (sonraki slotun ts'si ondan küçük/eşit olabilir)
+                self._complete_since[slot] = max(self._complete_since[slot], int(self._ts[slot][pos]) + 1)
+            self._ts[slot][pos] = ts_ns
+            self._values[slot][pos] = value
+            self._count[slot] = n + 1
+
+    def seed(self, sensor_id: str, sensor_type: str, rows: List[Tuple[int, float]], complete: bool) -> None:
+        """DB'den yüklenen eski okumaları (eskiden yeniye) yazar; `complete` False ise ilk satırdan önce eksik vardır."""
+        for ts_ns, value in rows[-self.capacity:]:
+            self.append(sensor_id, sensor_type, value, ts_ns)
+        if rows and not complete:
+            with self._lock:
+                slot = self._index[sensor_id]
+                self._complete_since[slot] = max(self._complete_since[slot], int(rows[-self.capacity:][0][0]))
+
+    def _ordered(self, slot: int) -> Tuple[np.ndarray, np.ndarray]:
+        n = self._count[slot]
+        if n <= self.capacity:
+            return self._ts[slot][:n], self._values[slot][:n]
+        head = n % self.capacity
+        ts, values = self._ts[slot], self._values[slot]
+        return np.concatenate((ts[head:], ts[:head])), np.concatenate((values[head:], values[:head]))
+
+    def covers(self, since_ns: int, sensor_id: Optional[str] = None) -> bool:
+        with self._lock:
+            if sensor_id is not None:
+                slot = self._index.get(sensor_id)
+                return slot is None or self._complete_since[slot] <= since_ns
+            return all(c <= since_ns for c in self._complete_since)
+
+    def window(
+        self,
+        since_ns: int,
+        sensor_id: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> List[Tuple[str, str, int, float]]:
+        """`since_ns` ve sonrası okumalar, en yeniden eskiye: (sensor_id, type, ts_ns, value)."""
+        with self._lock:
+            if sensor_id is not None:
+                slot = self._index.get(sensor_id)
+                slots = [] if slot is None else [slot]
+            else:
+                slots = list(range(len(self._sensor_ids)))
+            parts = []
+            for slot in slots:
+                ts, values = self._ordered(slot)
+                # İstemci zaman damgası gönderebildiği için sıralı varsayılmaz
+                mask = ts >= since_ns
+                if mask.any():
+                    parts.append((slot, ts[mask], values[mask]))
+
+        if not parts:
+            return []
+        slot_col = np.concatenate([np.full(ts.size, slot, dtype=np.int32) for slot, ts, _ in parts])
+        ts_col = np.concatenate([ts for _, ts, _ in parts])
+        val_col = np.concatenate([v for _, _, v in parts])
+        order = np.argsort(ts_col, kind="stable")[::-1]
+        if limit is not None:
+            order = order[: max(limit, 0)]
+        sensor_ids, types = self._sensor_ids, self._types
+        # float32 -> float64 artıkları (22.700000762...) yanıtta görünmesin
+        values = np.round(val_col[order].astype(np.float64), 4).tolist()
+        return [
+            (sensor_ids[s], types[s], t, v)
+            for s, t, v in zip(slot_col[order].tolist(), ts_col[order].tolist(), values)
+        ]
+
+    def latest(self) -> Dict[str, Tuple[str, int, float]]:
+        """Sensör başına son okuma: sensor_id -> (type, ts_ns, value)."""
+        with self._lock:
+            out = {}
+            for slot, sensor_id in enumerate(self._sensor_ids):
+                n = self._count[slot]
+                if n:
+                    pos = (n - 1) % self.capacity
+                    out[sensor_id] = (
+                        self._types[slot], int(self._ts[slot][pos]), round(float(self._values[slot][pos]), 4)
+                    )
+            return out
+
+    def nbytes(self) -> int:
+        return sum(ts.nbytes + v.nbytes for ts, v in zip(self._ts, self._values))
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "sensors": len(self._sensor_ids),
+                "capacity_per_sensor": self.capacity,
+                "readings": sum(min(n, self.capacity) for n in self._count),
+                "bytes": self.nbytes(),
+            }
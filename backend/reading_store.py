@@ -0,0 +1,887 @@
+"""
+Sensör okumaları için depolama arayüzü.
+
+`ingest`, `/readings`, `/readings/recent`, `/latest` ve `/stats/series`
+okumaları doğrudan ReadingDB'ye değil bu arayüze yazar/sorar:
+
+- `write`       : tek okuma ekler (sync; ingest threadpool'da çalışır),
+- `readings`    : en yeniden eskiye ham satırlar (isteğe bağlı `since`),
+- `latest`      : tip başına son değer,
+- `series`      : günlük/saatlik count/min/max/avg toplamaları,
+- `drop_before` : saklama süresi dolan okumaları siler.
+
+SQLite tarafı "segment"ler üzerinden sorgulanır. Bölümlemesiz depoda tek
+segment ReadingDB tablosudur. Bölümlemeli depoda (READING_PARTITION) her
+ay/hafta/gün ayrı bir tablodur:
+
+- yazma, okumanın zaman damgasının düştüğü bölüme gider (yoksa oluşturulur),
+- sorgular yalnızca zaman aralığı istenen pencereyle kesişen bölümlere gider
+  (`stats_series(days=7)` aylık bölümlemede en fazla iki tabloya dokunur),
+- saklama süresi dolan bölümler satır satır silinmez, `DROP TABLE` edilir,
+- bölümleme öncesinden kalan ReadingDB salt okunur bir segment olarak
+  sorgulara katılır.
+
+Bölüm id'leri `ordinal << 32` tabanından başlar; id'ler bölümler arasında
+çakışmaz ve DuckDB kopyası segment başına `id > son_id` ile senkronlanır.
+Sıkıştırılan bir bölümün bir sonraki id'si `reading_partition_floors`'a
+yazılır: geç gelen bir okuma bölümü yeniden oluşturursa id'ler oradan devam
+eder, DuckDB'de kalan eski satırların id'lerinin altına düşmez.
+
+Yeni bölümler "keyed" düzendedir: sensor_id/type metni yerine
+`reading_sensors` sözlüğündeki tamsayı anahtar saklanır (eski "wide"
+bölümler olduğu gibi okunur). READING_COMPACT_AFTER_DAYS ile eski bölümler
+sensör başına saatlik sıkıştırılmış bloklara (reading_blocks.py) taşınıp
+düşürülür; bloklar da sorgulara bir segment olarak katılır.
+
+Backend'ler (READING_STORE_BACKEND):
+- `sqlite` : yukarıdaki SQLite deposu (varsayılan),
+- `duckdb` : SQLite asıl kaynak olarak kalır; satırlar arka planda gömülü
+             bir DuckDB dosyasına (kolon bazlı) kopyalanır ve `series`
+             toplamaları oradan yapılır. DuckDB henüz yetişmemişse veya
+             açılamadıysa (dosya başka süreçte kilitli) toplamalar
+             SQLite'tan yapılır.
+
+Zaman: her satır `ts_ms` (epoch milisaniye, INTEGER) taşır; filtreleme,
+sıralama ve bucket'lama (`ts_ms / 86400000`) tamsayı aritmetiğiyle yapılır,
+indeksler de bu kolondadır. `ts` metni (SQLAlchemy DateTime biçimi,
+"YYYY-MM-DD HH:MM:SS.ffffff", naive UTC) ORM uyumluluğu için yazılmaya
+devam eder. `ts_ms` öncesi tablolara `start()` kolonu ekler, id aralıklarıyla
+parça parça doldurur ve metin indekslerini tamsayı indeksleriyle değiştirir.
+Depo satırları `ts_ms` ile döner; ISO biçimlendirme çağırana kalır.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from reading_blocks import HOUR_MS, BlockStore
+
+log = logging.getLogger(__name__)
+
+# bucket -> etiket biçimi (DuckDB strftime ile aynı etiketi üretir) ve genişliği (ms)
+BUCKET_FORMATS = {"daily": "%Y-%m-%d", "hourly": "%Y-%m-%d %H:00:00"}
+BUCKET_MS = {"daily": 24 * HOUR_MS, "hourly": HOUR_MS}
+
+PARTITION_UNITS = ("month", "week", "day")
+PARTITION_ID_BITS = 32
+MAX_ID = 2**63 - 1
+BACKFILL_BATCH = 50_000
+
+# ts metni -> epoch ms; ORM'in yazdığı "YYYY-MM-DD HH:MM:SS.ffffff" biçimi, kesir yoksa 0.
+# Saniye kesirsiz alınır: strftime kesri ms'ye yuvarlayıp saniyeyi bir artırabilir (…59.9996)
+TS_MS_SQL = (
+    "CAST(strftime('%s', substr(ts, 1, 19)) AS INTEGER) * 1000 + "
+    "CASE WHEN substr(ts, 20, 1) = '.' THEN CAST(substr(ts, 21, 3) AS INTEGER) ELSE 0 END"
+)
+
+_EPOCH = datetime(1970, 1, 1)
+
+Row = Tuple[Optional[int], str, str, float, int]  # (id, sensor_id, type, value, ts_ms)
+
+
+def ts_text(dt: datetime) -> str:
+    """Aware/naive (UTC varsayılır) datetime -> ReadingDB.ts metin biçimi."""
+    return naive_utc(dt).strftime("%Y-%m-%d %H:%M:%S.%f")
+
+
+def ts_ms(dt: datetime) -> int:
+    """Aware/naive (UTC varsayılır) datetime -> epoch milisaniye (aşağı yuvarlanır, TS_MS_SQL ile aynı)."""
+    return (naive_utc(dt) - _EPOCH) // timedelta(milliseconds=1)
+
+
+@lru_cache(maxsize=4096)
+def text_ms(value: str) -> int:
+    """Katalogdaki ts metni -> epoch ms (bölüm sınırları; önbellekli)."""
+    return ts_ms(datetime.fromisoformat(value))
+
+
+def naive_utc(dt: datetime) -> datetime:
+    if dt.tzinfo is not None:
+        return dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+
+def bucket_label(index: int, bucket: str) -> str:
+    return (_EPOCH + timedelta(milliseconds=index * BUCKET_MS[bucket])).strftime(BUCKET_FORMATS[bucket])
+
+
+def partition_for(dt: datetime, unit: str) -> Tuple[str, datetime, datetime, int]:
+    """Zaman damgasının bölümü: (tablo adı, başlangıç, bitiş (hariç), ordinal)."""
+    dt = naive_utc(dt)
+    if unit == "month":
+        start = datetime(dt.year, dt.month, 1)
+        end = datetime(dt.year + dt.month // 12, dt.month % 12 + 1, 1)
+        return f"readings_m{dt:%Y%m}", start, end, dt.year * 12 + dt.month - 1
+    day = datetime(dt.year, dt.month, dt.day)
+    if unit == "week":
+        start = day - timedelta(days=day.weekday())
+        iso = start.isocalendar()
+        return f"readings_w{iso.year:04d}{iso.week:02d}", start, start + timedelta(days=7), start.toordinal() // 7
+    if unit == "day":
+        return f"readings_d{day:%Y%m%d}", day, day + timedelta(days=1), day.toordinal()
+    raise ValueError(f"Unknown partition unit: {unit}")
+
+
+def add_column(engine, table: str, column: str, ddl: str) -> bool:
+    """
+    Kolon yoksa ekler; eklediyse True. `--workers N` ile ilk yükseltmede worker'lar
+    aynı anda dener: kaybeden "duplicate column name" alır ve bu, eklenmiş sayılır.
+    """
+    with engine.begin() as conn:
+        columns = {row[1] for row in conn.execute(text(f"PRAGMA table_info({table})"))}
+        if column in columns:
+            return False
+        try:
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+        except OperationalError as e:
+            if "duplicate column name" not in str(e).lower():
+                raise
+            return False
+    return True
+
+
+def migrate_ts_ms(engine, table: str, sensor_col: str) -> int:
+    """`ts_ms` kolonunu ekler, id aralıklarıyla doldurur, indeksleri ts_ms'e taşır; doldurulan satır sayısını döner."""
+    add_column(engine, table, "ts_ms", "INTEGER")
+    with engine.begin() as conn:
+        lo, hi = conn.execute(text(f"SELECT min(id), max(id) FROM {table} WHERE ts_ms IS NULL")).one()
+    filled = 0
+    if lo is not None:
+        log.info("%s: ts_ms dolduruluyor (%s..%s)", table, lo, hi)
+        # Her parça ayrı transaction: yazıcılar uzun süre kilitte beklemez
+        for start in range(lo, hi + 1, BACKFILL_BATCH):
+            with engine.begin() as conn:
+                filled += conn.execute(
+                    text(f"UPDATE {table} SET ts_ms = {TS_MS_SQL} WHERE id BETWEEN :lo AND :hi AND ts_ms IS NULL"),
+                    {"lo": start, "hi": start + BACKFILL_BATCH - 1},
+                ).rowcount
+    with engine.begin() as conn:
+        conn.execute(text(f"CREATE INDEX IF NOT EXISTS ix_{table}_ts_ms ON {table} (ts_ms)"))
+        conn.execute(text(f"CREATE INDEX IF NOT EXISTS ix_{table}_{sensor_col}_ts_ms ON {table} ({sensor_col}, ts_ms)"))
+        conn.execute(text(f"DROP INDEX IF EXISTS ix_{table}_ts"))
+        conn.execute(text(f"DROP INDEX IF EXISTS ix_{table}_sensor_ts"))
+    return filled
+
+
+@dataclass(frozen=True)
+class Segment:
+    table: str
+    start: Optional[int]  # epoch ms, dahil; None = sınırsız
+    end: Optional[int]    # epoch ms, bölümde hariç; eski tabloda en büyük ts_ms
+    id_lo: int
+    id_hi: int
+    layout: str = "wide"  # wide: sensor_id/type metni, keyed: sözlük anahtarı, blocks: sıkıştırılmış
+
+
+class SensorDictionary:
+    """(sensor_id, type) -> tamsayı anahtar; keyed bölümler ve bloklar metin yerine bunu saklar."""
+
+    TABLE = "reading_sensors"
+
+    def __init__(self, engine) -> None:
+        self.engine = engine
+        self._keys: Dict[Tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+
+    def create(self, conn) -> None:
+        conn.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {self.TABLE} (id INTEGER PRIMARY KEY, sensor_id VARCHAR NOT NULL, "
+            f"type VARCHAR NOT NULL, UNIQUE (sensor_id, type))"
+        ))
+        conn.execute(text(f"CREATE INDEX IF NOT EXISTS ix_{self.TABLE}_type ON {self.TABLE} (type)"))
+        self._keys = {(sid, kind): key for key, sid, kind in conn.execute(
+            text(f"SELECT id, sensor_id, type FROM {self.TABLE}")
+        )}
+
+    def key(self, sensor_id: str, sensor_type: str) -> int:
+        key = self._keys.get((sensor_id, sensor_type))
+        if key is None:
+            with self._lock, self.engine.begin() as conn:
+                params = {"sid": sensor_id, "type": sensor_type}
+                conn.execute(text(f"INSERT OR IGNORE INTO {self.TABLE} (sensor_id, type) VALUES (:sid, :type)"), params)
+                key = conn.execute(
+                    text(f"SELECT id FROM {self.TABLE} WHERE sensor_id = :sid AND type = :type"), params
+                ).scalar_one()
+            self._keys[(sensor_id, sensor_type)] = key
+        return key
+
+
+class ReadingStore(ABC):
+    name = "base"
+
+    def start(self) -> None:
+        pass
+
+    @abstractmethod
+    def write(self, sensor_id: str, sensor_type: str, value: float, ts: datetime) -> bool:
+        ...
+
+    @abstractmethod
+    async def readings(
+        self,
+        sensor_id: Optional[str] = None,
+        limit: int = 100,
+        since: Optional[datetime] = None,
+    ) -> List[Dict[str, Any]]:
+        """En yeniden eskiye: {id, sensor_id, type, value, ts_ms}."""
+
+    @abstractmethod
+    async def latest(self, types: Iterable[str]) -> Dict[str, Optional[float]]:
+        ...
+
+    @abstractmethod
+    async def series(self, sensor_type: str, bucket: str, since: datetime) -> List[Dict[str, Any]]:
+        """[{bucket, count, min, max, avg}], bucket etiketine göre artan."""
+
+    @abstractmethod
+    async def sensors(self) -> Dict[str, str]:
+        """sensor_id -> type"""
+
+    @abstractmethod
+    def drop_before(self, cutoff: datetime) -> Optional[datetime]:
+        """`cutoff` öncesini siler; gerçekte silinen sınırı (naive UTC) döner."""
+
+    def compact_before(self, cutoff: datetime) -> int:
+        """`cutoff` öncesini sıkıştırılmış bloklara taşır; taşınan satır sayısını döner."""
+        return 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": self.name}
+
+    def close(self) -> None:
+        pass
+
+
+class SqliteReadingStore(ReadingStore):
+    name = "sqlite"
+    WRITE_ATTEMPTS = 3
+
+    def __init__(self, engine, async_engine, table: str = "readingdb") -> None:
+        self.engine = engine
+        self.async_engine = async_engine
+        self.table = table
+        self.sensor_keys: Optional[SensorDictionary] = None
+        self.blocks: Optional[BlockStore] = None
+
+    def start(self):
+        migrate_ts_ms(self.engine, self.table, "sensor_id")
+
+    # ---- segment seçimi (alt sınıflar bölümlemeyi burada uygular) ----
+    def segments(self, since: Optional[int] = None) -> List[Segment]:
+        """`since` (epoch ms) sonrasını içerebilecek segmentler, bitişe göre yeniden eskiye."""
+        return [Segment(self.table, None, None, 0, MAX_ID)]
+
+    async def _segments(self, conn, since: Optional[int]) -> List[Segment]:
+        return self.segments(since)
+
+    def _target(self, ts: datetime) -> Tuple[str, Optional[int], str]:
+        """Yazılacak tablo, (bölümse) id tabanı ve tablo düzeni."""
+        return self.table, None, "wide"
+
+    def _forget(self, table: str) -> None:
+        """Yazma hatasından sonra: tablo hakkında önbelleğe alınan bilgiyi at (ör. başka worker düşürdü)."""
+
+    # ---- yazma ----
+    def write(self, sensor_id, sensor_type, value, ts):
+        params = {"value": float(value), "ts": ts_text(ts), "ts_ms": ts_ms(ts)}
+        table = self.table
+        for attempt in range(self.WRITE_ATTEMPTS):
+            try:
+                table, id_base, layout = self._target(ts)
+                if layout == "keyed":
+                    stmt = text(
+                        f"INSERT INTO {table} (id, sensor, value, ts, ts_ms) "
+                        f"VALUES ((SELECT coalesce(max(id) + 1, :base) FROM {table}), :key, :value, :ts, :ts_ms)"
+                    )
+                    params.update(key=self.sensor_keys.key(sensor_id, sensor_type), base=id_base)
+                elif id_base is None:
+                    stmt = text(
+                        f"INSERT INTO {table} (sensor_id, type, value, ts, ts_ms) "
+                        f"VALUES (:sid, :type, :value, :ts, :ts_ms)"
+                    )
+                    params.update(sid=sensor_id, type=sensor_type)
+                else:
+                    stmt = text(
+                        f"INSERT INTO {table} (id, sensor_id, type, value, ts, ts_ms) "
+                        f"VALUES ((SELECT coalesce(max(id) + 1, :base) FROM {table}), :sid, :type, :value, :ts, :ts_ms)"
+                    )
+                    params.update(sid=sensor_id, type=sensor_type, base=id_base)
+                with self.engine.begin() as conn:
+                    conn.execute(stmt, params)
+                return True
+            except Exception as e:
+                # SQLite kilitli olabilir (başka worker yazıyor) ya da bölüm başka bir worker'da
+                # düşürülmüş olabilir: tablo bilgisi unutulur, sonraki deneme gerekirse yeniden oluşturur
+                self._forget(table)
+                if attempt < self.WRITE_ATTEMPTS - 1:
+                    time.sleep(0.1 * (attempt + 1))
+                else:
+                    log.error(
+                        "Reading write failed after %d attempts (%s): %s",
+                        self.WRITE_ATTEMPTS, table, e, extra={"sensor_id": sensor_id},
+                    )
+        return False
+
+    # ---- okuma ----
+    def _where(self, seg: Segment, filters: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+        """filters: sensor_id / type / since (epoch ms) -> segment düzenine göre WHERE."""
+        keyed = seg.layout == "keyed"
+        sensors = SensorDictionary.TABLE
+        conditions, params = [], {}
+        if filters.get("sensor_id"):
+            conditions.append(f"sensor IN (SELECT id FROM {sensors} WHERE sensor_id = :sid)" if keyed else "sensor_id = :sid")
+            params["sid"] = filters["sensor_id"]
+        if filters.get("type"):
+            conditions.append(f"sensor IN (SELECT id FROM {sensors} WHERE type = :type)" if keyed else "type = :type")
+            params["type"] = filters["type"]
+        if filters.get("since") is not None:
+            conditions.append("ts_ms >= :since")
+            params["since"] = filters["since"]
+        return (" WHERE " + " AND ".join(conditions) if conditions else ""), params
+
+    async def _top(self, conn, segments: List[Segment], filters: Dict[str, Any], limit: int) -> List[Row]:
+        """Segmentlerden ts_ms'e göre en yeni `limit` satır; ilk k'ya giremeyecek segmentler atlanır."""
+        if limit <= 0:
+            return []
+        rows: List[Row] = []
+        for seg in segments:
+            if len(rows) >= limit and seg.end is not None and seg.end < rows[limit - 1][4]:
+                break
+            if seg.layout == "blocks":
+                lo, hi = seg.start // HOUR_MS, seg.end // HOUR_MS - 1
+                rows.extend(await self.blocks.top(conn, filters, limit, lo, hi))
+            else:
+                where, params = self._where(seg, filters)
+                sql = f"SELECT id, sensor_id, type, value, ts_ms FROM {seg.table}{where} ORDER BY ts_ms DESC LIMIT :limit"
+                if seg.layout == "keyed":
+                    sql = (
+                        f"SELECT p.id, s.sensor_id, s.type, p.value, p.ts_ms FROM "
+                        f"(SELECT id, sensor, value, ts_ms FROM {seg.table}{where} ORDER BY ts_ms DESC LIMIT :limit) p "
+                        f"JOIN {SensorDictionary.TABLE} s ON s.id = p.sensor"
+                    )
+                rows.extend((await conn.execute(text(sql), {**params, "limit": limit})).all())
+            rows.sort(key=lambda r: r[4], reverse=True)
+        return rows[:limit]
+
+    async def readings(self, sensor_id=None, limit=100, since=None):
+        since_ms = ts_ms(since) if since is not None else None
+        filters = {"sensor_id": sensor_id, "since": since_ms}
+        async with self.async_engine.connect() as conn:
+            rows = await self._top(conn, await self._segments(conn, since_ms), filters, limit)
+        return [
+            {"id": rid, "sensor_id": sid, "type": kind, "value": value, "ts_ms": ms}
+            for rid, sid, kind, value, ms in rows
+        ]
+
+    async def latest(self, types):
+        out = {}
+        async with self.async_engine.connect() as conn:
+            segments = await self._segments(conn, None)
+            for kind in types:
+                top = await self._top(conn, segments, {"type": kind}, 1)
+                out[kind] = top[0][3] if top else None
+        return out
+
+    async def series(self, sensor_type, bucket, since):
+        since_ms = ts_ms(since)
+        width = BUCKET_MS[bucket]
+        # bucket indeksi (ts_ms / genişlik) -> [count, min, max, sum]; gün/saat sınırları bölüm
+        # sınırlarıyla hizalı olsa da eski tablo ve bloklar bölümlerle çakışabildiği için birleştirilir
+        merged: Dict[int, List[Any]] = {}
+        async with self.async_engine.connect() as conn:
+            for seg in await self._segments(conn, since_ms):
+                if seg.layout == "blocks":
+                    found = await self.blocks.series(conn, sensor_type, width, since_ms)
+                else:
+                    where, params = self._where(seg, {"type": sensor_type, "since": since_ms})
+                    sql = text(
+                        f"SELECT ts_ms / :width AS b, count(*), min(value), max(value), sum(value) "
+                        f"FROM {seg.table}{where} GROUP BY b"
+                    )
+                    found = (await conn.execute(sql, {**params, "width": width})).all()
+                for b, c, mn, mx, total in found:
+                    acc = merged.get(b)
+                    if acc is None:
+                        merged[b] = [c, mn, mx, total]
+                    else:
+                        acc[0] += c
+                        acc[1] = min(acc[1], mn)
+                        acc[2] = max(acc[2], mx)
+                        acc[3] += total
+        return [
+            {"bucket": bucket_label(b, bucket), "count": c, "min": mn, "max": mx, "avg": total / c}
+            for b, (c, mn, mx, total) in sorted(merged.items())
+        ]
+
+    async def sensors(self):
+        out: Dict[str, str] = {}
+        async with self.async_engine.connect() as conn:
+            for seg in await self._segments(conn, None):
+                if seg.layout == "blocks":
+                    found = await self.blocks.sensors(conn)
+                elif seg.layout == "keyed":
+                    found = (await conn.execute(text(
+                        f"SELECT sensor_id, type FROM {SensorDictionary.TABLE} "
+                        f"WHERE id IN (SELECT DISTINCT sensor FROM {seg.table})"
+                    ))).all()
+                else:
+                    found = (await conn.execute(
+                        text(f"SELECT sensor_id, max(type) FROM {seg.table} GROUP BY sensor_id")
+                    )).all()
+                for sensor_id, kind in found:
+                    out.setdefault(sensor_id, kind)
+        return out
+
+    def rows_after(self, segment: Segment, last_id: int, limit: int) -> List[Row]:
+        """Senkron kopyalama için segmentten id'ye göre artan ham satırlar."""
+        if segment.layout == "keyed":
+            sql = text(
+                f"SELECT p.id, s.sensor_id, s.type, p.value, p.ts_ms FROM {segment.table} p "
+                f"JOIN {SensorDictionary.TABLE} s ON s.id = p.sensor WHERE p.id > :last ORDER BY p.id LIMIT :limit"
+            )
+        else:
+            sql = text(
+                f"SELECT id, sensor_id, type, value, ts_ms FROM {segment.table} "
+                f"WHERE id > :last ORDER BY id LIMIT :limit"
+            )
+        with self.engine.connect() as conn:
+            return conn.execute(sql, {"last": last_id, "limit": limit}).all()
+
+    def block_rows(self, after: Tuple[int, int], limit: int) -> Tuple[Optional[Tuple[int, int]], Dict[str, np.ndarray]]:
+        """Senkron kopyalama için bloklardan (hour, sensor) > `after` olan `limit` blok, kolon dizileri olarak."""
+        if self.blocks is None:
+            return None, {}
+        with self.engine.connect() as conn:
+            return self.blocks.scan(conn, after, limit)
+
+    # ---- saklama ----
+    def drop_before(self, cutoff):
+        boundary = naive_utc(cutoff)
+        with self.engine.begin() as conn:
+            conn.execute(text(f"DELETE FROM {self.table} WHERE ts_ms < :b"), {"b": ts_ms(boundary)})
+        return boundary
+
+
+class PartitionedSqliteStore(SqliteReadingStore):
+    name = "sqlite-partitioned"
+    CATALOG = "reading_partitions"
+    FLOORS = "reading_partition_floors"  # sıkıştırılmış bölüm adı -> yeniden oluşturulursa ilk id
+
+    def __init__(self, engine, async_engine, unit: str = "month", legacy_table: str = "readingdb") -> None:
+        if unit not in PARTITION_UNITS:
+            raise ValueError(f"Unknown READING_PARTITION: {unit}")
+        super().__init__(engine, async_engine, table=legacy_table)
+        self.unit = unit
+        self.sensor_keys = SensorDictionary(engine)
+        self.blocks = BlockStore(SensorDictionary.TABLE)
+        self._known: Dict[str, Tuple[str, int]] = {}  # bölüm adı -> (düzen, ilk id)
+        self._legacy: Optional[Segment] = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self.engine.begin() as conn:
+            conn.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {self.CATALOG} (name TEXT PRIMARY KEY, "
+                f"range_start TEXT NOT NULL, range_end TEXT NOT NULL, id_base INTEGER NOT NULL, "
+                f"layout TEXT NOT NULL DEFAULT 'wide')"
+            ))
+        # Sözlük öncesi bölümler sensor_id/type metniyle kalır
+        add_column(self.engine, self.CATALOG, "layout", "TEXT NOT NULL DEFAULT 'wide'")
+        with self.engine.begin() as conn:
+            self.sensor_keys.create(conn)
+            self.blocks.create(conn)
+            conn.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {self.FLOORS} (name TEXT PRIMARY KEY, next_id INTEGER NOT NULL)"
+            ))
+            self._known = {
+                name: (layout, base)
+                for name, layout, base in conn.execute(text(f"SELECT name, layout, id_base FROM {self.CATALOG}"))
+            }
+        for name, (layout, _) in self._known.items():
+            migrate_ts_ms(self.engine, name, "sensor" if layout == "keyed" else "sensor_id")
+        super().start()
+        with self.engine.connect() as conn:
+            # Bölümleme öncesi ReadingDB artık yazılmaz; aralığı bir kez hesaplanır
+            lo, hi = conn.execute(text(f"SELECT min(ts_ms), max(ts_ms) FROM {self.table}")).one()
+        if lo is not None:
+            self._legacy = Segment(self.table, lo, hi, 0, (1 << PARTITION_ID_BITS) - 1)
+
+    def _catalog_query(self, since: Optional[int]):
+        sql = f"SELECT name, range_start, range_end, id_base, layout FROM {self.CATALOG}"
+        if since is None:
+            return text(sql), {}
+        # Katalog sınırları metin; since ile aynı biçime çevrilip karşılaştırılır
+        return text(sql + " WHERE range_end > :since"), {"since": ts_text(_EPOCH + timedelta(milliseconds=since))}
+
+    def _collect(self, rows, block_range: Optional[Tuple[int, int]], since: Optional[int]) -> List[Segment]:
+        span = 1 << PARTITION_ID_BITS
+        # id_base yeniden oluşturulan bölümde ordinal tabanından büyük olabilir; üst sınır yine ordinalin sonu
+        segments = [
+            Segment(name, text_ms(start), text_ms(end), base, base | (span - 1), layout)
+            for name, start, end, base, layout in rows
+        ]
+        legacy = self._legacy
+        if legacy is not None and (since is None or legacy.end >= since):
+            segments.append(legacy)
+        if block_range is not None and (since is None or block_range[1] > since):
+            segments.append(Segment(BlockStore.TABLE, block_range[0], block_range[1], 0, -1, "blocks"))
+        segments.sort(key=lambda s: s.end, reverse=True)
+        return segments
+
+    def segments(self, since=None):
+        with self.engine.connect() as conn:
+            rows = conn.execute(*self._catalog_query(since)).all()
+            block_range = self.blocks.range(conn)
+        return self._collect(rows, block_range, since)
+
+    async def _segments(self, conn, since):
+        rows = (await conn.execute(*self._catalog_query(since))).all()
+        return self._collect(rows, await self.blocks.range_async(conn), since)
+
+    def _target(self, ts):
+        name, start, end, ordinal = partition_for(ts, self.unit)
+        known = self._known.get(name)
+        if known is None:
+            known = self._create_partition(name, start, end, ordinal << PARTITION_ID_BITS)
+        layout, base = known
+        return name, base, layout
+
+    def _forget(self, table):
+        self._known.pop(table, None)
+
+    def _create_partition(self, name: str, start: datetime, end: datetime, base: int) -> Tuple[str, int]:
+        with self._lock:
+            if name in self._known:
+                return self._known[name]
+            # Tablo ve katalog kaydı aynı transaction'da: diğer worker'lar ya ikisini birden görür ya hiçbirini
+            with self.engine.begin() as conn:
+                conn.execute(text(
+                    f"CREATE TABLE IF NOT EXISTS {name} (id INTEGER PRIMARY KEY, sensor INTEGER NOT NULL, "
+                    f"value FLOAT NOT NULL, ts DATETIME NOT NULL, ts_ms INTEGER NOT NULL)"
+                ))
+                conn.execute(text(f"CREATE INDEX IF NOT EXISTS ix_{name}_ts_ms ON {name} (ts_ms)"))
+                conn.execute(text(f"CREATE INDEX IF NOT EXISTS ix_{name}_sensor_ts_ms ON {name} (sensor, ts_ms)"))
+                conn.execute(
+                    text(f"INSERT OR IGNORE INTO {self.CATALOG} (name, range_start, range_end, id_base, layout) "
+                         f"VALUES (:name, :start, :end, "
+                         f"max(:base, coalesce((SELECT next_id FROM {self.FLOORS} WHERE name = :name), 0)), 'keyed')"),
+                    {"name": name, "start": ts_text(start), "end": ts_text(end), "base": base},
+                )
+                # Başka bir worker aynı bölümü önce oluşturduysa onun düzeni ve tabanı geçerli
+                layout, base = conn.execute(
+                    text(f"SELECT layout, id_base FROM {self.CATALOG} WHERE name = :name"), {"name": name}
+                ).one()
+            self._known[name] = (layout, base)
+            return layout, base
+
+    COMPACT_WINDOW_MS = 24 * HOUR_MS  # sıkıştırma bir bölümü gün gün okur: bellek bir günlük satırla sınırlı
+
+    def compact_before(self, cutoff):
+        """Tamamen `cutoff` öncesinde kalan bölümleri bloklara taşıyıp düşürür (bölüm başına bir transaction)."""
+        _, boundary, _, _ = partition_for(cutoff, self.unit)
+        with self.engine.connect() as conn:
+            names = conn.execute(
+                text(f"SELECT name, layout, id_base, range_start, range_end FROM {self.CATALOG} "
+                     f"WHERE range_end <= :b ORDER BY range_start"),
+                {"b": ts_text(boundary)},
+            ).all()
+        moved = 0
+        for name, layout, base, start, end in names:
+            with self._lock, self.engine.begin() as conn:
+                if layout == "keyed":
+                    sql = text(f"SELECT sensor, value, ts_ms FROM {name} WHERE ts_ms >= :lo AND ts_ms < :hi")
+                else:
+                    conn.execute(text(
+                        f"INSERT OR IGNORE INTO {SensorDictionary.TABLE} (sensor_id, type) "
+                        f"SELECT DISTINCT sensor_id, type FROM {name}"
+                    ))
+                    sql = text(
+                        f"SELECT s.id, p.value, p.ts_ms FROM {name} p JOIN {SensorDictionary.TABLE} s "
+                        f"ON s.sensor_id = p.sensor_id AND s.type = p.type WHERE p.ts_ms >= :lo AND p.ts_ms < :hi"
+                    )
+                # Günler saat sınırında: bir saatlik blok iki pencereye bölünmez
+                for lo in range(text_ms(start), text_ms(end), self.COMPACT_WINDOW_MS):
+                    rows = conn.execute(sql, {"lo": lo, "hi": lo + self.COMPACT_WINDOW_MS}).all()
+                    if not rows:
+                        continue
+                    keys, values, stamps = zip(*rows)
+                    del rows
+                    moved += self.blocks.compact(
+                        conn,
+                        np.fromiter(keys, dtype=np.int64, count=len(keys)),
+                        np.fromiter(stamps, dtype=np.int64, count=len(keys)) * 1000,
+                        np.fromiter(values, dtype=np.float64, count=len(keys)),
+                    )
+                # Bölüm geç gelen bir okumayla yeniden oluşturulursa id'ler buradan devam eder
+                conn.execute(
+                    text(f"INSERT INTO {self.FLOORS} (name, next_id) "
+                         f"SELECT :name, coalesce(max(id) + 1, :base) FROM {name} WHERE true "
+                         f"ON CONFLICT(name) DO UPDATE SET next_id = max(next_id, excluded.next_id)"),
+                    {"name": name, "base": base},
+                )
+                conn.execute(text(f"DROP TABLE IF EXISTS {name}"))
+                conn.execute(text(f"DELETE FROM {self.CATALOG} WHERE name = :name"), {"name": name})
+                self._known.pop(name, None)
+        return moved
+
+    def drop_before(self, cutoff):
+        # Yalnızca tamamen süresi dolmuş bölümler düşürülür: sınır, cutoff'un bölümünün başı
+        _, boundary, _, _ = partition_for(cutoff, self.unit)
+        boundary_ms = ts_ms(boundary)
+        params = {"b": ts_text(boundary)}
+        with self._lock, self.engine.begin() as conn:
+            names = [name for (name,) in conn.execute(
+                text(f"SELECT name FROM {self.CATALOG} WHERE range_end <= :b"), params
+            )]
+            for name in names:
+                conn.execute(text(f"DROP TABLE IF EXISTS {name}"))
+            conn.execute(text(f"DELETE FROM {self.CATALOG} WHERE range_end <= :b"), params)
+            self.blocks.drop_before(conn, boundary_ms)
+            legacy = self._legacy
+            if legacy is not None and legacy.start < boundary_ms:
+                conn.execute(text(f"DELETE FROM {self.table} WHERE ts_ms < :b"), {"b": boundary_ms})
+                self._legacy = None if legacy.end < boundary_ms else Segment(
+                    legacy.table, boundary_ms, legacy.end, legacy.id_lo, legacy.id_hi
+                )
+            for name in names:
+                self._known.pop(name, None)
+        return boundary
+
+    def stats(self):
+        segments = self.segments()
+        with self.engine.connect() as conn:
+            blocks = self.blocks.stats(conn)
+        return {
+            "backend": self.name,
+            "unit": self.unit,
+            "partitions": [s.table for s in segments if s.layout != "blocks" and s.table != self.table],
+            "legacy_table": self._legacy is not None,
+            "sensor_keys": len(self.sensor_keys._keys),
+            "blocks": blocks,
+        }
+
+
+class DuckDBReadingStore(ReadingStore):
+    name = "duckdb"
+
+    def __init__(
+        self,
+        source: SqliteReadingStore,
+        path: Path,
+        *,
+        sync_seconds: float = 5.0,
+        batch_size: int = 100_000,
+        on_sync: Optional[Callable[[], None]] = None,
+    ) -> None:
+        try:
+            import duckdb
+        except ImportError as e:
+            raise RuntimeError("READING_STORE_BACKEND=duckdb requires the 'duckdb' package") from e
+        self._duckdb = duckdb
+        self.source = source
+        self.path = Path(path)
+        self.sync_seconds = sync_seconds
+        self.batch_size = batch_size
+        self.on_sync = on_sync  # yeni satırlar kopyalandıktan sonra (toplamalar değişti)
+        self._con = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.ready = False  # ilk yetişme bitti mi
+        # Boş kopya, sıkıştırılmış bloklardaki eski okumaları bir kez yükler; sonrası id ile izlenir
+        self._load_blocks = False
+        self.stats_counters = {"synced_rows": 0, "sync_errors": 0, "last_sync": None}
+
+    def open(self) -> bool:
+        self.source.start()
+        try:
+            self._con = self._duckdb.connect(str(self.path))
+        except Exception as e:
+            # Tek yazar kilidi: başka bir worker dosyayı tutuyorsa bu süreç SQLite ile devam eder
+            log.warning("DuckDB açılamadı, toplamalar SQLite'tan yapılacak: %s", e)
+            return False
+        self._con.execute(
+            "CREATE TABLE IF NOT EXISTS readings "
+            "(id BIGINT, sensor_id VARCHAR, type VARCHAR, value DOUBLE, ts TIMESTAMP)"
+        )
+        self._load_blocks = self._con.execute("SELECT count(*) FROM readings").fetchone()[0] == 0
+        return True
+
+    def start(self):
+        if self.open():
+            self._thread = threading.Thread(target=self._run, name="duckdb-sync", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.sync()
+                self.ready = True
+            except Exception as e:
+                self.stats_counters["sync_errors"] += 1
+                log.warning("DuckDB senkron hatası: %s", e)
+            self._stop.wait(self.sync_seconds)
+
+    def sync(self) -> int:
+        """SQLite segmentlerindeki yeni satırları toplu kopyalar; kopyalanan satır sayısını döner."""
+        copied = 0
+        for segment in self.source.segments():
+            if segment.layout == "blocks":
+                if self._load_blocks:
+                    copied += self._sync_blocks()
+                continue
+            with self._lock:
+                (last_id,) = self._con.execute(
+                    "SELECT max(id) FROM readings WHERE id BETWEEN ? AND ?", [segment.id_lo, segment.id_hi]
+                ).fetchone()
+            last_id = segment.id_lo - 1 if last_id is None else last_id
+            while True:
+                rows = self.source.rows_after(segment, last_id, self.batch_size)
+                if not rows:
+                    break
+                ids, sensor_ids, types, values, ts = zip(*rows)
+                batch = {
+                    "id": np.fromiter(ids, dtype=np.int64, count=len(rows)),
+                    "sensor_id": np.array(sensor_ids, dtype=object),
+                    "type": np.array(types, dtype=object),
+                    "value": np.fromiter(values, dtype=np.float64, count=len(rows)),
+                    "ts_ms": np.fromiter(ts, dtype=np.int64, count=len(rows)),
+                }
+                with self._lock:
+                    self._con.register("batch", batch)
+                    try:
+                        self._con.execute(
+                            "INSERT INTO readings SELECT id, sensor_id, type, value, epoch_ms(ts_ms) FROM batch"
+                        )
+                    finally:
+                        self._con.unregister("batch")
+                last_id = int(batch["id"][-1])
+                copied += len(rows)
+                if len(rows) < self.batch_size:
+                    break
+        self._load_blocks = False
+        self.stats_counters["synced_rows"] += copied
+        self.stats_counters["last_sync"] = time.time()
+        if copied and self.on_sync is not None:
+            self.on_sync()
+        return copied
+
+    def _sync_blocks(self) -> int:
+        copied, after = 0, (-1, -1)
+        while True:
+            after, batch = self.source.block_rows(after, 1000)
+            if after is None:
+                return copied
+            with self._lock:
+                self._con.register("batch", batch)
+                try:
+                    self._con.execute("INSERT INTO readings SELECT NULL, sensor_id, type, value, ts FROM batch")
+                finally:
+                    self._con.unregister("batch")
+            copied += len(batch["value"])
+
+    def write(self, sensor_id, sensor_type, value, ts):
+        return self.source.write(sensor_id, sensor_type, value, ts)
+
+    async def readings(self, sensor_id=None, limit=100, since=None):
+        return await self.source.readings(sensor_id, limit, since)
+
+    async def latest(self, types):
+        return await self.source.latest(types)
+
+    async def sensors(self):
+        return await self.source.sensors()
+
+    async def series(self, sensor_type, bucket, since):
+        if not self.ready:
+            return await self.source.series(sensor_type, bucket, since)
+        return await asyncio.to_thread(self._series, sensor_type, bucket, since)
+
+    def _series(self, sensor_type: str, bucket: str, since: datetime) -> List[Dict[str, Any]]:
+        unit = "day" if bucket == "daily" else "hour"
+        # Her sorgu kendi cursor'unda: senkron thread'iyle aynı bağlantı nesnesi paylaşılmaz
+        cur = self._con.cursor()
+        try:
+            rows = cur.execute(
+                f"SELECT strftime(b, ?), c, mn, mx, av FROM ("
+                f"  SELECT date_trunc('{unit}', ts) AS b, count(*) AS c, min(value) AS mn,"
+                f"         max(value) AS mx, avg(value) AS av"
+                f"  FROM readings WHERE type = ? AND ts >= ? GROUP BY b"
+                f") ORDER BY b",
+                [BUCKET_FORMATS[bucket], sensor_type, naive_utc(since)],
+            ).fetchall()
+        finally:
+            cur.close()
+        return [{"bucket": b, "count": c, "min": mn, "max": mx, "avg": av} for b, c, mn, mx, av in rows]
+
+    def drop_before(self, cutoff):
+        boundary = self.source.drop_before(cutoff)
+        if boundary is not None and self._con is not None:
+            with self._lock:
+                self._con.execute("DELETE FROM readings WHERE ts < ?", [boundary])
+        return boundary
+
+    def compact_before(self, cutoff):
+        # DuckDB kopyası satırları tutmaya devam eder; yalnızca SQLite tarafı sıkıştırılır
+        return self.source.compact_before(cutoff)
+
+    def stats(self):
+        last_sync = self.stats_counters["last_sync"]
+        return {
+            "backend": self.name,
+            "source": self.source.stats(),
+            "path": str(self.path),
+            "ready": self.ready,
+            "synced_rows": self.stats_counters["synced_rows"],
+            "sync_errors": self.stats_counters["sync_errors"],
+            "seconds_since_sync": None if last_sync is None else round(time.time() - last_sync, 1),
+        }
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+        if self._con is not None:
+            with self._lock:
+                self._con.close()
+
+
+def create_reading_store(
+    backend: str,
+    engine,
+    async_engine,
+    *,
+    base_dir: Path,
+    on_sync: Optional[Callable[[], None]] = None,
+) -> ReadingStore:
+    """READING_STORE_* / READING_PARTITION ortam değişkenlerine göre depo oluşturur."""
+    backend = (backend or "sqlite").lower()
+    unit = os.getenv("READING_PARTITION", "month").lower()
+    if unit == "none":
+        sqlite_store: SqliteReadingStore = SqliteReadingStore(engine, async_engine)
+    else:
+        sqlite_store = PartitionedSqliteStore(engine, async_engine, unit=unit)
+    if backend == "sqlite":
+        return sqlite_store
+    if backend == "duckdb":
+        return DuckDBReadingStore(
+            sqlite_store,
+            Path(os.getenv("READING_DUCKDB_PATH", str(base_dir / "readings.duckdb"))),
+            sync_seconds=float(os.getenv("READING_SYNC_SECONDS", "5")),
+            on_sync=on_sync,
+        )
+    raise ValueError(f"Unknown READING_STORE_BACKEND: {backend}")
@@ -0,0 +1,80 @@
+"""
+Erişim token'ları için bellek içi iptal (revocation) listesi.
+
+Access token'lar kısa ömürlüdür; iptal kayıtları yalnızca token'ın doğal
+olarak sona ereceği ana kadar tutulur, bu yüzden liste küçük kalır ve
+get_current_user() her istekte DB'ye gitmeden karar verebilir:
+
+- `jti` kaydı: tek bir token iptal edilir (logout),
+- kullanıcı kaydı: o kullanıcıya `cutoff` anından önce verilmiş tüm token'lar
+  iptal edilir (hesap kapatma, şifre değişikliği, refresh token yeniden
+  kullanımı).
+
+Kalıcı kaynak veritabanındaki iptal tablosudur; `apply()` o tablodan son
+görülen id'den sonraki satırları alır. Böylece başka bir süreçten (ör.
+manage_users.py) yapılan iptaller en geç bir senkron periyodunda görülür.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+# (id, jti, user_id, revoked_at, expires_at) — zamanlar epoch saniye
+RevocationRow = Tuple[int, Optional[str], Optional[int], float, float]
+
+
+class RevocationList:
+    def __init__(self, on_user_revoked: Optional[Callable[[int], None]] = None) -> None:
+        self.on_user_revoked = on_user_revoked
+        self._jtis: Dict[str, float] = {}
+        self._user_cutoffs: Dict[int, Tuple[float, float]] = {}
+        self._last_id = 0
+        self._lock = threading.Lock()
+
+    @property
+    def last_id(self) -> int:
+        return self._last_id
+
+    def is_revoked(self, jti: Optional[str], user_id: int, issued_at: float) -> bool:
+        if jti is not None and jti in self._jtis:
+            return True
+        cutoff = self._user_cutoffs.get(user_id)
+        return cutoff is not None and issued_at < cutoff[0]
+
+    def revoke_token(self, jti: str, expires_at: float) -> None:
+        with self._lock:
+            self._jtis[jti] = max(expires_at, self._jtis.get(jti, 0.0))
+
+    def revoke_user(self, user_id: int, cutoff: float, expires_at: float) -> None:
+        with self._lock:
+            current = self._user_cutoffs.get(user_id)
+            if current is None or current[0] < cutoff:
+                self._user_cutoffs[user_id] = (cutoff, expires_at)
+        if self.on_user_revoked is not None:
+            self.on_user_revoked(user_id)
+
+    def apply(self, rows: Iterable[RevocationRow]) -> int:
+        """DB'den okunan iptal satırlarını uygular; uygulanan satır sayısını döner."""
+        applied = 0
+        for row_id, jti, user_id, revoked_at, expires_at in rows:
+            if jti:
+                self.revoke_token(jti, expires_at)
+            elif user_id is not None:
+                self.revoke_user(user_id, revoked_at, expires_at)
+            self._last_id = max(self._last_id, row_id)
+            applied += 1
+        return applied
+
+    def prune(self, now: Optional[float] = None) -> None:
+        """Süresi dolmuş token'lara ait kayıtları at — o token'lar zaten geçersiz."""
+        now = time.time() if now is None else now
+        with self._lock:
+            for jti in [j for j, exp in self._jtis.items() if exp < now]:
+                del self._jtis[jti]
+            for user_id in [u for u, (_, exp) in self._user_cutoffs.items() if exp < now]:
+                del self._user_cutoffs[user_id]
+
+    def __len__(self) -> int:
+        return len(self._jtis) + len(self._user_cutoffs)
@@ -0,0 +1,185 @@
+"""
+Sunucu tarafı otomasyon kuralları (eşik + histerezis).
+
+Kurallar AutomationRuleDB'den okunur ve sensör tipine göre indekslenmiş,
+değişmez bir tabloya derlenir; her okuma yalnızca o tipe ait kurallarla
+karşılaştırılır (O(tip başına kural)). Kural durumu artımlıdır:
+
+- pasif kural, değer eşiği geçince (`above`: value > threshold,
+  `below`: value < threshold) aktif olur: alarm yazılır, cihaz açılır,
+- aktif kural, değer histerezis bandının içine dönünce "normal" sayılır;
+  `normal_ok_target` ardışık normal okumadan sonra pasifleşir. Bir cihazı
+  süren tüm kurallar pasifleşince cihaz kapatılır.
+
+Durum (aktiflik, normal serisi) (kural, sensör) çifti başına tutulur:
+`sensor_id` vermeyen bir kural o tipteki her sensör için ayrı değerlendirilir;
+eşik içindeki bir sensörün okumaları, hâlâ eşiği aşan başka bir sensör için
+tetiklenmiş kuralı serbest bırakmaz.
+
+Cihaz manuel moddaysa kural durumu ve alarmlar işlenir, cihaza dokunulmaz.
+Yan etkiler (`actuate`, `alert`) kilit dışında çağrılır.
+"""
+
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+RuleKey = Tuple[int, str]  # (kural id, sensör id)
+
+
+@dataclass(frozen=True)
+class CompiledRule:
+    id: int
+    name: str
+    sensor_type: str
+    sensor_id: Optional[str]
+    device: str
+    direction: str
+    threshold: float
+    release: float          # normal sayılma sınırı (histerezis uygulanmış)
+    alert_level: Optional[str]
+
+    def triggered(self, value: float) -> bool:
+        return value > self.threshold if self.direction == "above" else value < self.threshold
+
+    def released(self, value: float) -> bool:
+        return value <= self.release if self.direction == "above" else value >= self.release
+
+
+def compile_rule(row: Any) -> CompiledRule:
+    hysteresis = abs(row.hysteresis or 0.0)
+    release = row.threshold - hysteresis if row.direction == "above" else row.threshold + hysteresis
+    return CompiledRule(
+        id=row.id,
+        name=row.name,
+        sensor_type=row.sensor_type,
+        sensor_id=row.sensor_id or None,
+        device=row.device,
+        direction=row.direction,
+        threshold=float(row.threshold),
+        release=float(release),
+        alert_level=row.alert_level or None,
+    )
+
+
+class RuleEngine:
+    def __init__(
+        self,
+        actuate: Callable[[str, str, str], Any],
+        alert: Callable[[str, str, str], None],
+        is_auto: Callable[[str], bool],
+        normal_ok_target: int = 5,
+    ) -> None:
+        self.actuate = actuate
+        self.alert = alert
+        self.is_auto = is_auto
+        self.normal_ok_target = normal_ok_target
+        self._index: Dict[str, Tuple[CompiledRule, ...]] = {}
+        self._compiled: Dict[int, CompiledRule] = {}
+        self._active: Set[RuleKey] = set()
+        self._streaks: Dict[RuleKey, int] = {}
+        self._device_rules: Dict[str, Set[RuleKey]] = {}
+        self._lock = threading.Lock()
+
+    def load(self, rows: Iterable[Any]) -> None:
+        """Etkin kuralları derleyip indeksi tek seferde değiştirir; silinen/değişen kuralların durumu düşer."""
+        index: Dict[str, List[CompiledRule]] = {}
+        for row in rows:
+            if row.enabled:
+                rule = compile_rule(row)
+                index.setdefault(rule.sensor_type, []).append(rule)
+        frozen = {sensor_type: tuple(rules) for sensor_type, rules in index.items()}
+        compiled = {rule.id: rule for rules in frozen.values() for rule in rules}
+        # Yalnızca tanımı değişmeyen kuralların durumu korunur
+        live = {rid for rid, rule in compiled.items() if self._compiled.get(rid) == rule}
+        released_devices = []
+        with self._lock:
+            self._index = frozen
+            self._compiled = compiled
+            self._active = {key for key in self._active if key[0] in live}
+            self._streaks = {key: n for key, n in self._streaks.items() if key[0] in live}
+            for device, keys in self._device_rules.items():
+                kept = {key for key in keys if key[0] in live}
+                if keys and not kept:
+                    released_devices.append(device)
+                self._device_rules[device] = kept
+        for device in released_devices:
+            if self.is_auto(device):
+                self.actuate(device, "off", "automation")
+
+    def evaluate(self, sensor_id: str, sensor_type: str, value: float) -> List[Dict[str, Any]]:
+        """Okumayı kurallara uygular; tetiklenen/serbest kalan kural olaylarını döner."""
+        rules = self._index.get(sensor_type)
+        if not rules:
+            return []
+        events: List[Dict[str, Any]] = []
+        actions: List[Tuple[str, str]] = []
+        with self._lock:
+            for rule in rules:
+                if rule.sensor_id is not None and rule.sensor_id != sensor_id:
+                    continue
+                key = (rule.id, sensor_id)
+                if key not in self._active:
+                    if rule.triggered(value):
+                        self._active.add(key)
+                        self._streaks[key] = 0
+                        device_rules = self._device_rules.setdefault(rule.device, set())
+                        if not device_rules:
+                            actions.append((rule.device, "on"))
+                        device_rules.add(key)
+                        events.append({"rule": rule, "event": "triggered", "value": value})
+                elif rule.released(value):
+                    streak = self._streaks.get(key, 0) + 1
+                    if streak >= self.normal_ok_target:
+                        self._active.discard(key)
+                        self._streaks.pop(key, None)
+                        device_rules = self._device_rules.get(rule.device, set())
+                        device_rules.discard(key)
+                        if not device_rules:
+                            actions.append((rule.device, "off"))
+                        events.append({"rule": rule, "event": "released", "value": value})
+                    else:
+                        self._streaks[key] = streak
+                else:
+                    self._streaks[key] = 0
+
+        for device, action in actions:
+            if self.is_auto(device):
+                self.actuate(device, action, "automation")
+        for event in events:
+            rule = event["rule"]
+            if event["event"] == "triggered" and rule.alert_level:
+                comparison = ">" if rule.direction == "above" else "<"
+                self.alert(
+                    rule.alert_level,
+                    f"rule:{rule.name}",
+                    f"{sensor_id} {sensor_type}={value:g} {comparison} {rule.threshold:g} → {rule.device} on",
+                )
+        return events
+
+    def resume(self, device: str) -> bool:
+        """
+        Cihaz auto moda geçtiğinde çağrılır (mod değişimi durumu "off"a çeker).
+        Cihazın etkin kuralı varsa yeniden açılır; manuel modda tetiklenip
+        engellenen kurallar da böylece uygulanır. Açtıysa True.
+        """
+        with self._lock:
+            active = bool(self._device_rules.get(device))
+        if active and self.is_auto(device):
+            self.actuate(device, "on", "automation")
+            return True
+        return False
+
+    def state(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "rules": sum(len(r) for r in self._index.values()),
+                "by_sensor_type": {t: len(r) for t, r in self._index.items()},
+                "active_rules": [{"rule_id": rid, "sensor_id": sid} for rid, sid in sorted(self._active)],
+                "streaks": [
+                    {"rule_id": rid, "sensor_id": sid, "ok": n} for (rid, sid), n in sorted(self._streaks.items())
+                ],
+                "devices": {d: sorted({rid for rid, _ in keys}) for d, keys in self._device_rules.items() if keys},
+            }
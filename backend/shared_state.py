@@ -0,0 +1,426 @@
+"""
+uvicorn `--workers N` ile çalışırken süreçler arası paylaşılan durum.
+
+Üç tür veri paylaşılır:
+- anahtar/değer (actuator durumu gibi): `get`, `set`, `add` (yoksa yaz),
+  `compare_and_set` (değer hâlâ beklenen ise yaz),
+- sınırlı akışlar (son okumalar, alarmlar): `append`, `recent`,
+- tamsayı sayaçlar (veri sürümleri gibi): `incr`, `counter`.
+
+Backend'ler (SHARED_STATE_BACKEND):
+- `local`  : süreç içi dict + deque (tek worker, varsayılan),
+- `sqlite` : WAL modunda ayrı bir SQLite dosyası; tüm worker'lar aynı dosyayı kullanır,
+- `shm`    : akışlar paylaşımlı bellekte sabit slotlu halka tamponda,
+             anahtar/değer SQLite'ta,
+- `redis`  : Redis uyumlu sunucu (redis paketi gerekir); yerel test için
+             tools/fake_redis.py kullanılabilir.
+
+Değerler JSON'a çevrilebilir sözlüklerdir.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import struct
+import threading
+from abc import ABC, abstractmethod
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Deque, Dict, Iterator, List, Mapping, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: süreçler arası kilit yok, yalnızca thread kilidi
+    fcntl = None
+
+
+class SharedState(ABC):
+    name = "base"
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        ...
+
+    @abstractmethod
+    def add(self, key: str, value: Dict[str, Any]) -> bool:
+        """Anahtar yoksa yazar; yazdıysa True."""
+
+    @abstractmethod
+    def compare_and_set(self, key: str, expected: Optional[Dict[str, Any]], value: Dict[str, Any]) -> bool:
+        """
+        Anahtarın değeri `expected` ise (None: anahtar yok) `value` yazar; yazdıysa
+        True. Oku-değiştir-yaz döngüleri başka süreçlerin yazdıklarını ezmesin diye.
+        """
+
+    @abstractmethod
+    def append(self, stream: str, item: Dict[str, Any]) -> None:
+        ...
+
+    @abstractmethod
+    def recent(self, stream: str, limit: int = 100) -> List[Dict[str, Any]]:
+        """En yeniden eskiye en fazla `limit` kayıt; `limit <= 0` için boş liste."""
+
+    @abstractmethod
+    def incr(self, key: str) -> int:
+        """Sayacı atomik olarak bir artırır; yeni değeri döner."""
+
+    @abstractmethod
+    def counter(self, key: str) -> int:
+        """Sayacın değeri; hiç artırılmadıysa 0."""
+
+    def close(self) -> None:
+        pass
+
+
+class LocalState(SharedState):
+    name = "local"
+
+    def __init__(self, streams: Mapping[str, int]) -> None:
+        self._kv: Dict[str, Dict[str, Any]] = {}
+        self._streams: Dict[str, Deque[Dict[str, Any]]] = {s: deque(maxlen=n) for s, n in streams.items()}
+        self._counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        value = self._kv.get(key)
+        return dict(value) if value is not None else None
+
+    def set(self, key, value):
+        self._kv[key] = dict(value)
+
+    def add(self, key, value):
+        with self._lock:
+            if key in self._kv:
+                return False
+            self._kv[key] = dict(value)
+            return True
+
+    def compare_and_set(self, key, expected, value):
+        with self._lock:
+            if self._kv.get(key) != expected:
+                return False
+            self._kv[key] = dict(value)
+            return True
+
+    def append(self, stream, item):
+        self._streams[stream].append(item)
+
+    def recent(self, stream, limit=100):
+        if limit <= 0:
+            return []
+        items = list(self._streams[stream])
+        return items[::-1][:limit]
+
+    def incr(self, key):
+        with self._lock:
+            value = self._counters[key] = self._counters.get(key, 0) + 1
+        return value
+
+    def counter(self, key):
+        return self._counters.get(key, 0)
+
+
+class SqliteState(SharedState):
+    name = "sqlite"
+    TRIM_EVERY = 100
+
+    def __init__(self, path: Path, streams: Mapping[str, int]) -> None:
+        self.path = Path(path)
+        self.streams = dict(streams)
+        self._conn = sqlite3.connect(str(self.path), timeout=30.0, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS stream (id INTEGER PRIMARY KEY AUTOINCREMENT, stream TEXT NOT NULL, payload TEXT NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_stream_stream_id ON stream (stream, id)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS counter (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        self._lock = threading.Lock()
+        self._appends: Dict[str, int] = {}
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM kv WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, key, value):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO kv (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                (key, json.dumps(value)),
+            )
+
+    def add(self, key, value):
+        with self._lock:
+            cur = self._conn.execute("INSERT OR IGNORE INTO kv (key, value) VALUES (?, ?)", (key, json.dumps(value)))
+        return cur.rowcount == 1
+
+    def compare_and_set(self, key, expected, value):
+        with self._lock:
+            # BEGIN IMMEDIATE yazma kilidini okumadan önce alır: başka süreç arada yazamaz
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute("SELECT value FROM kv WHERE key = ?", (key,)).fetchone()
+                current = json.loads(row[0]) if row else None
+                if current != expected:
+                    return False
+                self._conn.execute(
+                    "INSERT INTO kv (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                    (key, json.dumps(value)),
+                )
+                return True
+            finally:
+                self._conn.execute("COMMIT")
+
+    def append(self, stream, item):
+        with self._lock:
+            self._conn.execute("INSERT INTO stream (stream, payload) VALUES (?, ?)", (stream, json.dumps(item)))
+            appends = self._appends[stream] = self._appends.get(stream, 0) + 1
+            if appends % self.TRIM_EVERY == 0:
+                # Akışı kabaca maxlen'de tut (her insert'te silmek yerine toplu). id dizisi tüm
+                # akışlarda ortak: sınır akışın kendi maxlen'inci en yeni kaydıdır
+                self._conn.execute(
+                    "DELETE FROM stream WHERE stream = ? AND id < "
+                    "(SELECT id FROM stream WHERE stream = ? ORDER BY id DESC LIMIT 1 OFFSET ?)",
+                    (stream, stream, self.streams[stream] - 1),
+                )
+
+    def recent(self, stream, limit=100):
+        limit = min(limit, self.streams[stream])
+        if limit <= 0:
+            return []  # SQLite LIMIT -1 ve Redis LRANGE 0 -1 tüm akışı döndürürdü
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT payload FROM stream WHERE stream = ? ORDER BY id DESC LIMIT ?", (stream, limit)
+            ).fetchall()
+        return [json.loads(r[0]) for r in rows]
+
+    def incr(self, key):
+        with self._lock:
+            (value,) = self._conn.execute(
+                "INSERT INTO counter (key, value) VALUES (?, 1) "
+                "ON CONFLICT(key) DO UPDATE SET value = value + 1 RETURNING value",
+                (key,),
+            ).fetchone()
+        return value
+
+    def counter(self, key):
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM counter WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else 0
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class ShmRing:
+    """
+    Paylaşımlı bellekte sabit slotlu halka tampon.
+
+    Yerleşim: 8 bayt yazma sayacı + `slots` adet `slot_size` baytlık slot;
+    her slot 2 bayt uzunluk + JSON. Süreçler arası erişim bir kilit
+    dosyası üzerinden flock ile sıralanır. Slota sığmayan kayıt reddedilir.
+    """
+
+    HEADER = struct.Struct("<Q")
+    LENGTH = struct.Struct("<H")
+
+    def __init__(self, name: str, slots: int, slot_size: int = 256, lock_dir: Optional[Path] = None) -> None:
+        from multiprocessing import shared_memory
+
+        self.name = name
+        self.slots = slots
+        self.slot_size = slot_size
+        size = self.HEADER.size + slots * slot_size
+        try:
+            self._shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+            self._shm.buf[: self.HEADER.size] = self.HEADER.pack(0)
+        except FileExistsError:
+            self._shm = shared_memory.SharedMemory(name=name)
+            if self._shm.size < size:
+                raise RuntimeError(f"Shared memory segment {name} is smaller than configured ring")
+        self._untrack()
+        lock_dir = Path(lock_dir or os.getenv("TMPDIR", "/tmp"))
+        self._lock_file = open(lock_dir / f"{name}.lock", "a+b")
+        self._thread_lock = threading.Lock()
+
+    def _untrack(self) -> None:
+        # resource_tracker, segmenti oluşturan worker çıkınca siler; diğer worker'lar kullanmaya devam eder
+        try:
+            from multiprocessing import resource_tracker
+
+            resource_tracker.unregister(self._shm._name, "shared_memory")
+        except Exception:
+            pass
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        with self._thread_lock:
+            if fcntl is not None:
+                fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _slot_offset(self, seq: int) -> int:
+        return self.HEADER.size + (seq % self.slots) * self.slot_size
+
+    def append(self, payload: bytes) -> bool:
+        if len(payload) > self.slot_size - self.LENGTH.size:
+            return False
+        buf = self._shm.buf
+        with self._locked():
+            (seq,) = self.HEADER.unpack_from(buf, 0)
+            offset = self._slot_offset(seq)
+            self.LENGTH.pack_into(buf, offset, len(payload))
+            start = offset + self.LENGTH.size
+            buf[start : start + len(payload)] = payload
+            self.HEADER.pack_into(buf, 0, seq + 1)
+        return True
+
+    def recent(self, limit: int) -> List[bytes]:
+        buf = self._shm.buf
+        out = []
+        with self._locked():
+            (seq,) = self.HEADER.unpack_from(buf, 0)
+            for i in range(min(limit, seq, self.slots)):
+                offset = self._slot_offset(seq - 1 - i)
+                (length,) = self.LENGTH.unpack_from(buf, offset)
+                start = offset + self.LENGTH.size
+                out.append(bytes(buf[start : start + length]))
+        return out
+
+    def close(self) -> None:
+        self._shm.close()
+        self._lock_file.close()
+
+
+class ShmState(SharedState):
+    name = "shm"
+
+    def __init__(self, prefix: str, sqlite_path: Path, streams: Mapping[str, int], slot_size: int = 256) -> None:
+        self._kv = SqliteState(sqlite_path, {})
+        self._rings = {s: ShmRing(f"{prefix}-{s}", n, slot_size) for s, n in streams.items()}
+
+    def get(self, key):
+        return self._kv.get(key)
+
+    def set(self, key, value):
+        self._kv.set(key, value)
+
+    def add(self, key, value):
+        return self._kv.add(key, value)
+
+    def compare_and_set(self, key, expected, value):
+        return self._kv.compare_and_set(key, expected, value)
+
+    def append(self, stream, item):
+        self._rings[stream].append(json.dumps(item, separators=(",", ":")).encode("utf-8"))
+
+    def recent(self, stream, limit=100):
+        if limit <= 0:
+            return []
+        return [json.loads(p) for p in self._rings[stream].recent(limit)]
+
+    def incr(self, key):
+        return self._kv.incr(key)
+
+    def counter(self, key):
+        return self._kv.counter(key)
+
+    def close(self):
+        for ring in self._rings.values():
+            ring.close()
+        self._kv.close()
+
+
+class RedisState(SharedState):
+    name = "redis"
+
+    def __init__(self, url: str, streams: Mapping[str, int], prefix: str = "aa") -> None:
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("SHARED_STATE_BACKEND=redis requires the 'redis' package") from e
+        self._client = redis.Redis.from_url(url)
+        self.streams = dict(streams)
+        self.prefix = prefix
+
+    def _key(self, kind: str, name: str) -> str:
+        return f"{self.prefix}:{kind}:{name}"
+
+    def get(self, key):
+        raw = self._client.get(self._key("kv", key))
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, key, value):
+        self._client.set(self._key("kv", key), json.dumps(value))
+
+    def add(self, key, value):
+        return bool(self._client.set(self._key("kv", key), json.dumps(value), nx=True))
+
+    def compare_and_set(self, key, expected, value):
+        import redis
+
+        name = self._key("kv", key)
+        with self._client.pipeline() as pipe:
+            try:
+                pipe.watch(name)
+                raw = pipe.get(name)
+                if (json.loads(raw) if raw is not None else None) != expected:
+                    return False
+                pipe.multi()
+                pipe.set(name, json.dumps(value))
+                pipe.execute()  # WATCH'tan sonra anahtar değiştiyse WatchError
+                return True
+            except redis.WatchError:
+                return False
+
+    def append(self, stream, item):
+        key = self._key("stream", stream)
+        pipe = self._client.pipeline(transaction=False)
+        pipe.lpush(key, json.dumps(item))
+        pipe.ltrim(key, 0, self.streams[stream] - 1)
+        pipe.execute()
+
+    def recent(self, stream, limit=100):
+        limit = min(limit, self.streams[stream])
+        if limit <= 0:
+            return []  # SQLite LIMIT -1 ve Redis LRANGE 0 -1 tüm akışı döndürürdü
+        return [json.loads(raw) for raw in self._client.lrange(self._key("stream", stream), 0, limit - 1)]
+
+    def incr(self, key):
+        return int(self._client.incr(self._key("counter", key)))
+
+    def counter(self, key):
+        raw = self._client.get(self._key("counter", key))
+        return int(raw) if raw is not None else 0
+
+    def close(self):
+        self._client.close()
+
+
+def create_shared_state(backend: str, streams: Mapping[str, int], *, base_dir: Path) -> SharedState:
+    """SHARED_STATE_* ortam değişkenlerine göre backend oluşturur."""
+    backend = (backend or "local").lower()
+    sqlite_path = Path(os.getenv("SHARED_STATE_SQLITE", str(base_dir / "shared_state.db")))
+    if backend == "local":
+        return LocalState(streams)
+    if backend == "sqlite":
+        return SqliteState(sqlite_path, streams)
+    if backend == "shm":
+        return ShmState(os.getenv("SHARED_STATE_SHM_PREFIX", "aa-state"), sqlite_path, streams)
+    if backend == "redis":
+        return RedisState(os.getenv("SHARED_STATE_REDIS_URL", "redis://127.0.0.1:6379/0"), streams)
+    raise ValueError(f"Unknown SHARED_STATE_BACKEND: {backend}")
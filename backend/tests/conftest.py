@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# backend modülleri düz import edilir (main.py ile aynı): backend/ dizinini yola ekle
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,72 @@
+"""DataVersions: event loop dışında okuma, önbellek süresi ve dönem yenileme."""
+
+import asyncio
+
+from http_cache import DataVersions
+from shared_state import LocalState
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class CountingState(LocalState):
+    def __init__(self):
+        super().__init__({})
+        self.reads = 0
+
+    def counter(self, key):
+        self.reads += 1
+        return super().counter(key)
+
+
+def test_current_is_cached_for_ttl_and_local_bumps_are_immediate():
+    shared, clock = CountingState(), Clock()
+    versions = DataVersions(shared, ttl=1.0, clock=clock)
+
+    async def scenario():
+        first = dict((await versions.current(["alerts"]))[1])
+        versions.bump("alerts")
+        local = dict((await versions.current(["alerts"]))[1])
+        shared.incr("version:alerts")  # başka bir worker
+        cached = dict((await versions.current(["alerts"]))[1])
+        clock.now = 1.0
+        fresh = dict((await versions.current(["alerts"]))[1])
+        return first, local, cached, fresh
+
+    first, local, cached, fresh = asyncio.run(scenario())
+    assert first == {"alerts": 0}
+    assert local == {"alerts": 1}
+    assert cached == {"alerts": 1}
+    assert fresh == {"alerts": 2}
+    assert shared.reads == 2
+
+
+def test_concurrent_requests_share_one_refresh():
+    shared = CountingState()
+    versions = DataVersions(shared, ttl=1.0)
+
+    async def scenario():
+        await asyncio.gather(*(versions.current(["readings", "alerts"]) for _ in range(20)))
+
+    asyncio.run(scenario())
+    assert shared.reads == 2  # alan başına bir okuma
+
+
+def test_epoch_is_renewed_after_runtime_flush():
+    shared, clock = LocalState({}), Clock()
+    versions = DataVersions(shared, ttl=1.0, clock=clock)
+    for _ in range(3):
+        versions.bump("alerts")
+    before = asyncio.run(versions.current(["alerts"]))[0]
+
+    shared._kv.clear()  # Redis FLUSHDB gibi: dönem ve sayaçlar silinir
+    shared._counters.clear()
+    clock.now = 5.0
+    epoch, current = asyncio.run(versions.current(["alerts"]))
+    assert epoch != before
+    assert current == {"alerts": 0}  # önbellekteki eski sürüm yeni dönemde taşınmaz
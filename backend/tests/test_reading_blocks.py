@@ -0,0 +1,132 @@
+"""reading_blocks kodlamasının kayıpsızlığı ve blok birleştirme."""
+
+import numpy as np
+import pytest
+from sqlalchemy import create_engine, text
+
+from reading_blocks import (
+    HOUR_US,
+    BlockStore,
+    _TS_HEADER,
+    _WIDTHS,
+    decode_block,
+    decode_timestamps,
+    decode_values,
+    encode_block,
+    encode_timestamps,
+    encode_values,
+)
+
+T0 = 1_700_000_000_000_000  # epoch µs
+
+
+def roundtrip(ts, values):
+    ts = np.asarray(ts, dtype=np.int64)
+    values = np.asarray(values, dtype=np.float64)
+    out_ts, out_values = decode_block(ts.size, *encode_block(ts, values))
+    np.testing.assert_array_equal(out_ts, ts)
+    # Bit düzeyinde eşitlik: NaN yükü ve -0.0 işareti de korunmalı
+    np.testing.assert_array_equal(out_values.view(np.uint64), values.view(np.uint64))
+
+
+@pytest.mark.parametrize("n", [1, 2, 3, 10, 1000])
+def test_roundtrip_lengths(n):
+    rng = np.random.default_rng(n)
+    ts = T0 + np.cumsum(rng.integers(1, 20_000_000, n))
+    roundtrip(ts, rng.normal(20.0, 5.0, n))
+
+
+def test_single_reading():
+    roundtrip([T0], [21.5])
+
+
+def test_two_readings_keep_first_delta():
+    roundtrip([T0, T0 + 10_000_000], [1.0, 2.0])
+
+
+def test_duplicate_timestamps():
+    roundtrip([T0, T0, T0, T0 + 1], [1.0, 1.0, 2.0, 3.0])
+
+
+def test_special_floats():
+    values = [0.0, -0.0, np.nan, -np.nan, np.inf, -np.inf, 5e-324, np.finfo(np.float64).max, 1.0]
+    ts = T0 + np.arange(len(values)) * 1_000_000
+    roundtrip(ts, values)
+
+
+def test_nan_payload_is_preserved():
+    payload = np.array([0x7FF8000000000001, 0xFFF0000000000ABC], dtype=np.uint64).view(np.float64)
+    roundtrip([T0, T0 + 1], payload)
+
+
+@pytest.mark.parametrize("jump, width", [(0, 0), (100, 0), (1_000, 1), (100_000, 2), (10**10, 3)])
+def test_zigzag_widths(jump, width):
+    # Düzenli seride tek bir sıçrama: delta-of-delta +jump ve -jump olur
+    ts = T0 + np.arange(20, dtype=np.int64) * 1_000_000
+    ts[10:] += jump
+    blob = encode_timestamps(ts)
+    assert _TS_HEADER.unpack_from(blob)[2] == width
+    np.testing.assert_array_equal(decode_timestamps(blob, ts.size), ts)
+
+
+def test_negative_deltas_and_extremes():
+    ts = np.array([T0, T0 - 5, T0 + 7, T0 - 2**40, T0 + 2**41], dtype=np.int64)
+    np.testing.assert_array_equal(decode_timestamps(encode_timestamps(ts), ts.size), ts)
+
+
+def test_values_roundtrip_without_timestamps():
+    values = np.array([21.0, 21.0, 21.1, -3.5, 0.0])
+    np.testing.assert_array_equal(decode_values(encode_values(values), values.size), values)
+
+
+def test_width_table_covers_uint64():
+    assert np.iinfo(_WIDTHS[-1]).max == 2**64 - 1
+
+
+@pytest.fixture
+def conn():
+    engine = create_engine("sqlite://")
+    with engine.begin() as c:
+        c.execute(text("CREATE TABLE reading_sensors (id INTEGER PRIMARY KEY, sensor_id VARCHAR, type VARCHAR)"))
+        BlockStore("reading_sensors").create(c)
+        yield c
+
+
+def stored(conn, sensor, hour):
+    count, ts_blob, val_blob, vmin, vmax, vsum = conn.execute(
+        text("SELECT count, ts_blob, val_blob, vmin, vmax, vsum FROM reading_blocks WHERE sensor = :s AND hour = :h"),
+        {"s": sensor, "h": hour},
+    ).one()
+    ts, values = decode_block(count, ts_blob, val_blob)
+    return ts, values, (vmin, vmax, vsum)
+
+
+def test_compact_splits_by_sensor_and_hour(conn):
+    store = BlockStore("reading_sensors")
+    hour = T0 // HOUR_US
+    ts = np.array([hour * HOUR_US + 5, hour * HOUR_US + 1, (hour + 1) * HOUR_US, hour * HOUR_US + 3], dtype=np.int64)
+    keys = np.array([1, 1, 1, 2], dtype=np.int64)
+    values = np.array([3.0, 1.0, 9.0, 7.0])
+    assert store.compact(conn, keys, ts, values) == 4
+
+    block_ts, block_values, summary = stored(conn, 1, hour)
+    np.testing.assert_array_equal(block_ts, [hour * HOUR_US + 1, hour * HOUR_US + 5])
+    np.testing.assert_array_equal(block_values, [1.0, 3.0])
+    assert summary == (1.0, 3.0, 4.0)
+    assert stored(conn, 1, hour + 1)[1].tolist() == [9.0]
+    assert stored(conn, 2, hour)[1].tolist() == [7.0]
+
+
+def test_compact_merges_into_existing_block(conn):
+    store = BlockStore("reading_sensors")
+    hour = T0 // HOUR_US
+    base = hour * HOUR_US
+    store.compact(conn, np.array([1, 1]), np.array([base + 10, base + 30]), np.array([1.0, 3.0]))
+    # Geç gelen okumalar: biri araya, biri aynı zaman damgasına, biri sona
+    store.compact(conn, np.array([1, 1, 1]), np.array([base + 20, base + 30, base + 40]), np.array([2.0, -0.0, 4.0]))
+
+    block_ts, block_values, summary = stored(conn, 1, hour)
+    np.testing.assert_array_equal(block_ts, [base + 10, base + 20, base + 30, base + 30, base + 40])
+    # Eşit zaman damgasında önce var olan blok gelir (kararlı sıralama)
+    np.testing.assert_array_equal(block_values.view(np.uint64), np.array([1.0, 2.0, 3.0, -0.0, 4.0]).view(np.uint64))
+    assert summary == (-0.0, 4.0, 10.0)
@@ -0,0 +1,106 @@
+"""Bölümlü SQLite deposu: sıkıştırma ve sıkıştırılmış bölüme geç gelen okumalar."""
+
+import asyncio
+import sqlite3
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from reading_store import (
+    PARTITION_ID_BITS,
+    DuckDBReadingStore,
+    PartitionedSqliteStore,
+    migrate_ts_ms,
+    partition_for,
+)
+
+JAN = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def store(tmp_path):
+    path = tmp_path / "readings.db"
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE readingdb (id INTEGER PRIMARY KEY, sensor_id VARCHAR, type VARCHAR, value FLOAT, ts DATETIME)"
+        ))
+    s = PartitionedSqliteStore(engine, create_async_engine(f"sqlite+aiosqlite:///{path}"))
+    s.start()
+    yield s
+    asyncio.run(s.async_engine.dispose())
+
+
+def january(store, count, sensors=("t1", "t2")):
+    for i in range(count):
+        for sensor in sensors:
+            assert store.write(sensor, "temp", float(i), JAN + timedelta(hours=7 * i, minutes=len(sensor)))
+
+
+def partition_ids(store, name):
+    with store.engine.connect() as conn:
+        return [i for (i,) in conn.execute(text(f"SELECT id FROM {name} ORDER BY id"))]
+
+
+def test_compact_streams_whole_partition(store):
+    january(store, 100)  # ~29 gün, iki sensör
+    assert store.compact_before(datetime(2024, 2, 15, tzinfo=timezone.utc)) == 200
+    assert store.segments()[0].layout == "blocks"
+    rows = asyncio.run(store.readings(limit=1000))
+    assert len(rows) == 200
+    assert sorted(r["value"] for r in rows if r["sensor_id"] == "t1") == [float(i) for i in range(100)]
+
+
+def test_late_reading_continues_after_compacted_ids(store):
+    january(store, 3)
+    name, _, _, ordinal = partition_for(JAN, "month")
+    last_id = partition_ids(store, name)[-1]
+    store.compact_before(datetime(2024, 2, 15, tzinfo=timezone.utc))
+
+    assert store.write("t1", "temp", 42.0, JAN + timedelta(days=3))
+    assert partition_ids(store, name) == [last_id + 1]
+    segment = next(s for s in store.segments() if s.table == name)
+    assert segment.id_lo == last_id + 1
+    assert segment.id_hi == ((ordinal + 1) << PARTITION_ID_BITS) - 1
+
+    # İkinci sıkıştırma var olan bloklarla birleşir, taban yine geri gitmez
+    store.compact_before(datetime(2024, 2, 15, tzinfo=timezone.utc))
+    assert store.write("t1", "temp", 43.0, JAN + timedelta(days=4))
+    assert partition_ids(store, name) == [last_id + 2]
+    assert len(asyncio.run(store.readings(limit=100))) == 8
+
+
+def test_duckdb_syncs_rows_of_recreated_partition(store, tmp_path):
+    pytest.importorskip("duckdb")
+    duck = DuckDBReadingStore(store, tmp_path / "readings.duckdb")
+    assert duck.open()
+    try:
+        january(store, 3)
+        assert duck.sync() == 6
+        store.compact_before(datetime(2024, 2, 15, tzinfo=timezone.utc))
+        store.write("t1", "temp", 42.0, JAN + timedelta(days=3))
+        assert duck.sync() == 1
+        assert duck._con.execute("SELECT count(*) FROM readings WHERE value = 42").fetchone()[0] == 1
+    finally:
+        duck._con.close()
+
+
+def test_migrate_ts_ms_tolerates_concurrent_worker(tmp_path):
+    path = tmp_path / "old.db"
+    with sqlite3.connect(path) as db:
+        db.execute("CREATE TABLE readingdb (id INTEGER PRIMARY KEY, sensor_id VARCHAR, type VARCHAR, value FLOAT, ts DATETIME)")
+        db.execute("INSERT INTO readingdb (sensor_id, type, value, ts) VALUES ('t1', 'temp', 1.0, '2024-01-01 00:00:01.500000')")
+    engine = create_engine(f"sqlite:///{path}")
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def other_worker_wins(conn, cursor, statement, *args):
+        # Kolon kontrolü ile ALTER arasında başka bir worker kolonu ekler
+        if statement.startswith("ALTER TABLE"):
+            with sqlite3.connect(path) as db:
+                db.execute("ALTER TABLE readingdb ADD COLUMN ts_ms INTEGER")
+
+    assert migrate_ts_ms(engine, "readingdb", "sensor_id") == 1
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT ts_ms FROM readingdb")).scalar_one() == 1704067201500
@@ -0,0 +1,349 @@
+"""
+Open-Meteo için önbellekli, istek birleştiren (single-flight) proxy.
+
+- Tek bir uzun ömürlü `httpx.AsyncClient` (bağlantı havuzu) startup'ta açılır;
+  her istekte yeni TCP+TLS el sıkışması yapılmaz.
+- Geocoding sonuçları şehir adına, tahminler yuvarlanmış lat/lon'a göre TTL'li
+  önbellekte tutulur.
+- Aynı anahtar için eşzamanlı istekler tek bir upstream çağrısını bekler.
+- TTL dolmuş ama `stale_seconds` içindeki kayıt hemen döner, yenileme arka
+  planda yapılır (stale-while-revalidate). Upstream hata verirse eski kayıt
+  kullanılmaya devam eder.
+
+Upstream adresleri ortam değişkenleriyle değiştirilebilir; yerel test için
+tools/weather_stub.py kullanılabilir.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from types import MappingProxyType
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Mapping, Optional, Tuple
+
+import httpx
+import numpy as np
+
+log = logging.getLogger(__name__)
+
+GEOCODING_URL = os.getenv("WEATHER_GEOCODING_URL", "https://geocoding-api.open-meteo.com/v1/search")
+FORECAST_URL = os.getenv("WEATHER_FORECAST_URL", "https://api.open-meteo.com/v1/forecast")
+
+FORECAST_PARAMS = {
+    "current": "temperature_2m,relative_humidity_2m,weather_code,wind_speed_10m,apparent_temperature",
+    "daily": "weather_code,temperature_2m_max,temperature_2m_min",
+    "timezone": "Europe/Istanbul",
+    "forecast_days": 7,  # 7 günlük tahmin
+}
+
+UNKNOWN_DESCRIPTION = "Bilinmiyor"
+UNKNOWN_ICON = "clouds"
+
+# WMO Weather interpretation codes (WW) -> Türkçe açıklama
+WEATHER_DESCRIPTIONS: Mapping[int, str] = MappingProxyType({
+    0: "Açık",
+    1: "Çoğunlukla açık",
+    2: "Kısmen bulutlu",
+    3: "Kapalı",
+    45: "Sisli",
+    48: "Donan sisli",
+    51: "Hafif çiseleyen yağmur",
+    53: "Orta çiseleyen yağmur",
+    55: "Yoğun çiseleyen yağmur",
+    56: "Hafif donan çiseleme",
+    57: "Yoğun donan çiseleme",
+    61: "Hafif yağmur",
+    63: "Orta yağmur",
+    65: "Yoğun yağmur",
+    66: "Hafif donan yağmur",
+    67: "Yoğun donan yağmur",
+    71: "Hafif kar",
+    73: "Orta kar",
+    75: "Yoğun kar",
+    77: "Kar taneleri",
+    80: "Hafif sağanak",
+    81: "Orta sağanak",
+    82: "Yoğun sağanak",
+    85: "Hafif kar sağanağı",
+    86: "Yoğun kar sağanağı",
+    95: "Fırtına",
+    96: "Dolu ile fırtına",
+    99: "Şiddetli dolu ile fırtına",
+})
+
+# Kod aralığı -> ikon; listede olmayan kodlar UNKNOWN_ICON
+_ICON_RANGES = (
+    (range(0, 2), "clear"),
+    (range(2, 4), "clouds"),
+    (range(45, 49, 3), "mist"),
+    (range(51, 68), "rain"),
+    (range(71, 78), "snow"),
+    (range(80, 83), "rain"),
+    (range(95, 100), "thunderstorm"),
+)
+WEATHER_ICONS: Mapping[int, str] = MappingProxyType(
+    {code: icon for codes, icon in _ICON_RANGES for code in codes}
+)
+
+# Vektörel dönüşüm için 0..99 kodlarının tablosu; 100. satır "bilinmeyen kod"
+_CODE_LIMIT = 100
+_DESCRIPTION_TABLE = np.array(
+    [WEATHER_DESCRIPTIONS.get(c, UNKNOWN_DESCRIPTION) for c in range(_CODE_LIMIT)] + [UNKNOWN_DESCRIPTION],
+    dtype=object,
+)
+_ICON_TABLE = np.array(
+    [WEATHER_ICONS.get(c, UNKNOWN_ICON) for c in range(_CODE_LIMIT)] + [UNKNOWN_ICON],
+    dtype=object,
+)
+
+
+def describe(code: int) -> Tuple[str, str]:
+    """Tek kod için (açıklama, ikon)."""
+    return WEATHER_DESCRIPTIONS.get(code, UNKNOWN_DESCRIPTION), WEATHER_ICONS.get(code, UNKNOWN_ICON)
+
+
+def _column(values: List[Any], n: int) -> np.ndarray:
+    """İlk n değer float dizisi olarak; eksik/None değerler 0.0."""
+    out = np.zeros(n, dtype=np.float64)
+    m = min(n, len(values))
+    if m:
+        out[:m] = np.asarray(values[:m], dtype=np.float64)
+    return np.nan_to_num(out, nan=0.0)
+
+
+def transform_forecast(daily: Dict[str, Any], days: int = 7) -> List[Dict[str, Any]]:
+    """Open-Meteo "daily" dizilerini tek seferde günlük tahmin listesine çevirir."""
+    daily_codes = daily.get("weather_code", [])
+    n = min(days, len(daily_codes))
+    if n == 0:
+        return []
+    codes = np.asarray(daily_codes[:n], dtype=np.int64)
+    lookup = np.where((codes >= 0) & (codes < _CODE_LIMIT), codes, _CODE_LIMIT)
+    descriptions = _DESCRIPTION_TABLE[lookup].tolist()
+    icons = _ICON_TABLE[lookup].tolist()
+    max_temps = np.round(_column(daily.get("temperature_2m_max", []), n), 1).tolist()
+    min_temps = np.round(_column(daily.get("temperature_2m_min", []), n), 1).tolist()
+    times = daily.get("time", [])
+    dates = [times[i] if i < len(times) else "" for i in range(n)]
+    return [
+        {
+            "date": date,
+            "max_temp": max_t,
+            "min_temp": min_t,
+            "weather_code": code,
+            "description": desc,
+            "icon": icon,
+        }
+        for date, max_t, min_t, code, desc, icon in zip(dates, max_temps, min_temps, codes.tolist(), descriptions, icons)
+    ]
+
+
+def build_weather_response(data: Dict[str, Any], city_name: str, country_code: str) -> Dict[str, Any]:
+    """Ham forecast yanıtından /api/v1/weather gövdesini üretir."""
+    current = data["current"]
+    weather_code = int(current["weather_code"])
+    description, icon = describe(weather_code)
+    return {
+        "temp": round(current["temperature_2m"], 1),
+        "feels_like": round(current["apparent_temperature"], 1),
+        "humidity": int(current["relative_humidity_2m"]),
+        "wind_speed": round(current["wind_speed_10m"] * 3.6, 1),  # m/s'den km/h'ye çevir
+        "description": description,
+        "icon": icon,
+        "weather_code": weather_code,  # Frontend'de ikon seçimi için
+        "city": city_name,
+        "country": country_code,
+        "forecast": transform_forecast(data["daily"]) if "daily" in data else [],  # 7 günlük tahmin
+    }
+
+
+class TTLCache:
+    """anahtar -> (yazılma zamanı, değer); tazelik kararı çağırana aittir."""
+
+    def __init__(self, max_entries: int = 1024) -> None:
+        self.max_entries = max_entries
+        self._entries: Dict[Hashable, Tuple[float, Any]] = {}
+
+    def get(self, key: Hashable) -> Optional[Tuple[float, Any]]:
+        return self._entries.get(key)
+
+    def put(self, key: Hashable, value: Any) -> None:
+        if key not in self._entries and len(self._entries) >= self.max_entries:
+            del self._entries[next(iter(self._entries))]
+        self._entries[key] = (time.monotonic(), value)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class WeatherService:
+    def __init__(
+        self,
+        *,
+        geocoding_url: str = GEOCODING_URL,
+        forecast_url: str = FORECAST_URL,
+        forecast_ttl: float = 600.0,
+        geocode_ttl: float = 86400.0,
+        stale_seconds: float = 3600.0,
+        coord_precision: int = 2,
+        timeout: float = 10.0,
+        on_upstream: Optional[Callable[[str, float, bool], None]] = None,
+    ) -> None:
+        self.geocoding_url = geocoding_url
+        self.forecast_url = forecast_url
+        self.forecast_ttl = forecast_ttl
+        self.geocode_ttl = geocode_ttl
+        self.stale_seconds = stale_seconds
+        self.coord_precision = coord_precision
+        self.timeout = timeout
+        self.on_upstream = on_upstream  # (tür, süre sn, başarılı mı): upstream çağrısı bittiğinde
+        self._client: Optional[httpx.AsyncClient] = None
+        self._geocodes = TTLCache()
+        self._forecasts = TTLCache()
+        # (koordinat, şehir, ülke) -> (kaynak forecast nesnesi, hazır yanıt)
+        self._responses = TTLCache()
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self._stats = {
+            "hits": 0,
+            "stale_hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "upstream_calls": 0,
+            "upstream_errors": 0,
+        }
+
+    async def start(self) -> None:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+            )
+
+    async def close(self) -> None:
+        for task in list(self._inflight.values()):
+            task.cancel()
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def coord_key(self, lat: float, lon: float) -> Tuple[float, float]:
+        return round(lat, self.coord_precision), round(lon, self.coord_precision)
+
+    async def geocode(self, city: str) -> Optional[Dict[str, Any]]:
+        """{"lat", "lon", "name"} ya da sonuç yoksa None (o da önbelleğe alınır)."""
+        key = ("geo", city.strip().casefold())
+        return await self._cached(self._geocodes, key, self.geocode_ttl, lambda: self._fetch_geocode(city))
+
+    async def forecast(self, lat: float, lon: float) -> Dict[str, Any]:
+        """Yuvarlanmış koordinat için ham Open-Meteo forecast yanıtı."""
+        key = ("forecast",) + self.coord_key(lat, lon)
+        return await self._cached(self._forecasts, key, self.forecast_ttl, lambda: self._fetch_forecast(key[1], key[2]))
+
+    async def report(self, lat: float, lon: float, city_name: str, country_code: str) -> Dict[str, Any]:
+        """
+        /api/v1/weather yanıtı. Yanıt, üretildiği forecast nesnesiyle birlikte
+        saklanır; forecast önbellekte değişmedikçe dönüşüm tekrar yapılmaz.
+        Dönen sözlük paylaşılır, çağıran değiştirmemeli.
+        """
+        data = await self.forecast(lat, lon)
+        key = self.coord_key(lat, lon) + (city_name, country_code)
+        entry = self._responses.get(key)
+        if entry is not None and entry[1][0] is data:
+            return entry[1][1]
+        response = build_weather_response(data, city_name, country_code)
+        self._responses.put(key, (data, response))
+        return response
+
+    async def _cached(
+        self,
+        cache: TTLCache,
+        key: Hashable,
+        ttl: float,
+        loader: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        entry = cache.get(key)
+        if entry is not None:
+            age = time.monotonic() - entry[0]
+            if age < ttl:
+                self._stats["hits"] += 1
+                return entry[1]
+            if age < ttl + self.stale_seconds:
+                self._stats["stale_hits"] += 1
+                self._single_flight(cache, key, loader)
+                return entry[1]
+
+        self._stats["misses"] += 1
+        task = self._single_flight(cache, key, loader)
+        try:
+            # shield: istemci bağlantıyı kesse de diğer bekleyenlerin çağrısı sürer
+            return await asyncio.shield(task)
+        except Exception:
+            if entry is not None:
+                return entry[1]
+            raise
+
+    def _single_flight(self, cache: TTLCache, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        task = self._inflight.get(key)
+        if task is not None:
+            self._stats["coalesced"] += 1
+            return task
+        task = asyncio.create_task(self._load(cache, key, loader))
+        self._inflight[key] = task
+        task.add_done_callback(lambda t: self._finish(key, t))
+        return task
+
+    async def _load(self, cache: TTLCache, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        self._stats["upstream_calls"] += 1
+        started = time.perf_counter()
+        try:
+            value = await loader()
+        except Exception:
+            self._stats["upstream_errors"] += 1
+            if self.on_upstream is not None:
+                self.on_upstream(key[0], time.perf_counter() - started, False)
+            raise
+        if self.on_upstream is not None:
+            self.on_upstream(key[0], time.perf_counter() - started, True)
+        cache.put(key, value)
+        return value
+
+    def _finish(self, key: Hashable, task: asyncio.Task) -> None:
+        self._inflight.pop(key, None)
+        if not task.cancelled() and task.exception() is not None:
+            # Arka plan yenilemesinde kimse beklemiyor olabilir
+            log.warning("Weather upstream error (%s): %s", key[0], task.exception())
+
+    async def _get_json(self, url: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        if self._client is None:
+            await self.start()
+        response = await self._client.get(url, params=params)
+        response.raise_for_status()
+        return response.json()
+
+    async def _fetch_geocode(self, city: str) -> Optional[Dict[str, Any]]:
+        geo_data = await self._get_json(
+            self.geocoding_url,
+            {"name": city, "count": 1, "language": "tr", "format": "json"},
+        )
+        results = geo_data.get("results") or []
+        if not results:
+            return None
+        result = results[0]
+        return {"lat": result["latitude"], "lon": result["longitude"], "name": result.get("name", city)}
+
+    async def _fetch_forecast(self, lat: float, lon: float) -> Dict[str, Any]:
+        return await self._get_json(self.forecast_url, {"latitude": lat, "longitude": lon, **FORECAST_PARAMS})
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            "geocode_entries": len(self._geocodes),
+            "forecast_entries": len(self._forecasts),
+            "response_entries": len(self._responses),
+            "inflight": len(self._inflight),
+        }
@@ -0,0 +1,99 @@
+"""
+Throughput benchmark for the training loop options.
+
+Runs `train_one_epoch` on synthetic batches for every combination of
+autocast dtype, channels_last and torch.compile, and prints images/s:
+
+    python -m ml.src.bench_train --model-name resnet18 --img-size 224 --steps 20
+"""
+
+from __future__ import annotations
+
+import argparse
+import itertools
+import tempfile
+import time
+
+import timm
+import torch
+from rich.console import Console
+from rich.table import Table
+from torch import nn
+from torch.optim import AdamW
+from torch.utils.data import DataLoader, TensorDataset
+from torch.utils.tensorboard import SummaryWriter
+
+from .train_classifier import AMP_DTYPES, train_one_epoch
+
+console = Console()
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark training loop options on synthetic data")
+    parser.add_argument("--model-name", type=str, default="efficientnet_b0")
+    parser.add_argument("--img-size", type=int, default=224)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--num-classes", type=int, default=10)
+    parser.add_argument("--steps", type=int, default=20, help="Timed steps per combination")
+    parser.add_argument("--warmup", type=int, default=3, help="Untimed steps per combination")
+    parser.add_argument("--grad-accum", type=int, default=1)
+    parser.add_argument("--amp", nargs="+", choices=["none", "bf16"], default=["none", "bf16"])
+    parser.add_argument("--no-compile", action="store_true", help="Skip torch.compile combinations")
+    parser.add_argument("--device", type=str, default="cpu")
+    return parser.parse_args()
+
+
+def synthetic_loader(steps: int, batch_size: int, img_size: int, num_classes: int) -> DataLoader:
+    n = steps * batch_size
+    images = torch.randn(n, 3, img_size, img_size)
+    labels = torch.randint(0, num_classes, (n,))
+    return DataLoader(TensorDataset(images, labels), batch_size=batch_size, shuffle=False)
+
+
+def run_combo(args: argparse.Namespace, amp: str, channels_last: bool, compiled: bool, writer: SummaryWriter) -> float:
+    device = torch.device(args.device)
+    model = timm.create_model(args.model_name, pretrained=False, num_classes=args.num_classes).to(device)
+    if channels_last:
+        model.to(memory_format=torch.channels_last)
+    train_model = torch.compile(model) if compiled else model
+    optimizer = AdamW(model.parameters(), lr=1e-4)
+    criterion = nn.CrossEntropyLoss()
+    kwargs = dict(amp_dtype=AMP_DTYPES[amp], channels_last=channels_last, grad_accum=args.grad_accum)
+
+    warmup = {"train": synthetic_loader(args.warmup, args.batch_size, args.img_size, args.num_classes)}
+    train_one_epoch(train_model, warmup, optimizer, criterion, device, 0, writer, **kwargs)
+
+    timed = {"train": synthetic_loader(args.steps, args.batch_size, args.img_size, args.num_classes)}
+    start = time.perf_counter()
+    train_one_epoch(train_model, timed, optimizer, criterion, device, 1, writer, **kwargs)
+    if device.type == "cuda":
+        torch.cuda.synchronize()
+    elapsed = time.perf_counter() - start
+    return args.steps * args.batch_size / elapsed
+
+
+def main() -> None:
+    args = parse_args()
+    compile_opts = [False] if args.no_compile else [False, True]
+    table = Table(title=f"Training throughput ({args.model_name}, {args.img_size}px, bs={args.batch_size}, {args.device})")
+    table.add_column("AMP")
+    table.add_column("channels_last")
+    table.add_column("compile")
+    table.add_column("images/s", justify="right")
+
+    with tempfile.TemporaryDirectory() as log_dir:
+        writer = SummaryWriter(log_dir=log_dir)
+        for amp, channels_last, compiled in itertools.product(args.amp, [False, True], compile_opts):
+            console.print(f"[cyan]amp={amp} channels_last={channels_last} compile={compiled}[/cyan]")
+            try:
+                throughput = f"{run_combo(args, amp, channels_last, compiled, writer):.1f}"
+            except Exception as exc:  # e.g. torch.compile backend missing
+                throughput = f"failed: {type(exc).__name__}"
+            table.add_row(amp, str(channels_last), str(compiled), throughput)
+        writer.close()
+
+    console.print(table)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Background checkpoint writer with atomic writes and retention.
+"""
+
+from __future__ import annotations
+
+import os
+import queue
+import re
+import shutil
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import torch
+
+EPOCH_PATTERN = re.compile(r"^epoch_(\d+)\.pth$")
+
+
+def to_cpu(obj: Any) -> Any:
+    """Deep-copy tensors in a (nested) state dict to CPU so training can keep mutating the originals."""
+    if isinstance(obj, torch.Tensor):
+        return obj.detach().to("cpu", copy=True)
+    if isinstance(obj, dict):
+        return {k: to_cpu(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return type(obj)(to_cpu(v) for v in obj)
+    return obj
+
+
+def atomic_save(state: Dict[str, Any], path: Path) -> None:
+    """torch.save to a temp file in the same directory, fsync, then rename over `path`."""
+    tmp = path.with_name(path.name + ".tmp")
+    with tmp.open("wb") as f:
+        torch.save(state, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def atomic_link(src: Path, dst: Path) -> None:
+    """Point `dst` at the same file as `src` (hard link, copy if unsupported), replacing atomically."""
+    tmp = dst.with_name(dst.name + ".tmp")
+    if tmp.exists():
+        tmp.unlink()
+    try:
+        os.link(src, tmp)
+    except OSError:
+        shutil.copy2(src, tmp)
+    os.replace(tmp, dst)
+
+
+class CheckpointWriter:
+    """
+    Writes epoch checkpoints on a background thread.
+
+    `save()` snapshots the state to CPU and returns immediately; at most one
+    snapshot waits in the queue, so a slow disk applies back-pressure instead
+    of growing memory. Each checkpoint is written atomically as
+    `epoch_XXX.pth`; `best.pth` is a hard link to the best epoch file rather
+    than a second copy. Only the newest `keep_last` epoch files are kept
+    (0 keeps all) — pruning an epoch that `best.pth` links to leaves the best
+    weights intact.
+    """
+
+    def __init__(self, ckpt_dir: Path, *, keep_last: int = 3, best_name: str = "best.pth") -> None:
+        self.ckpt_dir = Path(ckpt_dir)
+        self.ckpt_dir.mkdir(parents=True, exist_ok=True)
+        self.keep_last = keep_last
+        self.best_path = self.ckpt_dir / best_name
+        self._queue: "queue.Queue[Optional[tuple]]" = queue.Queue(maxsize=1)
+        self._error: Optional[BaseException] = None
+        self._thread = threading.Thread(target=self._run, name="checkpoint-writer", daemon=True)
+        self._thread.start()
+
+    def save(self, state: Dict[str, Any], epoch: int, *, is_best: bool = False) -> Dict[str, Any]:
+        """Queue `state` for writing; returns the CPU snapshot that will be written."""
+        self._raise_if_failed()
+        snapshot = to_cpu(state)
+        self._queue.put((snapshot, epoch, is_best))
+        return snapshot
+
+    def close(self) -> None:
+        """Flush pending checkpoints and stop the writer thread."""
+        self._queue.put(None)
+        self._thread.join()
+        self._raise_if_failed()
+
+    def _raise_if_failed(self) -> None:
+        if self._error is not None:
+            raise RuntimeError("Checkpoint writer failed") from self._error
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            if self._error is not None:
+                continue
+            snapshot, epoch, is_best = item
+            try:
+                self._write(snapshot, epoch, is_best)
+            except BaseException as exc:
+                self._error = exc
+
+    def _write(self, snapshot: Dict[str, Any], epoch: int, is_best: bool) -> None:
+        path = self.ckpt_dir / f"epoch_{epoch:03d}.pth"
+        atomic_save(snapshot, path)
+        if is_best:
+            atomic_link(path, self.best_path)
+        self._prune()
+
+    def _prune(self) -> None:
+        if self.keep_last <= 0:
+            return
+        epochs = sorted(
+            (int(m.group(1)), p) for p in self.ckpt_dir.iterdir() if (m := EPOCH_PATTERN.match(p.name))
+        )
+        for _, path in epochs[: -self.keep_last]:
+            path.unlink(missing_ok=True)
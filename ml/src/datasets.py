@@ -3,14 +3,17 @@ Dataset utilities shared across training and evaluation scripts.
 """
 
 import argparse
+import math
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, Optional, Tuple
+from typing import Dict, Iterator, Optional, Tuple
 
 import torch
-from torch.utils.data import DataLoader, WeightedRandomSampler
+from torch.utils.data import DataLoader, Sampler
+from torch.utils.data.distributed import DistributedSampler
 from torchvision import datasets, transforms
 
+from .shards import ShardedImageDataset
 from .utils import iter_class_dirs, save_json
 
 
@@ -52,16 +55,56 @@ def build_transforms(cfg: DatasetConfig, *, train: bool) -> transforms.Compose:
     )
 
 
+class DistributedWeightedSampler(Sampler[int]):
+    """
+    Weighted sampling with replacement, split across DDP ranks.
+
+    Every rank draws the same global sample (seeded by seed + epoch) and keeps
+    every `num_replicas`-th index, so together the ranks cover one epoch of
+    `len(weights)` draws. With a single replica this behaves like
+    WeightedRandomSampler. Call `set_epoch` before each epoch.
+    """
+
+    def __init__(self, weights: torch.Tensor, *, num_replicas: int = 1, rank: int = 0, seed: int = 0) -> None:
+        self.weights = torch.as_tensor(weights, dtype=torch.double)
+        self.num_replicas = num_replicas
+        self.rank = rank
+        self.seed = seed
+        self.epoch = 0
+        self.num_samples = math.ceil(len(self.weights) / num_replicas)
+        self.total_size = self.num_samples * num_replicas
+
+    def set_epoch(self, epoch: int) -> None:
+        self.epoch = epoch
+
+    def __iter__(self) -> Iterator[int]:
+        generator = torch.Generator()
+        generator.manual_seed(self.seed + self.epoch)
+        indices = torch.multinomial(self.weights, self.total_size, replacement=True, generator=generator)
+        return iter(indices[self.rank : self.total_size : self.num_replicas].tolist())
+
+    def __len__(self) -> int:
+        return self.num_samples
+
+
 def create_dataloaders(
     cfg: DatasetConfig,
     *,
     batch_size: int = 32,
     num_workers: int = 4,
     use_weighted_sampler: bool = False,
+    shards_root: Optional[Path] = None,
+    rank: int = 0,
+    world_size: int = 1,
 ) -> Dict[str, DataLoader]:
     train_tfms = build_transforms(cfg, train=True)
     val_tfms = build_transforms(cfg, train=False)
 
+    if shards_root is not None:
+        return create_shard_dataloaders(
+            shards_root, train_tfms, val_tfms, batch_size=batch_size, num_workers=num_workers
+        )
+
     train_ds = datasets.ImageFolder(cfg.train_dir, transform=train_tfms)
     val_ds = datasets.ImageFolder(cfg.val_dir, transform=val_tfms)
 
@@ -70,6 +113,11 @@ def create_dataloaders(
         test_ds = datasets.ImageFolder(cfg.test_dir, transform=val_tfms)
 
     sampler = None
+    val_sampler = None
+    if world_size > 1:
+        sampler = DistributedSampler(train_ds, num_replicas=world_size, rank=rank, shuffle=True)
+        # Pads to a multiple of world_size, so a few val samples may be counted twice
+        val_sampler = DistributedSampler(val_ds, num_replicas=world_size, rank=rank, shuffle=False)
     if use_weighted_sampler:
         targets = torch.tensor(train_ds.targets, dtype=torch.long)
         class_counts = torch.bincount(targets, minlength=len(train_ds.classes)).float()
@@ -77,7 +125,7 @@ def create_dataloaders(
         class_weights = 1.0 / class_counts
         sample_weights = class_weights[targets]
         sample_weights = sample_weights + 1e-6  # tüm örnekler pozitif ağırlık alsın
-        sampler = WeightedRandomSampler(sample_weights, num_samples=len(sample_weights), replacement=True)
+        sampler = DistributedWeightedSampler(sample_weights, num_replicas=world_size, rank=rank)
 
     loaders = {
         "train": DataLoader(
@@ -88,13 +136,60 @@ def create_dataloaders(
             num_workers=num_workers,
             pin_memory=True,
         ),
-        "val": DataLoader(val_ds, batch_size=batch_size, shuffle=False, num_workers=num_workers, pin_memory=True),
+        "val": DataLoader(
+            val_ds,
+            batch_size=batch_size,
+            shuffle=False,
+            sampler=val_sampler,
+            num_workers=num_workers,
+            pin_memory=True,
+        ),
     }
     if test_ds is not None:
         loaders["test"] = DataLoader(test_ds, batch_size=batch_size, shuffle=False, num_workers=num_workers, pin_memory=True)
     return loaders
 
 
+def create_shard_dataloaders(
+    shards_root: Path,
+    train_tfms: transforms.Compose,
+    val_tfms: transforms.Compose,
+    *,
+    batch_size: int = 32,
+    num_workers: int = 4,
+) -> Dict[str, DataLoader]:
+    """
+    Streaming loaders over tar shards written by `python -m ml.src.shards`.
+
+    Shuffling happens at shard level plus a bounded sample buffer inside the
+    dataset, so no sampler is used; the class-balanced WeightedRandomSampler
+    is not available in this mode.
+    """
+    shards_root = Path(shards_root)
+    loaders = {
+        "train": DataLoader(
+            ShardedImageDataset(shards_root / "train", train_tfms, shuffle=True),
+            batch_size=batch_size,
+            num_workers=num_workers,
+            pin_memory=True,
+        ),
+        "val": DataLoader(
+            ShardedImageDataset(shards_root / "val", val_tfms),
+            batch_size=batch_size,
+            num_workers=num_workers,
+            pin_memory=True,
+        ),
+    }
+    if (shards_root / "test").exists():
+        loaders["test"] = DataLoader(
+            ShardedImageDataset(shards_root / "test", val_tfms),
+            batch_size=batch_size,
+            num_workers=num_workers,
+            pin_memory=True,
+        )
+    return loaders
+
+
 DATASETS = {
     "indoor": DatasetConfig(
         name="indoor",
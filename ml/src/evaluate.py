@@ -22,6 +22,7 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument("--weights", type=Path, required=True, help="Path to exported .pt weights")
     parser.add_argument("--batch-size", type=int, default=64)
     parser.add_argument("--num-workers", type=int, default=4)
+    parser.add_argument("--shards", type=Path, help="Read the test split from tar shards (see ml.src.shards)")
     parser.add_argument("--device", type=str, default="cuda" if torch.cuda.is_available() else "cpu")
     return parser.parse_args()
 
@@ -51,7 +52,9 @@ def main() -> None:
     args = parse_args()
     device = torch.device(args.device)
     cfg = prepare_dataset(DATASETS[args.dataset], args.data_root)
-    loaders = create_dataloaders(cfg, batch_size=args.batch_size, num_workers=args.num_workers)
+    loaders = create_dataloaders(
+        cfg, batch_size=args.batch_size, num_workers=args.num_workers, shards_root=args.shards
+    )
     if "test" not in loaders:
         raise RuntimeError("Dataset does not provide a dedicated test split")
 
@@ -0,0 +1,172 @@
+"""
+Per-step throughput and data-loader stall instrumentation for the trainer.
+"""
+
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Optional
+
+import torch
+from torch.utils.tensorboard import SummaryWriter
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def peak_memory_mb(device: torch.device) -> float:
+    """Peak allocated memory on CUDA, or peak RSS of the process on CPU."""
+    if device.type == "cuda":
+        return torch.cuda.max_memory_allocated(device) / 2**20
+    if resource is not None:
+        # ru_maxrss is reported in kilobytes on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return 0.0
+
+
+@dataclass
+class PhaseTotals:
+    data_wait: float = 0.0
+    compute: float = 0.0
+    optimizer: float = 0.0
+    images: int = 0
+    steps: int = 0
+    wall: float = 0.0
+    window: Dict[str, float] = field(default_factory=dict)
+
+
+class StepProfiler:
+    """
+    Records data-wait, forward/backward and optimizer time for every step.
+
+    The loop calls `data_ready()` once the batch is on the device,
+    `compute_done()` after forward (and backward), and `step_done(bs)` after
+    the optimizer step. Window means are written to TensorBoard every
+    `log_every` steps under `perf/<phase>/...`. On CUDA each mark
+    synchronizes the device, so only enable this while tuning.
+    """
+
+    def __init__(
+        self,
+        writer: SummaryWriter,
+        device: torch.device,
+        *,
+        log_every: int = 10,
+        torch_profiler: Optional["torch.profiler.profile"] = None,
+    ) -> None:
+        self.writer = writer
+        self.device = device
+        self.log_every = max(1, log_every)
+        self.torch_profiler = torch_profiler
+        self.global_step: Dict[str, int] = {}
+        self.summaries: Dict[str, Dict[str, float]] = {}
+        self.totals = PhaseTotals()
+        self.phase = "train"
+        self._mark = 0.0
+        self._epoch_start = 0.0
+        self._t_data = 0.0
+        self._t_compute = 0.0
+
+    def _now(self) -> float:
+        if self.device.type == "cuda":
+            torch.cuda.synchronize(self.device)
+        return time.perf_counter()
+
+    def start(self, phase: str) -> None:
+        self.phase = phase
+        self.totals = PhaseTotals()
+        if self.device.type == "cuda":
+            torch.cuda.reset_peak_memory_stats(self.device)
+        self._epoch_start = self._mark = self._now()
+
+    def data_ready(self) -> None:
+        now = self._now()
+        self._t_data = now - self._mark
+        self._mark = now
+
+    def compute_done(self) -> None:
+        now = self._now()
+        self._t_compute = now - self._mark
+        self._mark = now
+
+    def step_done(self, batch_size: int) -> None:
+        now = self._now()
+        t_optim = now - self._mark
+        step_time = self._t_data + self._t_compute + t_optim
+        self._mark = now
+
+        totals = self.totals
+        totals.data_wait += self._t_data
+        totals.compute += self._t_compute
+        totals.optimizer += t_optim
+        totals.images += batch_size
+        totals.steps += 1
+        window = totals.window
+        window["data_wait_ms"] = window.get("data_wait_ms", 0.0) + self._t_data * 1e3
+        window["fwd_bwd_ms"] = window.get("fwd_bwd_ms", 0.0) + self._t_compute * 1e3
+        window["optim_ms"] = window.get("optim_ms", 0.0) + t_optim * 1e3
+        window["images"] = window.get("images", 0.0) + batch_size
+        window["seconds"] = window.get("seconds", 0.0) + step_time
+
+        step = self.global_step.get(self.phase, 0) + 1
+        self.global_step[self.phase] = step
+        if totals.steps % self.log_every == 0:
+            self._flush_window(step)
+        if self.torch_profiler is not None and self.phase == "train":
+            self.torch_profiler.step()
+
+    def _flush_window(self, step: int) -> None:
+        window = self.totals.window
+        n = self.log_every
+        prefix = f"perf/{self.phase}"
+        self.writer.add_scalar(f"{prefix}/data_wait_ms", window["data_wait_ms"] / n, step)
+        self.writer.add_scalar(f"{prefix}/fwd_bwd_ms", window["fwd_bwd_ms"] / n, step)
+        self.writer.add_scalar(f"{prefix}/optim_ms", window["optim_ms"] / n, step)
+        if window["seconds"] > 0:
+            self.writer.add_scalar(f"{prefix}/images_per_s", window["images"] / window["seconds"], step)
+        self.writer.add_scalar(f"{prefix}/peak_mem_mb", peak_memory_mb(self.device), step)
+        window.clear()
+
+    def finish(self, epoch: int) -> Dict[str, float]:
+        """Write epoch-level totals and return them as a summary dict."""
+        totals = self.totals
+        totals.wall = self._now() - self._epoch_start
+        wall = max(totals.wall, 1e-9)
+        summary = {
+            "images_per_s": totals.images / wall,
+            "data_wait_frac": totals.data_wait / wall,
+            "compute_frac": totals.compute / wall,
+            "optim_frac": totals.optimizer / wall,
+            "peak_mem_mb": peak_memory_mb(self.device),
+        }
+        for key, value in summary.items():
+            self.writer.add_scalar(f"perf/{self.phase}_epoch/{key}", value, epoch)
+        self.summaries[self.phase] = summary
+        return summary
+
+
+def build_torch_profiler(spec: str, log_dir: Path) -> "torch.profiler.profile":
+    """
+    Create a torch.profiler session for a window of training steps given as
+    "START:END" (warm-up at START, recorded through END). The trace is
+    written for TensorBoard's profiler plugin.
+    """
+    from torch.profiler import ProfilerActivity, profile, schedule, tensorboard_trace_handler
+
+    start, end = (int(part) for part in spec.split(":", 1))
+    if start < 1 or end <= start:
+        raise ValueError(f"Invalid --profile-steps window: {spec!r} (expected START:END with 1 <= START < END)")
+    activities = [ProfilerActivity.CPU]
+    if torch.cuda.is_available():
+        activities.append(ProfilerActivity.CUDA)
+    return profile(
+        activities=activities,
+        schedule=schedule(skip_first=start - 1, wait=0, warmup=1, active=end - start, repeat=1),
+        on_trace_ready=tensorboard_trace_handler(str(log_dir)),
+        record_shapes=True,
+        profile_memory=True,
+    )
@@ -0,0 +1,259 @@
+"""
+Sharded record format for training data.
+
+ImageFolder trees are packed into large sequential tar shards
+(WebDataset-compatible layout) so that training reads a handful of big files
+instead of tens of thousands of small ones:
+
+    <output>/<split>/shard-000000.tar   # "<key>.<ext>" image bytes + "<key>.cls" class index
+    <output>/<split>/index.json         # {"classes": [...], "shards": [...], "num_samples": N}
+
+ShardedImageDataset streams those shards back with shard-level shuffling,
+a bounded in-memory shuffle buffer and per-worker shard assignment.
+"""
+
+from __future__ import annotations
+
+import argparse
+import io
+import random
+import tarfile
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import torch
+import torch.distributed as dist
+from PIL import Image
+from torch.utils.data import IterableDataset, get_worker_info
+
+from .utils import iter_class_dirs, save_json
+
+IMG_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".webp")
+INDEX_FILE = "index.json"
+
+
+def list_samples(root: Path) -> Tuple[List[str], List[Tuple[Path, int]]]:
+    """Return (classes, [(path, class_idx), ...]) for an ImageFolder-style tree."""
+    root = Path(root)
+    classes = list(iter_class_dirs(root))
+    samples = []
+    for idx, name in enumerate(classes):
+        for path in sorted((root / name).rglob("*")):
+            if path.is_file() and path.suffix.lower() in IMG_EXTENSIONS:
+                samples.append((path, idx))
+    return classes, samples
+
+
+def _add_bytes(tar: tarfile.TarFile, name: str, payload: bytes) -> None:
+    info = tarfile.TarInfo(name)
+    info.size = len(payload)
+    tar.addfile(info, io.BytesIO(payload))
+
+
+def write_shards(
+    source: Path,
+    output: Path,
+    *,
+    shard_size: int = 2000,
+    seed: int = 42,
+) -> Dict:
+    """
+    Pack an ImageFolder tree into tar shards under `output`.
+
+    Samples are shuffled once before packing so that every shard holds a mix
+    of classes; shard-level shuffling at read time then gives a good ordering
+    without random small-file reads.
+    """
+    output = Path(output)
+    output.mkdir(parents=True, exist_ok=True)
+    classes, samples = list_samples(source)
+    if not samples:
+        raise RuntimeError(f"No images found under {source}")
+    random.Random(seed).shuffle(samples)
+
+    shards = []
+    for shard_idx, start in enumerate(range(0, len(samples), shard_size)):
+        chunk = samples[start : start + shard_size]
+        name = f"shard-{shard_idx:06d}.tar"
+        with tarfile.open(output / name, "w") as tar:
+            for offset, (path, label) in enumerate(chunk):
+                key = f"{start + offset:09d}"
+                _add_bytes(tar, f"{key}{path.suffix.lower()}", path.read_bytes())
+                _add_bytes(tar, f"{key}.cls", str(label).encode("ascii"))
+        shards.append({"name": name, "count": len(chunk)})
+
+    index = {"source": str(source), "classes": classes, "shards": shards, "num_samples": len(samples)}
+    save_json(index, output / INDEX_FILE)
+    return index
+
+
+def load_shard_index(root: Path) -> Dict:
+    import json
+
+    with (Path(root) / INDEX_FILE).open("r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+class ShardedImageDataset(IterableDataset):
+    """
+    Streams (image, label) pairs from tar shards written by `write_shards`.
+
+    Each DataLoader worker (of each DDP rank, when torch.distributed is
+    initialized) reads a disjoint subset of the shards. With `shuffle=True`
+    the shard order is reshuffled every epoch (call `set_epoch`) and samples
+    pass through a bounded shuffle buffer. Under DDP the training stream also
+    yields exactly the same number of samples on every rank (cycling its
+    shards if needed), because uneven step counts would stall the gradient
+    all-reduce.
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        transform: Optional[Callable] = None,
+        *,
+        shuffle: bool = False,
+        shuffle_buffer: int = 1000,
+        seed: int = 0,
+    ) -> None:
+        super().__init__()
+        self.root = Path(root)
+        index = load_shard_index(self.root)
+        self.classes: List[str] = list(index["classes"])
+        self.shards: List[Path] = [self.root / s["name"] for s in index["shards"]]
+        self.num_samples: int = int(index["num_samples"])
+        self.transform = transform
+        self.shuffle = shuffle
+        self.shuffle_buffer = max(1, shuffle_buffer)
+        self.seed = seed
+        self.epoch = 0
+
+    def __len__(self) -> int:
+        return self.num_samples
+
+    def set_epoch(self, epoch: int) -> None:
+        self.epoch = epoch
+
+    @staticmethod
+    def _partition() -> Tuple[int, int, int, int]:
+        """(rank, world_size, worker_id, num_workers) of the current reader."""
+        rank, world = 0, 1
+        if dist.is_available() and dist.is_initialized():
+            rank, world = dist.get_rank(), dist.get_world_size()
+        worker = get_worker_info()
+        if worker is None:
+            return rank, world, 0, 1
+        return rank, world, worker.id, worker.num_workers
+
+    def _assigned_shards(self) -> List[Path]:
+        order = list(range(len(self.shards)))
+        if self.shuffle:
+            random.Random(self.seed + self.epoch).shuffle(order)
+        rank, world, worker_id, num_workers = self._partition()
+        reader, readers = rank * num_workers + worker_id, world * num_workers
+        assigned = order[reader::readers]
+        if not assigned and world > 1 and self.shuffle:
+            # More readers than shards: share one so every rank still produces samples
+            assigned = [order[reader % len(order)]]
+        return [self.shards[i] for i in assigned]
+
+    def _quota(self) -> Optional[int]:
+        """Per-reader sample count that keeps DDP training ranks in lock-step (None = unbounded)."""
+        _, world, worker_id, num_workers = self._partition()
+        if world == 1 or not self.shuffle:
+            return None
+        per_rank = self.num_samples // world
+        return per_rank // num_workers + (1 if worker_id < per_rank % num_workers else 0)
+
+    def _iter_records(self) -> Iterator[Tuple[bytes, int]]:
+        quota = self._quota()
+        if quota is None:
+            yield from self._read_shards(self._assigned_shards())
+            return
+        shards = self._assigned_shards()
+        produced = 0
+        while produced < quota and shards:
+            for record in self._read_shards(shards):
+                yield record
+                produced += 1
+                if produced >= quota:
+                    return
+
+    def _read_shards(self, shards: List[Path]) -> Iterator[Tuple[bytes, int]]:
+        for shard in shards:
+            image_bytes: Optional[bytes] = None
+            current_key: Optional[str] = None
+            # "r|" reads the archive strictly sequentially (no seeks)
+            with tarfile.open(shard, "r|") as tar:
+                for member in tar:
+                    if not member.isfile():
+                        continue
+                    key, _, ext = member.name.rpartition(".")
+                    payload = tar.extractfile(member).read()
+                    if key != current_key:
+                        current_key, image_bytes = key, None
+                    if ext == "cls":
+                        if image_bytes is not None:
+                            yield image_bytes, int(payload)
+                        current_key, image_bytes = None, None
+                    else:
+                        image_bytes = payload
+
+    def _decode(self, image_bytes: bytes, label: int) -> Tuple[torch.Tensor, int]:
+        img = Image.open(io.BytesIO(image_bytes)).convert("RGB")
+        if self.transform is not None:
+            img = self.transform(img)
+        return img, label
+
+    def __iter__(self):
+        records = self._iter_records()
+        if not self.shuffle:
+            for image_bytes, label in records:
+                yield self._decode(image_bytes, label)
+            return
+
+        rank, _, worker_id, _ = self._partition()
+        rng = random.Random(self.seed + self.epoch * 1000 + rank * 100 + worker_id)
+        buffer: List[Tuple[bytes, int]] = []
+        for record in records:
+            if len(buffer) < self.shuffle_buffer:
+                buffer.append(record)
+                continue
+            idx = rng.randrange(len(buffer))
+            buffer[idx], record = record, buffer[idx]
+            yield self._decode(*record)
+        rng.shuffle(buffer)
+        for record in buffer:
+            yield self._decode(*record)
+
+
+def main() -> None:
+    from .datasets import DATASETS
+
+    parser = argparse.ArgumentParser(description="Pack ImageFolder datasets into sequential tar shards")
+    parser.add_argument("--dataset", choices=DATASETS.keys(), help="Pack all splits of a known dataset")
+    parser.add_argument("--data-root", type=Path, default=Path("."), help="Root directory containing dataset folders")
+    parser.add_argument("--source", type=Path, help="Pack a single ImageFolder tree (e.g. PlantVillage-Dataset/raw/color)")
+    parser.add_argument("--split", type=str, default="train", help="Split name used with --source")
+    parser.add_argument("--output", type=Path, required=True, help="Output directory for shards")
+    parser.add_argument("--shard-size", type=int, default=2000, help="Samples per shard")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    if args.source:
+        jobs = {args.split: args.source}
+    elif args.dataset:
+        cfg = DATASETS[args.dataset]
+        jobs = {"train": args.data_root / cfg.train_dir, "val": args.data_root / cfg.val_dir}
+        if cfg.test_dir and (args.data_root / cfg.test_dir).exists():
+            jobs["test"] = args.data_root / cfg.test_dir
+    else:
+        parser.error("either --dataset or --source is required")
+
+    for split, source in jobs.items():
+        index = write_shards(source, args.output / split, shard_size=args.shard_size, seed=args.seed)
+        print(f"[✓] {split}: {index['num_samples']} samples in {len(index['shards'])} shards -> {args.output / split}")
+
+
+if __name__ == "__main__":
+    main()
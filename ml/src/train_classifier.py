@@ -6,19 +6,26 @@ from __future__ import annotations
 
 import argparse
 import math
+import os
+from contextlib import nullcontext
 from pathlib import Path
-from typing import Dict
+from typing import Dict, Optional, Tuple
 
 import timm
 import torch
+import torch.distributed as dist
+import torch.multiprocessing as mp
 from rich.console import Console
 from rich.table import Table
 from torch import nn
+from torch.nn.parallel import DistributedDataParallel
 from torch.optim import AdamW
 from torch.optim.lr_scheduler import CosineAnnealingLR
 from torch.utils.tensorboard import SummaryWriter
 
+from .checkpoint import CheckpointWriter
 from .datasets import DATASETS, DatasetConfig, create_dataloaders
+from .profiling import StepProfiler, build_torch_profiler
 from .utils import save_json
 
 console = Console()
@@ -31,6 +38,7 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument("--epochs", type=int, default=12)
     parser.add_argument("--batch-size", type=int, default=32)
     parser.add_argument("--num-workers", type=int, default=4)
+    parser.add_argument("--shards", type=Path, help="Read train/val from tar shards (see ml.src.shards) instead of ImageFolder")
     parser.add_argument("--lr", type=float, default=3e-4)
     parser.add_argument("--weight-decay", type=float, default=1e-4)
     parser.add_argument("--model-name", type=str, default="efficientnet_b0", help="Any timm model name")
@@ -38,8 +46,27 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument("--freeze-backbone", action="store_true", help="Freeze backbone for first 2 epochs")
     parser.add_argument("--resume", type=Path, help="Resume from checkpoint (.pth)")
     parser.add_argument("--export", type=Path, help="Export best weights to this path (.pt)")
+    parser.add_argument("--keep-last", type=int, default=3, help="Epoch checkpoints to keep (0 = all); best.pth is always kept")
     parser.add_argument("--device", type=str, default="cuda" if torch.cuda.is_available() else "cpu")
-    return parser.parse_args()
+    parser.add_argument("--amp", choices=AMP_DTYPES.keys(), default="none", help="Autocast dtype (fp16 uses GradScaler, CUDA only)")
+    parser.add_argument("--channels-last", action="store_true", help="Use channels_last memory format")
+    parser.add_argument("--compile", action="store_true", help="Wrap the model with torch.compile")
+    parser.add_argument("--grad-accum", type=int, default=1, help="Accumulate gradients over N batches")
+    parser.add_argument("--perf-stats", action="store_true", help="Record per-step data-wait/compute/optimizer timings")
+    parser.add_argument("--perf-log-every", type=int, default=10, help="Steps per TensorBoard perf window")
+    parser.add_argument("--profile-steps", type=str, help="torch.profiler trace window START:END (implies --perf-stats)")
+    parser.add_argument("--ddp-procs", type=int, default=1, help="DDP worker processes (gloo), e.g. one per CPU socket")
+    parser.add_argument("--ddp-threads", type=int, default=0, help="Torch threads per DDP process (default: cores / procs)")
+    parser.add_argument("--ddp-bind", action="store_true", help="Pin each DDP process to its own contiguous core group")
+    parser.add_argument("--ddp-port", type=int, default=29500, help="Rendezvous port on 127.0.0.1")
+    args = parser.parse_args()
+    if args.amp == "fp16" and not args.device.startswith("cuda"):
+        parser.error("--amp fp16 requires CUDA; use --amp bf16 on CPU")
+    if args.grad_accum < 1:
+        parser.error("--grad-accum must be >= 1")
+    if args.ddp_procs > 1 and not args.device.startswith("cpu"):
+        parser.error("--ddp-procs uses the gloo backend and is meant for CPU training")
+    return args
 
 
 def prepare_dataset(cfg: DatasetConfig, root: Path) -> DatasetConfig:
@@ -60,10 +87,22 @@ def build_model(model_name: str, num_classes: int) -> nn.Module:
     return model
 
 
-def accuracy(output: torch.Tensor, target: torch.Tensor) -> float:
-    preds = torch.argmax(output, dim=1)
-    correct = (preds == target).sum().item()
-    return correct / target.size(0)
+AMP_DTYPES = {"none": None, "bf16": torch.bfloat16, "fp16": torch.float16}
+
+
+def correct_count(output: torch.Tensor, target: torch.Tensor) -> torch.Tensor:
+    """Number of correct top-1 predictions, kept on device (no host sync)."""
+    return (torch.argmax(output, dim=1) == target).sum()
+
+
+def reduce_sums(loss_sum: torch.Tensor, correct: torch.Tensor, total: int) -> Tuple[float, int, int]:
+    """Read back epoch sums in one transfer, summed over all ranks when running under DDP."""
+    count = torch.tensor(float(total), device=loss_sum.device, dtype=torch.float64)
+    sums = torch.stack([loss_sum.double(), correct.double(), count])
+    if dist.is_available() and dist.is_initialized():
+        dist.all_reduce(sums, op=dist.ReduceOp.SUM)
+    loss_total, correct_total, total_all = sums.tolist()
+    return loss_total, int(correct_total), int(total_all)
 
 
 def train_one_epoch(
@@ -73,66 +112,170 @@ def train_one_epoch(
     criterion: nn.Module,
     device: torch.device,
     epoch: int,
-    writer: SummaryWriter,
+    writer: Optional[SummaryWriter],
+    *,
+    amp_dtype: Optional[torch.dtype] = None,
+    scaler: Optional[torch.cuda.amp.GradScaler] = None,
+    channels_last: bool = False,
+    grad_accum: int = 1,
+    profiler: Optional[StepProfiler] = None,
 ) -> float:
     model.train()
-    running_loss = 0.0
-    running_acc = 0.0
+    memory_format = torch.channels_last if channels_last else torch.contiguous_format
+    # Metrics are accumulated on device and read back once per epoch
+    loss_sum = torch.zeros((), device=device)
+    correct = torch.zeros((), device=device, dtype=torch.long)
     total = 0
+    pending = 0
 
+    optimizer.zero_grad(set_to_none=True)
+    if profiler is not None:
+        profiler.start("train")
     for step, (images, labels) in enumerate(loaders["train"], start=1):
-        images, labels = images.to(device), labels.to(device)
-        optimizer.zero_grad()
-        outputs = model(images)
-        loss = criterion(outputs, labels)
-        loss.backward()
-        optimizer.step()
+        images = images.to(device, non_blocking=True, memory_format=memory_format)
+        labels = labels.to(device, non_blocking=True)
+        if profiler is not None:
+            profiler.data_ready()
+        # Under DDP, skip the gradient all-reduce on accumulation micro-steps
+        sync_context = model.no_sync() if pending + 1 < grad_accum and hasattr(model, "no_sync") else nullcontext()
+        with sync_context:
+            with torch.autocast(device_type=device.type, dtype=amp_dtype, enabled=amp_dtype is not None):
+                outputs = model(images)
+                loss = criterion(outputs, labels)
+
+            scaled = loss / grad_accum
+            if scaler is not None:
+                scaler.scale(scaled).backward()
+            else:
+                scaled.backward()
+        pending += 1
+        if profiler is not None:
+            profiler.compute_done()
+
+        if pending == grad_accum:
+            _optimizer_step(optimizer, scaler)
+            pending = 0
 
         bs = labels.size(0)
         total += bs
-        running_loss += loss.item() * bs
-        running_acc += accuracy(outputs, labels) * bs
-
-    epoch_loss = running_loss / total
-    epoch_acc = running_acc / total
-    writer.add_scalar("train/loss", epoch_loss, epoch)
-    writer.add_scalar("train/acc", epoch_acc, epoch)
+        loss_sum += loss.detach().float() * bs
+        correct += correct_count(outputs.detach(), labels)
+        if profiler is not None:
+            profiler.step_done(bs)
+
+    if pending:
+        _optimizer_step(optimizer, scaler)
+
+    loss_total, correct_total, total = reduce_sums(loss_sum, correct, total)
+    epoch_loss = loss_total / total
+    epoch_acc = correct_total / total
+    if writer is not None:
+        writer.add_scalar("train/loss", epoch_loss, epoch)
+        writer.add_scalar("train/acc", epoch_acc, epoch)
+    if profiler is not None:
+        profiler.finish(epoch)
     return epoch_loss
 
 
+def _optimizer_step(optimizer: torch.optim.Optimizer, scaler: Optional[torch.cuda.amp.GradScaler]) -> None:
+    if scaler is not None:
+        scaler.step(optimizer)
+        scaler.update()
+    else:
+        optimizer.step()
+    optimizer.zero_grad(set_to_none=True)
+
+
 def evaluate(
     model: nn.Module,
     loaders: Dict[str, torch.utils.data.DataLoader],
     criterion: nn.Module,
     device: torch.device,
     epoch: int,
-    writer: SummaryWriter,
+    writer: Optional[SummaryWriter],
+    *,
+    amp_dtype: Optional[torch.dtype] = None,
+    channels_last: bool = False,
+    profiler: Optional[StepProfiler] = None,
 ) -> float:
     model.eval()
-    running_loss = 0.0
-    running_acc = 0.0
+    memory_format = torch.channels_last if channels_last else torch.contiguous_format
+    loss_sum = torch.zeros((), device=device)
+    correct = torch.zeros((), device=device, dtype=torch.long)
     total = 0
 
+    if profiler is not None:
+        profiler.start("val")
     with torch.no_grad():
         for images, labels in loaders["val"]:
-            images, labels = images.to(device), labels.to(device)
-            outputs = model(images)
-            loss = criterion(outputs, labels)
+            images = images.to(device, non_blocking=True, memory_format=memory_format)
+            labels = labels.to(device, non_blocking=True)
+            if profiler is not None:
+                profiler.data_ready()
+            with torch.autocast(device_type=device.type, dtype=amp_dtype, enabled=amp_dtype is not None):
+                outputs = model(images)
+                loss = criterion(outputs, labels)
 
             bs = labels.size(0)
             total += bs
-            running_loss += loss.item() * bs
-            running_acc += accuracy(outputs, labels) * bs
-
-    val_loss = running_loss / total
-    val_acc = running_acc / total
-    writer.add_scalar("val/loss", val_loss, epoch)
-    writer.add_scalar("val/acc", val_acc, epoch)
+            loss_sum += loss.float() * bs
+            correct += correct_count(outputs, labels)
+            if profiler is not None:
+                profiler.compute_done()
+                profiler.step_done(bs)
+
+    loss_total, correct_total, total = reduce_sums(loss_sum, correct, total)
+    val_loss = loss_total / total
+    val_acc = correct_total / total
+    if writer is not None:
+        writer.add_scalar("val/loss", val_loss, epoch)
+        writer.add_scalar("val/acc", val_acc, epoch)
+    if profiler is not None:
+        profiler.finish(epoch)
     return val_acc
 
 
+def setup_distributed(rank: int, args: argparse.Namespace) -> None:
+    """Join the gloo process group and pin this rank to its share of CPU cores."""
+    os.environ.setdefault("MASTER_ADDR", "127.0.0.1")
+    os.environ.setdefault("MASTER_PORT", str(args.ddp_port))
+    dist.init_process_group("gloo", rank=rank, world_size=args.ddp_procs)
+
+    threads = args.ddp_threads or max(1, (os.cpu_count() or 1) // args.ddp_procs)
+    torch.set_num_threads(threads)
+    if args.ddp_bind and hasattr(os, "sched_setaffinity"):
+        cores = sorted(os.sched_getaffinity(0))
+        group = cores[rank * threads : (rank + 1) * threads]
+        if group:
+            os.sched_setaffinity(0, group)
+
+
+def wrap_model(model: nn.Module, args: argparse.Namespace, distributed: bool) -> nn.Module:
+    """DDP / torch.compile wrappers for the forward pass; state_dict() is still taken from `model`."""
+    train_model = model
+    if distributed:
+        train_model = DistributedDataParallel(model)
+    if args.compile:
+        train_model = torch.compile(train_model)
+    return train_model
+
+
 def main() -> None:
     args = parse_args()
+    if args.ddp_procs > 1:
+        mp.spawn(run, args=(args,), nprocs=args.ddp_procs, join=True)
+    else:
+        run(0, args)
+
+
+def run(rank: int, args: argparse.Namespace) -> None:
+    distributed = args.ddp_procs > 1
+    if distributed:
+        setup_distributed(rank, args)
+    is_main = rank == 0
+    console.quiet = not is_main
+    world_size = args.ddp_procs if distributed else 1
+
     device = torch.device(args.device)
     cfg = prepare_dataset(DATASETS[args.dataset], args.data_root)
     cfg = DatasetConfig(**{**cfg.__dict__, "img_size": args.img_size})
@@ -142,11 +285,21 @@ def main() -> None:
         batch_size=args.batch_size,
         num_workers=args.num_workers,
         use_weighted_sampler=True,
+        shards_root=args.shards,
+        rank=rank,
+        world_size=world_size,
     )
-    num_classes = len(cfg.class_names)
+    class_names = tuple(loaders["train"].dataset.classes)
+    num_classes = len(class_names)
 
+    if distributed and not is_main:
+        dist.barrier()  # let rank 0 fetch pretrained weights into the cache first
     model = build_model(args.model_name, num_classes=num_classes)
+    if distributed and is_main:
+        dist.barrier()
     model.to(device)
+    if args.channels_last:
+        model.to(memory_format=torch.channels_last)
 
     backbone_frozen = False
     if args.freeze_backbone:
@@ -158,20 +311,37 @@ def main() -> None:
     criterion = nn.CrossEntropyLoss()
     optimizer = AdamW(model.parameters(), lr=args.lr, weight_decay=args.weight_decay)
     scheduler = CosineAnnealingLR(optimizer, T_max=args.epochs)
+    amp_dtype = AMP_DTYPES[args.amp]
+    scaler = torch.cuda.amp.GradScaler() if args.amp == "fp16" else None
+    train_model = wrap_model(model, args, distributed)
 
     run_dir = Path(f"ml/outputs/{cfg.name}")
     ckpt_dir = run_dir / "checkpoints"
     log_dir = run_dir / "logs"
-    ckpt_dir.mkdir(parents=True, exist_ok=True)
-    log_dir.mkdir(parents=True, exist_ok=True)
-    writer = SummaryWriter(log_dir=str(log_dir))
+
+    # Only rank 0 logs, checkpoints and exports
+    writer = None
+    torch_profiler = None
+    profiler = None
+    checkpoints = None
+    if is_main:
+        ckpt_dir.mkdir(parents=True, exist_ok=True)
+        log_dir.mkdir(parents=True, exist_ok=True)
+        writer = SummaryWriter(log_dir=str(log_dir))
+        if args.profile_steps:
+            torch_profiler = build_torch_profiler(args.profile_steps, log_dir / "profiler")
+            torch_profiler.start()
+        if args.perf_stats or torch_profiler is not None:
+            profiler = StepProfiler(writer, device, log_every=args.perf_log_every, torch_profiler=torch_profiler)
+        checkpoints = CheckpointWriter(ckpt_dir, keep_last=args.keep_last)
 
     start_epoch = 1
     best_acc = 0.0
+    best_weights = None
     best_path = ckpt_dir / "best.pth"
 
     if args.resume:
-        checkpoint = torch.load(args.resume, map_location=device, weights_only=False)
+        checkpoint = torch.load(args.resume, map_location="cpu", weights_only=False)
         model.load_state_dict(checkpoint["model"])
         optimizer.load_state_dict(checkpoint["optimizer"])
         scheduler.load_state_dict(checkpoint["scheduler"])
@@ -188,13 +358,55 @@ def main() -> None:
             for param in model.parameters():
                 param.requires_grad = True
             backbone_frozen = False
-        train_loss = train_one_epoch(model, loaders, optimizer, criterion, device, epoch, writer)
-        val_acc = evaluate(model, loaders, criterion, device, epoch, writer)
+            if distributed:
+                # DDP only reduces parameters that required grad when it was built
+                train_model = wrap_model(model, args, distributed)
+        for epoch_aware in (loaders["train"].dataset, loaders["train"].sampler, loaders["val"].sampler):
+            if hasattr(epoch_aware, "set_epoch"):
+                epoch_aware.set_epoch(epoch)
+        train_loss = train_one_epoch(
+            train_model,
+            loaders,
+            optimizer,
+            criterion,
+            device,
+            epoch,
+            writer,
+            amp_dtype=amp_dtype,
+            scaler=scaler,
+            channels_last=args.channels_last,
+            grad_accum=args.grad_accum,
+            profiler=profiler,
+        )
+        val_acc = evaluate(
+            train_model,
+            loaders,
+            criterion,
+            device,
+            epoch,
+            writer,
+            amp_dtype=amp_dtype,
+            channels_last=args.channels_last,
+            profiler=profiler,
+        )
         scheduler.step()
 
         console.print(f"Train loss: {train_loss:.4f} | Val acc: {val_acc:.4f}")
         metrics_summary[epoch] = {"train_loss": train_loss, "val_acc": val_acc}
-
+        if profiler is not None:
+            perf = profiler.summaries["train"]
+            console.print(
+                f"Train {perf['images_per_s']:.1f} img/s | data wait {perf['data_wait_frac']:.0%} | "
+                f"fwd/bwd {perf['compute_frac']:.0%} | optimizer {perf['optim_frac']:.0%} | "
+                f"peak mem {perf['peak_mem_mb']:.0f} MB"
+            )
+            metrics_summary[epoch]["perf"] = dict(profiler.summaries)
+
+        is_best = val_acc > best_acc
+        if is_best:
+            best_acc = val_acc
+        if not is_main:
+            continue
         state = {
             "epoch": epoch,
             "model": model.state_dict(),
@@ -203,20 +415,27 @@ def main() -> None:
             "best_acc": best_acc,
             "config": vars(args),
         }
-        torch.save(state, ckpt_dir / f"epoch_{epoch:03d}.pth")
-
-        if val_acc > best_acc:
-            best_acc = val_acc
-            torch.save(state, best_path)
-            console.print(f"[green]New best model saved to {best_path} (acc={best_acc:.4f})[/green]")
-
+        snapshot = checkpoints.save(state, epoch, is_best=is_best)
+        if is_best:
+            best_weights = snapshot["model"]
+            console.print(f"[green]New best model queued for {best_path} (acc={best_acc:.4f})[/green]")
+
+    if not is_main:
+        dist.destroy_process_group()
+        return
+
+    checkpoints.close()
+    if torch_profiler is not None:
+        torch_profiler.stop()
     writer.close()
     save_json({"best_acc": best_acc, "epochs": metrics_summary}, run_dir / "metrics.json")
 
     if args.export:
         console.print(f"[cyan]Exporting best checkpoint to {args.export}[/cyan]")
-        best_state = torch.load(best_path, map_location=device, weights_only=False)
-        model.load_state_dict(best_state["model"])
+        if best_weights is None:
+            # Nothing improved during this run (e.g. --resume + --export only): fall back to disk
+            best_weights = torch.load(best_path, map_location="cpu", weights_only=False)["model"]
+        model.load_state_dict(best_weights)
         model.eval()
         args.export.parent.mkdir(parents=True, exist_ok=True)
         torch.save(
@@ -224,7 +443,7 @@ def main() -> None:
                 "model_name": args.model_name,
                 "img_size": cfg.img_size,
                 "state_dict": model.state_dict(),
-                "class_names": cfg.class_names,
+                "class_names": class_names,
                 "mean": cfg.mean,
                 "std": cfg.std,
             },
@@ -235,10 +454,21 @@ def main() -> None:
     table.add_column("Epoch", justify="right")
     table.add_column("Train Loss")
     table.add_column("Val Acc")
+    if profiler is not None:
+        table.add_column("Img/s", justify="right")
+        table.add_column("Data Wait", justify="right")
     for epoch, metrics in metrics_summary.items():
-        table.add_row(str(epoch), f"{metrics['train_loss']:.4f}", f"{metrics['val_acc']:.4f}")
+        row = [str(epoch), f"{metrics['train_loss']:.4f}", f"{metrics['val_acc']:.4f}"]
+        if "perf" in metrics:
+            perf = metrics["perf"]["train"]
+            row += [f"{perf['images_per_s']:.1f}", f"{perf['data_wait_frac']:.0%}"]
+        elif profiler is not None:
+            row += ["-", "-"]
+        table.add_row(*row)
     console.print(table)
     console.print(f"[bold green]Best validation accuracy: {best_acc:.4f}[/bold green]")
+    if distributed:
+        dist.destroy_process_group()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Anomali dedektörünün hız ve isabet ölçümü.
+
+tools/simulate.py'ye benzer random-walk seriler üretir, belirli aralıklarla
+spike enjekte eder ve backend/anomaly.py'deki dedektörü bu akışla besler:
+
+    python3 tools/bench_anomaly.py --readings 200000 --sensors 30
+
+Çıktı: saniyede işlenen okuma, enjekte edilen spike'ların yakalanma oranı
+ve spike dışı okumalarda yanlış alarm oranı.
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from anomaly import AnomalyDetector  # noqa: E402
+
+# tip -> (merkez, adım gürültüsü, spike delta aralığı)
+PROFILES = {
+    "temp": (21.0, 0.08, (3.5, 4.0)),
+    "humidity": (60.0, 0.12, (18.0, 20.0)),
+    "co2": (650.0, 2.0, (200.0, 300.0)),
+}
+
+
+def generate(n_readings, n_sensors, spike_prob, seed):
+    rng = random.Random(seed)
+    sensors = []
+    for i in range(n_sensors):
+        kind = list(PROFILES)[i % len(PROFILES)]
+        sensors.append([f"{kind}-{i}", kind, PROFILES[kind][0]])
+    stream = []
+    for i in range(n_readings):
+        sensor = sensors[i % n_sensors]
+        sid, kind, level = sensor
+        center, jitter, (lo, hi) = PROFILES[kind]
+        level += rng.gauss(0, jitter) + (center - level) * 0.01
+        sensor[2] = level
+        spike = rng.random() < spike_prob
+        value = level + (rng.choice((-1, 1)) * rng.uniform(lo, hi) if spike else 0.0)
+        stream.append((sid, kind, value, i * 0.01, spike))
+    return stream
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Streaming anomaly detector benchmark")
+    parser.add_argument("--readings", type=int, default=200_000)
+    parser.add_argument("--sensors", type=int, default=30)
+    parser.add_argument("--spike-prob", type=float, default=0.01)
+    parser.add_argument("--threshold", type=float, default=4.0)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    stream = generate(args.readings, args.sensors, args.spike_prob, args.seed)
+    detector = AnomalyDetector(threshold=args.threshold, suppress_seconds=60.0)
+
+    start = time.perf_counter()
+    flagged = [detector.update(sid, kind, value, ts) is not None for sid, kind, value, ts, _ in stream]
+    elapsed = time.perf_counter() - start
+
+    spikes = sum(1 for *_, spike in stream if spike)
+    hits = sum(1 for f, (*_, spike) in zip(flagged, stream) if f and spike)
+    false_pos = sum(1 for f, (*_, spike) in zip(flagged, stream) if f and not spike)
+    normal = len(stream) - spikes
+
+    print(f"readings       : {len(stream)} ({args.sensors} sensör)")
+    print(f"throughput     : {len(stream) / elapsed:,.0f} okuma/sn ({elapsed / len(stream) * 1e6:.2f} µs/okuma)")
+    print(f"spike recall   : {hits}/{spikes} ({hits / max(spikes, 1):.1%})")
+    print(f"false positive : {false_pos}/{normal} ({false_pos / max(normal, 1):.3%})")
+    print(f"detector stats : {detector.stats}")
+    if len(stream) / elapsed < 10_000:
+        print("⚠️  10k okuma/sn hedefinin altında")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Okuma başına bayt ve tarama hızı: satır düzenleri vs sıkıştırılmış bloklar.
+
+Aynı sentetik okumaları (sensör başına düzenli aralık + küçük jitter, yavaş
+değişen değerler) üç SQLite dosyasına yazar ve VACUUM sonrası boyutları
+karşılaştırır:
+
+- wide   : ReadingDB şeması (sensor_id/type metni, ts, ts_ms) + (ts_ms), (sensor_id, ts_ms) indeksleri,
+- keyed  : sensör sözlüğü anahtarı (INTEGER) + (ts_ms), (sensor, ts_ms) indeksleri,
+- blocks : backend/reading_blocks.py saatlik blokları.
+
+Ardından bir sensörün tüm geçmişini NumPy dizilerine okuma süresini ölçer
+(blocks için vektörel çözme ve referans olarak saf Python çözme):
+
+    python3 tools/bench_codec.py --sensors 30 --days 30 --interval 10
+"""
+import argparse
+import os
+import sqlite3
+import statistics
+import struct
+import sys
+import tempfile
+import time
+import zlib
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from reading_blocks import BlockStore, decode_block, ts_text_array  # noqa: E402
+
+KINDS = ("temp", "humidity", "co2")
+CENTERS = np.array([21.0, 60.0, 650.0])
+SCALES = np.array([0.05, 0.2, 3.0])
+
+
+def generate(sensors, days, interval, decimals, seed=7):
+    """(anahtar, ts µs, değer) kolonları; anahtar 1..sensors. Zaman damgaları ms'ye hizalı (satır tabloları ms tutar)."""
+    rng = np.random.default_rng(seed)
+    per_sensor = int(days * 86400 / interval)
+    start = (int(time.time() * 1000) - int(days * 86400_000)) * 1000
+    keys, ts, values = [], [], []
+    for key in range(1, sensors + 1):
+        kind = (key - 1) % 3
+        jitter = rng.integers(-200, 200, per_sensor) * 1000
+        ts.append(start + np.arange(per_sensor, dtype=np.int64) * int(interval * 1e6) + jitter)
+        walk = CENTERS[kind] + np.cumsum(rng.normal(0, SCALES[kind], per_sensor))
+        values.append(np.round(walk, decimals) if decimals >= 0 else walk)
+        keys.append(np.full(per_sensor, key, dtype=np.int64))
+    return np.concatenate(keys), np.concatenate(ts), np.concatenate(values)
+
+
+def sensor_names(sensors):
+    return {key: (f"{KINDS[(key - 1) % 3]}-{key - 1}", KINDS[(key - 1) % 3]) for key in range(1, sensors + 1)}
+
+
+def build_rows(path, layout, keys, ts, values, names):
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=OFF")
+    conn.execute("PRAGMA synchronous=OFF")
+    ts_col = ts_text_array(ts)
+    ms_col = (ts // 1000).tolist()
+    if layout == "wide":
+        conn.execute(
+            "CREATE TABLE readings (id INTEGER PRIMARY KEY, sensor_id VARCHAR NOT NULL, type VARCHAR NOT NULL, "
+            "value FLOAT NOT NULL, ts DATETIME NOT NULL, ts_ms INTEGER NOT NULL)"
+        )
+        conn.executemany(
+            "INSERT INTO readings (sensor_id, type, value, ts, ts_ms) VALUES (?, ?, ?, ?, ?)",
+            ((*names[k], v, t, ms) for k, v, t, ms in zip(keys.tolist(), values.tolist(), ts_col, ms_col)),
+        )
+        conn.execute("CREATE INDEX ix_ts_ms ON readings (ts_ms)")
+        conn.execute("CREATE INDEX ix_sensor_ts_ms ON readings (sensor_id, ts_ms)")
+    else:
+        conn.execute("CREATE TABLE reading_sensors (id INTEGER PRIMARY KEY, sensor_id VARCHAR, type VARCHAR)")
+        conn.executemany("INSERT INTO reading_sensors VALUES (?, ?, ?)", ((k, *n) for k, n in names.items()))
+        conn.execute(
+            "CREATE TABLE readings (id INTEGER PRIMARY KEY, sensor INTEGER NOT NULL, value FLOAT NOT NULL, "
+            "ts DATETIME NOT NULL, ts_ms INTEGER NOT NULL)"
+        )
+        conn.executemany(
+            "INSERT INTO readings (sensor, value, ts, ts_ms) VALUES (?, ?, ?, ?)",
+            zip(keys.tolist(), values.tolist(), ts_col, ms_col),
+        )
+        conn.execute("CREATE INDEX ix_ts_ms ON readings (ts_ms)")
+        conn.execute("CREATE INDEX ix_sensor_ts_ms ON readings (sensor, ts_ms)")
+    conn.commit()
+    conn.execute("VACUUM")
+    conn.close()
+
+
+def build_blocks(path, keys, ts, values, names):
+    from sqlalchemy import create_engine, text
+
+    engine = create_engine(f"sqlite:///{path}")
+    blocks = BlockStore("reading_sensors")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE reading_sensors (id INTEGER PRIMARY KEY, sensor_id VARCHAR, type VARCHAR)"))
+        conn.execute(
+            text("INSERT INTO reading_sensors VALUES (:id, :sid, :type)"),
+            [{"id": k, "sid": sid, "type": kind} for k, (sid, kind) in names.items()],
+        )
+        blocks.create(conn)
+        blocks.compact(conn, keys, ts, values)
+    with engine.connect() as conn:
+        stats = blocks.stats(conn)
+    engine.dispose()
+    conn = sqlite3.connect(path)
+    conn.execute("VACUUM")
+    conn.close()
+    return stats
+
+
+def naive_decode(count, ts_blob, val_blob):
+    """Aynı biçimin saf Python çözümü (vektörel çözmeyle karşılaştırma için)."""
+    ts0, d0, width = struct.unpack_from("<qqB", ts_blob)
+    ts = [ts0]
+    if count > 1:
+        raw = zlib.decompress(ts_blob[17:])
+        size = 1 << width
+        delta = d0
+        ts.append(ts0 + delta)
+        for i in range(count - 2):
+            u = int.from_bytes(raw[i * size:(i + 1) * size], "little")
+            delta += (u >> 1) ^ -(u & 1)
+            ts.append(ts[-1] + delta)
+    planes = zlib.decompress(val_blob)
+    values, prev = [], 0
+    for i in range(count):
+        bits = int.from_bytes(bytes(planes[b * count + i] for b in range(8)), "little") ^ prev
+        values.append(struct.unpack("<d", bits.to_bytes(8, "little"))[0])
+        prev = bits
+    return ts, values
+
+
+def timed(fn, repeat):
+    times, result = [], None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - t0)
+    return statistics.median(times), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bytes/reading and scan speed: row layouts vs compressed blocks")
+    parser.add_argument("--sensors", type=int, default=30)
+    parser.add_argument("--days", type=float, default=30)
+    parser.add_argument("--interval", type=float, default=10.0, help="sensör başına okuma aralığı (sn)")
+    parser.add_argument("--decimals", type=int, default=2, help="değer yuvarlama; -1 = ham float")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--dir", default=None, help="dosyaların yazılacağı dizin (varsayılan geçici)")
+    args = parser.parse_args()
+
+    keys, ts, values = generate(args.sensors, args.days, args.interval, args.decimals)
+    names = sensor_names(args.sensors)
+    n = keys.size
+    print(f"{n:,} okuma, {args.sensors} sensör, {args.interval:g} sn aralık, {args.decimals} ondalık")
+
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp:
+        paths = {layout: os.path.join(tmp, f"{layout}.db") for layout in ("wide", "keyed", "blocks")}
+        t0 = time.perf_counter()
+        build_rows(paths["wide"], "wide", keys, ts, values, names)
+        build_rows(paths["keyed"], "keyed", keys, ts, values, names)
+        stats = build_blocks(paths["blocks"], keys, ts, values, names)
+        print(f"  yazma: {time.perf_counter() - t0:.0f} sn; bloklar: {stats['blocks']:,}, "
+              f"blob {stats['bytes_per_reading']} bayt/okuma")
+
+        print(f"{'düzen':<8}{'dosya (MiB)':>14}{'bayt/okuma':>14}")
+        for layout, path in paths.items():
+            size = os.path.getsize(path)
+            print(f"{layout:<8}{size / 2**20:>14.1f}{size / n:>14.1f}")
+
+        sensor_key = 1
+        sensor_id = names[sensor_key][0]
+        expected = int((keys == sensor_key).sum())
+        wide = sqlite3.connect(paths["wide"])
+        keyed = sqlite3.connect(paths["keyed"])
+        blocks = sqlite3.connect(paths["blocks"])
+
+        def scan_rows(conn, sql, param):
+            rows = conn.execute(sql, (param,)).fetchall()
+            t, v = zip(*rows)
+            return np.array(t, dtype=np.int64) * 1000, np.array(v)
+
+        def fetch_blocks():
+            return blocks.execute(
+                "SELECT count, ts_blob, val_blob FROM reading_blocks WHERE sensor = ? ORDER BY hour", (sensor_key,)
+            ).fetchall()
+
+        def scan_blocks(decode):
+            parts = [decode(*row) for row in fetch_blocks()]
+            return np.concatenate([p[0] for p in parts]), np.concatenate([p[1] for p in parts])
+
+        cases = [
+            ("wide SQL", lambda: scan_rows(
+                wide, "SELECT ts_ms, value FROM readings WHERE sensor_id = ? ORDER BY ts_ms", sensor_id)),
+            ("keyed SQL", lambda: scan_rows(
+                keyed, "SELECT ts_ms, value FROM readings WHERE sensor = ? ORDER BY ts_ms", sensor_key)),
+            ("blocks NumPy", lambda: scan_blocks(decode_block)),
+            ("blocks Python", lambda: scan_blocks(naive_decode)),
+        ]
+        print(f"tek sensör tarama ({expected:,} okuma):")
+        reference = None
+        for label, fn in cases:
+            elapsed, (t, v) = timed(fn, args.repeat)
+            t = np.asarray(t, dtype=np.int64)
+            v = np.asarray(v, dtype=np.float64)
+            if reference is None:
+                reference = (t, v)
+            ok = len(t) == expected and (t == reference[0]).all() and (v == reference[1]).all()
+            print(f"  {label:<16}{elapsed * 1000:>10.1f} ms{expected / elapsed / 1e6:>10.1f} M okuma/sn"
+                  f"  {'aynı' if ok else 'FARKLI'}")
+        for conn in (wide, keyed, blocks):
+            conn.close()
+
+
+if __name__ == "__main__":
+    main()
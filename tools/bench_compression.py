@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Yanıt sıkıştırma: kodlama/seviye başına aktarım baytı ve sıkıştırma süresi.
+
+Tipik büyük yanıtları backend/fast_json.py ile üretir (10k okuma, ts_format=ms,
+1000 alarm, model-metrics confusion matrisleri, analyze-plant yanıtı sınıf
+olasılıklarıyla/olasılıksız) ve backend/compression.py'nin kodlayıcılarıyla
+sıkıştırır:
+
+    python3 tools/bench_compression.py --rows 10000
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+import compression  # noqa: E402
+from compression import _BrotliEncoder, _GzipEncoder  # noqa: E402
+from fast_json import dumps, iso_z_ms  # noqa: E402
+
+
+def payloads(rows, classes):
+    rng = random.Random(7)
+    start_ms = 1_735_689_600_000
+    stamps = [start_ms + i * 10_000 + rng.randrange(1000) for i in range(rows)]
+    kinds = ("temp", "humidity", "co2")
+    readings = [
+        {"id": i, "sensor_id": f"{kinds[i % 3]}-{i % 30}", "type": kinds[i % 3], "value": round(rng.uniform(0, 100), 2)}
+        for i in range(rows)
+    ]
+    iso = [dict(r, ts=ts) for r, ts in zip(readings, iso_z_ms(stamps))]
+    ms = [dict(r, ts_ms=ts) for r, ts in zip(readings, stamps)]
+    alerts = [
+        {"id": i, "level": "warning", "source": f"anomaly:temp-{i % 30}",
+         "message": f"temp-{i % 30} temp={rng.uniform(20, 40):.2f} beklenenden yüksek (z={rng.uniform(4, 9):.2f})",
+         "ts": ts}
+        for i, ts in enumerate(iso_z_ms(stamps[:1000]))
+    ]
+    names = [f"Plant_{i}___Disease_{i % 7}" for i in range(classes)]
+    metrics = {
+        "confusion_matrices": {
+            "plant": {"matrix": [[rng.randrange(200) if i == j else rng.randrange(5) for j in range(classes)]
+                                 for i in range(classes)], "class_names": names},
+        },
+    }
+    probabilities = [rng.random() for _ in range(classes)]
+    total = sum(probabilities)
+    analyze = {
+        "status": "Model Tahmini", "disease": names[0], "confidence_score": 0.91,
+        "analysis": {"model": "outdoor", "alternatives": [{"model": "outdoor", "class_name": names[0], "confidence": 0.91}]},
+        "recommendations": ["Bitki sağlıklı görünüyor.", "Mevcut bakım rutininizi sürdürün."],
+    }
+    analyze_probs = {**analyze, "analysis": {**analyze["analysis"], "alternatives": [
+        {**analyze["analysis"]["alternatives"][0], "probabilities": {n: p / total for n, p in zip(names, probabilities)}}
+    ]}}
+    return [
+        (f"readings {rows:,} (iso)", dumps(iso)),
+        (f"readings {rows:,} (ms)", dumps(ms)),
+        ("alerts 1,000", dumps(alerts)),
+        (f"model-metrics {classes}x{classes}", dumps(metrics)),
+        ("analyze-plant", dumps(analyze)),
+        ("analyze-plant +olasılık", dumps(analyze_probs)),
+    ]
+
+
+def timed(fn, repeat):
+    times, result = [], None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - t0)
+    return statistics.median(times) * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Response compression: bytes and time per encoding")
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--classes", type=int, default=38, help="sınıf sayısı (confusion matrisi / olasılıklar)")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    encoders = [("gzip-1", lambda: _GzipEncoder(1)), ("gzip-6", lambda: _GzipEncoder(6))]
+    if compression.brotli is not None:
+        encoders += [("br-4", lambda: _BrotliEncoder(4)), ("br-6", lambda: _BrotliEncoder(6))]
+    else:
+        print("brotli kurulu değil: yalnızca gzip")
+
+    print(f"{'yanıt':<26}{'ham':>10}" + "".join(f"{name:>18}" for name, _ in encoders))
+    for label, body in payloads(args.rows, args.classes):
+        cells = []
+        for _, make in encoders:
+            elapsed, out = timed(lambda: make().compress(body, True), args.repeat)
+            cells.append(f"{len(out):>9,} {elapsed:>5.1f}ms")
+        print(f"{label:<26}{len(body):>10,}" + "".join(f"{c:>18}" for c in cells))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Yüksek hacimli uç noktaların yanıt serileştirme süresi: önce / sonra.
+
+Her veri kümesi için 10k satırlık yanıt gövdesini üç yolla üretir:
+
+- önce          : satır başına dict + iso_z(datetime), FastAPI'nin varsayılanı
+                  olan jsonable_encoder + stdlib json (JSONResponse),
+- response_model: aynı satırlar pydantic TypeAdapter ile doğrulanıp
+                  serileştirilir (response_model eklenip Response dönülmeseydi),
+- sonra         : backend/fast_json.py FastJSONResponse (orjson); ts'ler
+                  SQL'den hazır string (alerts/actuator) ya da toplu
+                  biçimlendirilmiş epoch ms (readings).
+
+    python3 tools/bench_json.py --rows 10000
+    python3 tools/bench_json.py --no-orjson   # stdlib json yedeği
+"""
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from types import SimpleNamespace
+from typing import List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+from pydantic import BaseModel, TypeAdapter  # noqa: E402
+
+import fast_json  # noqa: E402
+from fast_json import FastJSONResponse, iso_z_ms  # noqa: E402
+
+
+class ReadingOut(BaseModel):
+    id: Optional[int] = None
+    sensor_id: str
+    type: str
+    value: float
+    ts: Optional[str] = None
+    ts_ms: Optional[int] = None
+
+
+class AlertOut(BaseModel):
+    id: int
+    level: str
+    source: str
+    message: str
+    ts: str
+
+
+class SeriesBucketOut(BaseModel):
+    bucket: str
+    count: int
+    min: float
+    max: float
+    avg: float
+
+
+def iso_z(dt):
+    return dt.astimezone(timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+def to_utc(dt):
+    return dt.replace(tzinfo=timezone.utc) if dt.tzinfo is None else dt.astimezone(timezone.utc)
+
+
+def datasets(n):
+    rng = random.Random(7)
+    start = datetime(2025, 1, 1)
+    stamps = [start + timedelta(milliseconds=i * 10_000 + rng.randrange(1000)) for i in range(n)]
+    epoch_ms = [(t - datetime(1970, 1, 1)) // timedelta(milliseconds=1) for t in stamps]
+    kinds = ("temp", "humidity", "co2")
+    values = [round(rng.uniform(0, 100), 2) for _ in range(n)]
+
+    # readings: önce store datetime döndürüp satır başına iso_z; sonra ts_ms + toplu biçimlendirme
+    def readings_before():
+        rows = [
+            {"id": i, "sensor_id": f"{kinds[i % 3]}-{i % 30}", "type": kinds[i % 3], "value": values[i], "ts": to_utc(stamps[i])}
+            for i in range(n)
+        ]
+        for r in rows:
+            r["ts"] = iso_z(r["ts"])
+        return rows
+
+    def readings_after():
+        rows = [
+            {"id": i, "sensor_id": f"{kinds[i % 3]}-{i % 30}", "type": kinds[i % 3], "value": values[i]}
+            for i in range(n)
+        ]
+        for r, iso in zip(rows, iso_z_ms(epoch_ms)):
+            r["ts"] = iso
+        return rows
+
+    # alerts: önce ORM nesneleri; sonra SQL'den (id, level, source, message, ts_iso) tuple'ları
+    orm_alerts = [
+        SimpleNamespace(id=i, level="warning", source=f"temp-{i % 30}", message=f"Spike z={values[i]:.2f}", ts=stamps[i])
+        for i in range(n)
+    ]
+    tuple_alerts = [(a.id, a.level, a.source, a.message, iso) for a, iso in zip(orm_alerts, iso_z_ms(epoch_ms))]
+    alert_fields = ("id", "level", "source", "message", "ts")
+
+    def alerts_before():
+        return [
+            {"id": a.id, "level": a.level, "source": a.source, "message": a.message, "ts": iso_z(to_utc(a.ts))}
+            for a in orm_alerts
+        ]
+
+    def alerts_after():
+        return [dict(zip(alert_fields, row)) for row in tuple_alerts]
+
+    series = [
+        {"bucket": f"{start + timedelta(hours=i):%Y-%m-%d %H:00:00}", "count": 360, "min": values[i] - 5,
+         "max": values[i] + 5, "avg": values[i]}
+        for i in range(n)
+    ]
+    return [
+        ("readings", readings_before, readings_after, ReadingOut),
+        ("alerts", alerts_before, alerts_after, AlertOut),
+        ("stats_series", lambda: [dict(r) for r in series], lambda: [dict(r) for r in series], SeriesBucketOut),
+    ]
+
+
+def timed(fn, repeat):
+    times, result = [], None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - t0)
+    return statistics.median(times) * 1000, result
+
+
+def normalized(body):
+    """ts hassasiyeti (µs vs ms) dışında aynı içerik mi: ts'ler ms'ye indirgenir."""
+    rows = json.loads(body)
+    for r in rows:
+        if "ts" in r:
+            r["ts"] = datetime.fromisoformat(r["ts"].replace("Z", "+00:00")).isoformat(timespec="milliseconds")
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JSON response serialization: before/after")
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--no-orjson", action="store_true", help="orjson kurulu değilmiş gibi stdlib json'a düş")
+    args = parser.parse_args()
+    if args.no_orjson:
+        fast_json.orjson = None
+
+    print(f"{args.rows:,} satır, orjson: {'var' if fast_json.orjson is not None else 'YOK (stdlib json)'}")
+    print(f"{'yanıt':<14}{'önce':>10}{'response_model':>16}{'sonra':>10}{'hızlanma':>10}  bayt")
+    for name, before, after, model in datasets(args.rows):
+        adapter = TypeAdapter(List[model])
+        t_before, body_before = timed(lambda: JSONResponse(jsonable_encoder(before())).body, args.repeat)
+        t_model, _ = timed(
+            lambda: JSONResponse(adapter.dump_python(adapter.validate_python(before()), mode="json")).body,
+            args.repeat,
+        )
+        t_after, body_after = timed(lambda: FastJSONResponse(after()).body, args.repeat)
+        same = normalized(body_before) == normalized(body_after)
+        print(
+            f"{name:<14}{t_before:>8.1f}ms{t_model:>14.1f}ms{t_after:>8.1f}ms{t_before / t_after:>9.1f}x"
+            f"  {len(body_after):,} {'aynı' if same else 'FARKLI'}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Metrik kaydının istek başına maliyeti.
+
+backend/metrics.py'yi ölçer:
+
+- tek başına kayıt işlemleri (histogram observe, labels + observe, sayaç),
+- MetricsMiddleware'in istek başına ek süresi: yönlendirmeyi taklit eden
+  (scope'a route yazan) en küçük ASGI uygulaması middleware'li ve
+  middleware'siz dönüşümlü çağrılır. Framework maliyeti ölçüme girmez;
+  gürültüye karşı turların en iyisi karşılaştırılır.
+
+    python3 tools/bench_metrics.py --requests 50000
+"""
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from metrics import MetricsMiddleware, Registry  # noqa: E402
+
+
+class _Route:
+    path = "/api/v1/actuator/{device}"
+
+
+async def routed_app(scope, receive, send):
+    scope["route"] = _Route
+    await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/json")]})
+    await send({"type": "http.response.body", "body": b'{"ok":true}'})
+
+
+def per_call_ns(fn, n):
+    t0 = time.perf_counter_ns()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter_ns() - t0) / n
+
+
+async def drive(app, n):
+    scope = {"type": "http", "method": "GET", "path": "/api/v1/actuator/fan", "headers": [(b"host", b"t")]}
+
+    async def send(message):
+        pass
+
+    t0 = time.perf_counter_ns()
+    for _ in range(n):
+        await app(dict(scope), None, send)
+    return (time.perf_counter_ns() - t0) / n
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-request cost of metrics recording")
+    parser.add_argument("--requests", type=int, default=50_000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    registry = Registry()
+    hist = registry.histogram("h", "h", ("method", "route"))
+    counter = registry.counter("c", "c", ("method", "route", "status"))
+    child = hist.labels("GET", "/x")
+    loop_child = registry.histogram("l", "l", ("method", "route"), threadsafe=False).labels("GET", "/x")
+    n = 200_000
+    print("kayıt işlemleri:")
+    print(f"  histogram observe            {per_call_ns(lambda: child.observe(0.0042), n):>8.0f} ns")
+    print(f"  histogram observe (kilitsiz) {per_call_ns(lambda: loop_child.observe(0.0042), n):>8.0f} ns")
+    print(f"  labels + observe             {per_call_ns(lambda: hist.labels('GET', '/x').observe(0.0042), n):>8.0f} ns")
+    print(f"  labels + counter inc         {per_call_ns(lambda: counter.labels('GET', '/x', '200').inc(), n):>8.0f} ns")
+
+    plain = routed_app
+    registry = Registry()
+    measured = MetricsMiddleware(routed_app, registry=registry)
+    base, with_mw = [], []
+    for _ in range(args.rounds):
+        base.append(asyncio.run(drive(plain, args.requests)))
+        with_mw.append(asyncio.run(drive(measured, args.requests)))
+    b, m = min(base), min(with_mw)
+    print(f"istek başına ({args.requests:,} istek x {args.rounds} tur, en iyi tur):")
+    print(f"  middleware'siz               {b / 1000:>8.2f} µs")
+    print(f"  MetricsMiddleware ile        {m / 1000:>8.2f} µs")
+    print(f"  ek maliyet                   {(m - b) / 1000:>8.2f} µs")
+    sample = [line for line in registry.render().splitlines() if line.startswith("http_requests_total")]
+    print("  " + sample[0])
+
+
+if __name__ == "__main__":
+    main()
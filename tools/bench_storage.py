@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Okuma deposu backend'lerinin toplama (stats_series) hızı.
+
+ReadingDB şemasında bir SQLite dosyasını sentetik okumalarla doldurur
+(varsayılan 10M satır, son 365 gün), DuckDB kopyasını backend/reading_store.py
+içindeki senkron yoluyla oluşturur ve aynı günlük/saatlik toplamaları iki
+backend'de çalıştırıp süreleri karşılaştırır:
+
+    python3 tools/bench_storage.py --rows 10000000 --db /tmp/bench_readings.db
+
+Dosya varsa yeniden üretilmez (--rebuild ile zorlanır). --index, SQLite'a
+(type, ts_ms) indeksi ekler; uygulamanın şeması bu indeksi içermez.
+
+--partition month|week|day aynı veriyi bölümlemeli depoya da kopyalar ve
+sorguları onda da ölçer. --retention en eski bölüm kadar veriyi tek tabloda
+DELETE ile, bölümlemede DROP TABLE ile silip süreleri karşılaştırır (dosyalar
+değişir; sonraki çalıştırmada --rebuild kullanın). --compact N, bölümlemeli
+kopyada N günden eski bölümleri sıkıştırılmış bloklara taşır; sorgular o
+andan itibaren blok segmentini de okur.
+"""
+import argparse
+import asyncio
+import os
+import sqlite3
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from reading_store import (  # noqa: E402
+    DuckDBReadingStore,
+    PartitionedSqliteStore,
+    SqliteReadingStore,
+    partition_for,
+    ts_text,
+)
+
+KINDS = ("temp", "humidity", "co2")
+CENTERS = np.array([21.0, 60.0, 650.0])
+
+QUERIES = [
+    ("daily", timedelta(days=7)),
+    ("daily", timedelta(days=30)),
+    ("daily", timedelta(days=365)),
+    ("hourly", timedelta(hours=24)),
+    ("hourly", timedelta(days=7)),
+]
+
+
+def build_sqlite(path, rows, sensors, days, index, chunk=500_000):
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute(
+        "CREATE TABLE readingdb (id INTEGER NOT NULL PRIMARY KEY, sensor_id VARCHAR NOT NULL, "
+        "type VARCHAR NOT NULL, value FLOAT NOT NULL, ts DATETIME NOT NULL, ts_ms INTEGER)"
+    )
+    rng = np.random.default_rng(7)
+    end = datetime.now(timezone.utc).replace(tzinfo=None)
+    span_us = int(days * 86400 * 1e6)
+    start = np.datetime64(end, "us") - np.timedelta64(span_us, "us")
+    step = span_us / rows
+    sensor_names = [f"{KINDS[i % 3]}-{i}" for i in range(sensors)]
+    t0 = time.perf_counter()
+    for offset in range(0, rows, chunk):
+        n = min(chunk, rows - offset)
+        idx = np.arange(offset, offset + n)
+        sensor_idx = idx % sensors
+        kind_idx = sensor_idx % 3
+        values = CENTERS[kind_idx] + rng.normal(0, 1, n) * np.array([1.5, 5.0, 40.0])[kind_idx]
+        ts = start + (idx * step).astype("timedelta64[us]")
+        ts_text = np.datetime_as_string(ts, unit="us")
+        ts_ms = ts.astype("datetime64[ms]").astype(np.int64)
+        conn.executemany(
+            "INSERT INTO readingdb (sensor_id, type, value, ts, ts_ms) VALUES (?, ?, ?, ?, ?)",
+            (
+                (sensor_names[s], KINDS[k], float(v), t.replace("T", " "), ms)
+                for s, k, v, t, ms in zip(
+                    sensor_idx.tolist(), kind_idx.tolist(), values.tolist(), ts_text.tolist(), ts_ms.tolist()
+                )
+            ),
+        )
+        conn.commit()
+        print(f"\r  sqlite: {offset + n:>12,} satır", end="", flush=True)
+    if index:
+        conn.execute("CREATE INDEX ix_readingdb_type_ts_ms ON readingdb (type, ts_ms)")
+        conn.commit()
+    conn.close()
+    print(f" ({time.perf_counter() - t0:.0f} sn)")
+
+
+def build_partitioned(src, path, unit):
+    """Tek tablodaki veriyi bölüm tablolarına kopyalar (ATTACH + INSERT SELECT)."""
+    from sqlalchemy import create_engine, text
+
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE readingdb (id INTEGER NOT NULL PRIMARY KEY, sensor_id VARCHAR NOT NULL, "
+            "type VARCHAR NOT NULL, value FLOAT NOT NULL, ts DATETIME NOT NULL, ts_ms INTEGER)"
+        ))
+    store = PartitionedSqliteStore(engine, None, unit=unit)
+    store.start()
+    copy = sqlite3.connect(path)
+    copy.execute("ATTACH DATABASE ? AS src", (src,))
+    lo, hi = copy.execute("SELECT min(ts), max(ts) FROM src.readingdb").fetchone()
+    copy.execute("INSERT OR IGNORE INTO reading_sensors (sensor_id, type) SELECT DISTINCT sensor_id, type FROM src.readingdb")
+    copy.commit()
+    t0 = time.perf_counter()
+    cursor, last = datetime.fromisoformat(lo), datetime.fromisoformat(hi)
+    while cursor <= last:
+        name, start, end, _ = partition_for(cursor, unit)
+        _, base, _ = store._target(start)
+        copy.execute(
+            f"INSERT INTO {name} (id, sensor, value, ts, ts_ms) "
+            f"SELECT ? + r.id, s.id, r.value, r.ts, r.ts_ms FROM src.readingdb r "
+            f"JOIN reading_sensors s ON s.sensor_id = r.sensor_id AND s.type = r.type WHERE r.ts >= ? AND r.ts < ?",
+            (base, ts_text(start), ts_text(end)),
+        )
+        copy.commit()
+        cursor = end
+    copy.close()
+    engine.dispose()
+    print(f"  bölümleme ({unit}): {time.perf_counter() - t0:.0f} sn")
+
+
+def timed(fn, repeat):
+    times, result = [], None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - t0)
+    return statistics.median(times), result
+
+
+def same(a, b):
+    if [r["bucket"] for r in a] != [r["bucket"] for r in b]:
+        return False
+    return all(
+        x["count"] == y["count"] and abs(x["avg"] - y["avg"]) < 1e-6 * max(1.0, abs(x["avg"]))
+        for x, y in zip(a, b)
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SQLite vs DuckDB aggregation benchmark")
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--sensors", type=int, default=30)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--db", default="/tmp/bench_readings.db")
+    parser.add_argument("--rebuild", action="store_true")
+    parser.add_argument("--index", action="store_true", help="SQLite'a (type, ts_ms) indeksi ekle")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--partition", choices=("month", "week", "day"))
+    parser.add_argument("--retention", action="store_true", help="en eski bölümü sil: DELETE vs DROP TABLE")
+    parser.add_argument("--compact", type=float, metavar="DAYS", help="bölümlemede DAYS günden eskisini bloklara taşı")
+    args = parser.parse_args()
+
+    from sqlalchemy import create_engine
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    db = Path(args.db)
+    duck_path = db.with_suffix(".duckdb")
+    part_path = db.with_name(f"{db.stem}_{args.partition}.db") if args.partition else None
+    if args.rebuild or not db.exists():
+        for p in (db, duck_path, part_path):
+            for f in (p, Path(f"{p}-wal"), Path(f"{p}-shm")) if p else ():
+                if f.exists():
+                    os.remove(f)
+        build_sqlite(str(db), args.rows, args.sensors, args.days, args.index)
+    if part_path is not None and not part_path.exists():
+        build_partitioned(str(db), str(part_path), args.partition)
+
+    engine = create_engine(f"sqlite:///{db}")
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{db}")
+    sqlite_store = SqliteReadingStore(engine, async_engine)
+    sqlite_store.start()
+    stores = [("sqlite", sqlite_store)]
+    if part_path is not None:
+        part_engine = create_engine(f"sqlite:///{part_path}")
+        part_store = PartitionedSqliteStore(
+            part_engine, create_async_engine(f"sqlite+aiosqlite:///{part_path}"), unit=args.partition
+        )
+        part_store.start()
+        if args.compact:
+            t0 = time.perf_counter()
+            moved = part_store.compact_before(datetime.now(timezone.utc) - timedelta(days=args.compact))
+            if moved:
+                print(f"  sıkıştırma: {moved:,} satır, {time.perf_counter() - t0:.1f} sn; {part_store.stats()['blocks']}")
+        stores.append((args.partition, part_store))
+    duck = DuckDBReadingStore(sqlite_store, duck_path, batch_size=500_000)
+    if not duck.open():
+        sys.exit(1)
+    t0 = time.perf_counter()
+    copied = duck.sync()
+    elapsed = time.perf_counter() - t0
+    if copied:
+        print(f"  duckdb senkron: {copied:,} satır, {elapsed:.1f} sn ({copied / elapsed:,.0f} satır/sn)")
+    duck.ready = True
+
+    total = duck._con.execute("SELECT count(*) FROM readings").fetchone()[0]
+    size_sqlite = sum(p.stat().st_size for p in (db, Path(f"{db}-wal")) if p.exists())
+    print(f"satır: {total:,}   sqlite: {size_sqlite / 2**20:,.0f} MiB   duckdb: {duck_path.stat().st_size / 2**20:,.0f} MiB")
+    stores.append(("duckdb", duck))
+    print(f"{'sorgu (ms)':<14}" + "".join(f"{name:>12}" for name, _ in stores) + "  sonuç")
+
+    loop = asyncio.new_event_loop()
+    now = datetime.now(timezone.utc)
+    try:
+        for bucket, window in QUERIES:
+            since = now - window
+            cells, results = [], []
+            for _, store in stores:
+                t, r = timed(lambda: loop.run_until_complete(store.series("temp", bucket, since)), args.repeat)
+                cells.append(f"{t * 1000:>12.1f}")
+                results.append(r)
+            label = f"{bucket} {window.days or window.seconds // 3600}{'g' if window.days else 's'}"
+            ok = all(same(results[0], r) for r in results[1:])
+            print(f"{label:<14}" + "".join(cells) + f"  {'aynı' if ok else 'FARKLI'} ({len(results[0])} bucket)")
+
+        if args.retention and part_path is not None:
+            oldest = part_store.segments()[-1]
+            cutoff = datetime(1970, 1, 1) + timedelta(milliseconds=oldest.end)
+            t0 = time.perf_counter()
+            sqlite_store.drop_before(cutoff)
+            t_delete = time.perf_counter() - t0
+            t0 = time.perf_counter()
+            part_store.drop_before(cutoff)
+            t_drop = time.perf_counter() - t0
+            print(f"saklama ({oldest.table} öncesi): DELETE {t_delete * 1000:.0f} ms, DROP TABLE {t_drop * 1000:.0f} ms")
+    finally:
+        loop.run_until_complete(async_engine.dispose())
+        loop.close()
+        duck.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+/api/v1/weather yanıt üretiminin CPU maliyeti (ağ hariç).
+
+Üç yol karşılaştırılır:
+  legacy   - eski get_weather() gövdesi: her çağrıda dict kurulumu + if/range zincirleri
+  build    - weather.build_weather_response(): sabit tablolar + vektörel forecast dönüşümü
+  cached   - WeatherService.report(): forecast önbellekte, hazır yanıt tekrar kullanılır
+
+    python3 tools/bench_weather.py --iterations 20000
+"""
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from weather import WeatherService, build_weather_response  # noqa: E402
+from weather_stub import forecast_payload  # noqa: E402
+
+
+def legacy_build(data, city_name, country_code):
+    current = data["current"]
+    weather_code = int(current["weather_code"])
+    weather_codes = {
+        0: "Açık", 1: "Çoğunlukla açık", 2: "Kısmen bulutlu", 3: "Kapalı",
+        45: "Sisli", 48: "Donan sisli", 51: "Hafif çiseleyen yağmur",
+        53: "Orta çiseleyen yağmur", 55: "Yoğun çiseleyen yağmur",
+        56: "Hafif donan çiseleme", 57: "Yoğun donan çiseleme", 61: "Hafif yağmur",
+        63: "Orta yağmur", 65: "Yoğun yağmur", 66: "Hafif donan yağmur",
+        67: "Yoğun donan yağmur", 71: "Hafif kar", 73: "Orta kar", 75: "Yoğun kar",
+        77: "Kar taneleri", 80: "Hafif sağanak", 81: "Orta sağanak",
+        82: "Yoğun sağanak", 85: "Hafif kar sağanağı", 86: "Yoğun kar sağanağı",
+        95: "Fırtına", 96: "Dolu ile fırtına", 99: "Şiddetli dolu ile fırtına",
+    }
+
+    def icon_for(code):
+        if code in [0, 1]:
+            return "clear"
+        elif code in [2, 3]:
+            return "clouds"
+        elif code in [45, 48]:
+            return "mist"
+        elif code in range(51, 68):
+            return "rain"
+        elif code in range(71, 78):
+            return "snow"
+        elif code in range(80, 83):
+            return "rain"
+        elif code in range(95, 100):
+            return "thunderstorm"
+        return "clouds"
+
+    daily = data["daily"]
+    forecast = []
+    for i in range(min(7, len(daily["weather_code"]))):
+        day_code = int(daily["weather_code"][i])
+        forecast.append({
+            "date": daily["time"][i],
+            "max_temp": round(daily["temperature_2m_max"][i], 1),
+            "min_temp": round(daily["temperature_2m_min"][i], 1),
+            "weather_code": day_code,
+            "description": weather_codes.get(day_code, "Bilinmiyor"),
+            "icon": icon_for(day_code),
+        })
+    return {
+        "temp": round(current["temperature_2m"], 1),
+        "feels_like": round(current["apparent_temperature"], 1),
+        "humidity": int(current["relative_humidity_2m"]),
+        "wind_speed": round(current["wind_speed_10m"] * 3.6, 1),
+        "description": weather_codes.get(weather_code, "Bilinmiyor"),
+        "icon": icon_for(weather_code),
+        "weather_code": weather_code,
+        "city": city_name,
+        "country": country_code,
+        "forecast": forecast,
+    }
+
+
+def bench(name, fn, iterations):
+    fn()  # ısınma
+    start = time.process_time()
+    for _ in range(iterations):
+        fn()
+    elapsed = time.process_time() - start
+    print(f"{name:<8} {elapsed / iterations * 1e6:10.2f} µs/istek CPU")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Weather endpoint CPU benchmark")
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    lat, lon = 41.0082, 28.9784
+    data = forecast_payload(lat, lon)
+    legacy, built = legacy_build(data, "Istanbul", "TR"), build_weather_response(data, "Istanbul", "TR")
+    for field in ("weather_code", "description", "icon"):
+        assert [d[field] for d in legacy["forecast"]] == [d[field] for d in built["forecast"]], field
+
+    service = WeatherService()
+    service._forecasts.put(("forecast",) + service.coord_key(lat, lon), data)
+    loop = asyncio.new_event_loop()
+
+    bench("legacy", lambda: legacy_build(data, "Istanbul", "TR"), args.iterations)
+    bench("build", lambda: build_weather_response(data, "Istanbul", "TR"), args.iterations)
+    bench("cached", lambda: loop.run_until_complete(service.report(lat, lon, "Istanbul", "TR")), args.iterations)
+    print(f"stats: {service.stats()}")
+    loop.close()
+
+
+if __name__ == "__main__":
+    main()
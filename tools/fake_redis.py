@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Redis yerine geçen küçük, bellek içi RESP2 sunucusu (yalnızca geliştirme/test).
+
+SHARED_STATE_BACKEND=redis yolunu gerçek Redis kurmadan denemek için:
+
+    python3 tools/fake_redis.py --port 6390
+    SHARED_STATE_BACKEND=redis SHARED_STATE_REDIS_URL=redis://127.0.0.1:6390/0 \\
+    uvicorn main:app --workers 4
+
+Desteklenen komutlar: PING, ECHO, SELECT, CLIENT, GET, SET [NX|XX] [EX s],
+SETNX, DEL, EXISTS, INCR, LPUSH, RPUSH, LTRIM, LRANGE, LLEN, FLUSHALL,
+FLUSHDB, DBSIZE, MULTI/EXEC/DISCARD, WATCH/UNWATCH. Süre (EX) kabul edilir ama uygulanmaz.
+"""
+import argparse
+import asyncio
+
+DATA = {}
+VERSIONS = {}  # anahtar -> yazma sayacı (WATCH için)
+WRITES = {"SET", "SETNX", "DEL", "INCR", "LPUSH", "RPUSH", "LTRIM"}
+
+
+class RespError(Exception):
+    pass
+
+
+def encode(value):
+    if value is None:
+        return b"$-1\r\n"
+    if isinstance(value, RespError):
+        return f"-{value}\r\n".encode()
+    if value is True:
+        return b"+OK\r\n"
+    if isinstance(value, int):
+        return f":{value}\r\n".encode()
+    if isinstance(value, str):
+        return f"+{value}\r\n".encode()
+    if isinstance(value, bytes):
+        return b"$%d\r\n%s\r\n" % (len(value), value)
+    if isinstance(value, list):
+        return b"*%d\r\n" % len(value) + b"".join(encode(v) for v in value)
+    raise TypeError(type(value))
+
+
+def _list(key, create=False):
+    value = DATA.get(key)
+    if value is None:
+        if create:
+            DATA[key] = value = []
+        else:
+            return []
+    if not isinstance(value, list):
+        raise RespError("WRONGTYPE Operation against a key holding the wrong kind of value")
+    return value
+
+
+def _range(length, start, stop):
+    start = length + start if start < 0 else start
+    stop = length + stop if stop < 0 else stop
+    return max(start, 0), min(stop, length - 1)
+
+
+def _touch(cmd, a):
+    if cmd in WRITES:
+        for k in a[:1] if cmd != "DEL" else a:
+            VERSIONS[k] = VERSIONS.get(k, 0) + 1
+    elif cmd in ("FLUSHALL", "FLUSHDB"):
+        for k in DATA:
+            VERSIONS[k] = VERSIONS.get(k, 0) + 1
+
+
+def execute(args):
+    cmd = args[0].upper().decode()
+    a = args[1:]
+    _touch(cmd, a)
+    if cmd == "PING":
+        return a[0] if a else "PONG"
+    if cmd == "ECHO":
+        return a[0]
+    if cmd in ("SELECT", "CLIENT"):
+        return True
+    if cmd == "GET":
+        value = DATA.get(a[0])
+        if isinstance(value, list):
+            raise RespError("WRONGTYPE Operation against a key holding the wrong kind of value")
+        return value
+    if cmd == "SET":
+        flags = {f.upper() for f in a[2:]}
+        exists = a[0] in DATA
+        if (b"NX" in flags and exists) or (b"XX" in flags and not exists):
+            return None
+        DATA[a[0]] = a[1]
+        return True
+    if cmd == "SETNX":
+        if a[0] in DATA:
+            return 0
+        DATA[a[0]] = a[1]
+        return 1
+    if cmd == "DEL":
+        return sum(1 for k in a if DATA.pop(k, None) is not None)
+    if cmd == "EXISTS":
+        return sum(1 for k in a if k in DATA)
+    if cmd == "INCR":
+        value = int(DATA.get(a[0], b"0")) + 1
+        DATA[a[0]] = str(value).encode()
+        return value
+    if cmd in ("LPUSH", "RPUSH"):
+        items = _list(a[0], create=True)
+        for v in a[1:]:
+            if cmd == "LPUSH":
+                items.insert(0, v)
+            else:
+                items.append(v)
+        return len(items)
+    if cmd == "LTRIM":
+        items = _list(a[0])
+        start, stop = _range(len(items), int(a[1]), int(a[2]))
+        items[:] = items[start : stop + 1]
+        if not items:
+            DATA.pop(a[0], None)
+        return True
+    if cmd == "LRANGE":
+        items = _list(a[0])
+        start, stop = _range(len(items), int(a[1]), int(a[2]))
+        return items[start : stop + 1]
+    if cmd == "LLEN":
+        return len(_list(a[0]))
+    if cmd in ("FLUSHALL", "FLUSHDB"):
+        DATA.clear()
+        return True
+    if cmd == "DBSIZE":
+        return len(DATA)
+    raise RespError(f"ERR unknown command '{cmd}'")
+
+
+async def read_command(reader):
+    line = await reader.readline()
+    if not line:
+        return None
+    if not line.startswith(b"*"):
+        return line.strip().split()  # inline komut (ör. redis-cli / telnet)
+    args = []
+    for _ in range(int(line[1:])):
+        size = int((await reader.readline())[1:])
+        args.append((await reader.readexactly(size + 2))[:-2])
+    return args
+
+
+async def handle(reader, writer):
+    queued = None
+    watched = {}
+    try:
+        while True:
+            args = await read_command(reader)
+            if args is None:
+                break
+            if not args:
+                continue
+            cmd = args[0].upper()
+            if cmd == b"MULTI":
+                queued, reply = [], True
+            elif cmd == b"EXEC":
+                if queued is None:
+                    reply = RespError("ERR EXEC without MULTI")
+                elif any(VERSIONS.get(k, 0) != v for k, v in watched.items()):
+                    reply = None  # WATCH edilen anahtar değişti: transaction iptal
+                else:
+                    reply = [_safe(q) for q in queued]
+                queued, watched = None, {}
+            elif cmd == b"DISCARD":
+                queued, watched, reply = None, {}, True
+            elif cmd == b"WATCH" and queued is None:
+                watched.update((k, VERSIONS.get(k, 0)) for k in args[1:])
+                reply = True
+            elif cmd == b"UNWATCH" and queued is None:
+                watched, reply = {}, True
+            elif queued is not None:
+                queued.append(args)
+                reply = "QUEUED"
+            else:
+                reply = _safe(args)
+            writer.write(encode(reply))
+            await writer.drain()
+    except (asyncio.IncompleteReadError, ConnectionResetError):
+        pass
+    finally:
+        writer.close()
+
+
+def _safe(args):
+    try:
+        return execute(args)
+    except RespError as e:
+        return e
+    except (IndexError, ValueError):
+        return RespError("ERR wrong number of arguments or invalid value")
+
+
+async def serve(host, port):
+    server = await asyncio.start_server(handle, host, port)
+    print(f"fake redis: redis://{host}:{port}/0")
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="In-memory Redis stand-in for local testing")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6390)
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Okuma uç noktaları için yük testi: istek/sn ve gecikme yüzdelikleri.
+
+Çalışan bir backend'e karşı:
+
+    python3 tools/loadtest.py --url http://127.0.0.1:8000 \\
+        --path "/api/v1/readings?limit=100" --path /api/v1/latest \\
+        --concurrency 200 --duration 15
+
+Threadpool (sync `def` + Session) ile async (`async def` + aiosqlite)
+modelinin karşılaştırması; aynı sorgu, aynı SQLite dosyası, ayrı bir
+uvicorn sürecinde (ML bağımlılıkları gerekmez):
+
+    python3 tools/loadtest.py --compare --rows 50000 --concurrency 200
+
+Koşullu GET ile yoklama (her istemci son ETag'i If-None-Match ile gönderir;
+veri değişmediyse sunucu sorguyu çalıştırmadan 304 döner):
+
+    python3 tools/loadtest.py --path /api/v1/alerts --conditional
+
+İstemci sunucuyla aynı süreçte çalışmaz; ölçüm GIL'i paylaşmaz.
+"""
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+import httpx
+
+READINGS_SQL = "SELECT id, sensor_id, type, value, ts FROM readingdb ORDER BY ts DESC LIMIT :limit"
+
+
+def seed_db(path, rows, index=False):
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(
+        "CREATE TABLE readingdb (id INTEGER PRIMARY KEY, sensor_id TEXT, type TEXT, value REAL, ts DATETIME)"
+    )
+    rng = random.Random(7)
+    start = datetime.now(timezone.utc) - timedelta(seconds=rows)
+    kinds = ("temp", "humidity", "co2")
+    conn.executemany(
+        "INSERT INTO readingdb (sensor_id, type, value, ts) VALUES (?, ?, ?, ?)",
+        (
+            (f"{kinds[i % 3]}-{i % 30}", kinds[i % 3], rng.uniform(0, 100), (start + timedelta(seconds=i)).isoformat(" "))
+            for i in range(rows)
+        ),
+    )
+    if index:
+        conn.execute("CREATE INDEX ix_readingdb_ts ON readingdb (ts)")
+    conn.commit()
+    conn.close()
+
+
+def build_demo_app(db_path):
+    """Aynı sorgunun sync (threadpool) ve async (aiosqlite) sürümleri."""
+    from fastapi import FastAPI
+    from sqlalchemy import create_engine, text
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    app = FastAPI()
+    sync_engine = create_engine(
+        f"sqlite:///{db_path}", connect_args={"check_same_thread": False}, pool_size=10, max_overflow=20
+    )
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}", pool_size=20, max_overflow=20)
+
+    def rows_to_json(rows):
+        return [{"id": r[0], "sensor_id": r[1], "type": r[2], "value": r[3], "ts": str(r[4])} for r in rows]
+
+    @app.get("/sync/readings")
+    def sync_readings(limit: int = 100):
+        with sync_engine.connect() as conn:
+            return rows_to_json(conn.execute(text(READINGS_SQL), {"limit": limit}).all())
+
+    @app.get("/async/readings")
+    async def async_readings(limit: int = 100):
+        async with async_engine.connect() as conn:
+            return rows_to_json((await conn.execute(text(READINGS_SQL), {"limit": limit})).all())
+
+    return app
+
+
+def serve(db_path, port):
+    import uvicorn
+
+    uvicorn.run(build_demo_app(db_path), host="127.0.0.1", port=port, log_level="warning")
+
+
+async def run_load(url, concurrency, duration, timeout, conditional=False):
+    latencies = []
+    errors = 0
+    not_modified = 0
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=timeout) as client:
+        deadline = time.perf_counter() + duration
+
+        async def worker():
+            nonlocal errors, not_modified
+            etag = None
+            while time.perf_counter() < deadline:
+                t0 = time.perf_counter()
+                try:
+                    resp = await client.get(url, headers={"If-None-Match": etag} if etag else None)
+                    ok = resp.status_code in (200, 304)
+                    if resp.status_code == 304:
+                        not_modified += 1
+                    elif conditional:
+                        etag = resp.headers.get("etag")
+                except httpx.HTTPError:
+                    ok = False
+                if ok:
+                    latencies.append(time.perf_counter() - t0)
+                else:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    if conditional:
+        print(f"  304: {not_modified:,} / {len(latencies):,}")
+    return latencies, errors, elapsed
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return float("nan")
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def report(label, latencies, errors, elapsed):
+    latencies.sort()
+    print(
+        f"{label:<40} {len(latencies) / elapsed:>9,.0f} req/s"
+        f"  p50 {percentile(latencies, 0.50) * 1000:>7.1f} ms"
+        f"  p99 {percentile(latencies, 0.99) * 1000:>7.1f} ms"
+        f"  hata {errors}"
+    )
+
+
+def wait_until_up(url, timeout=20.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            httpx.get(url, timeout=1.0)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Sunucu ayağa kalkmadı: {url}")
+
+
+def compare(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "loadtest.db")
+        seed_db(db_path, args.rows, args.index)
+        server = subprocess.Popen(
+            [sys.executable, __file__, "--serve", db_path, "--port", str(args.port)],
+        )
+        try:
+            base = f"http://127.0.0.1:{args.port}"
+            wait_until_up(f"{base}/sync/readings?limit=1")
+            print(
+                f"{args.rows} satır{' (ts indeksli)' if args.index else ''}, {args.concurrency} eşzamanlı istemci, "
+                f"{args.duration:.0f} sn/uç nokta, {os.cpu_count()} CPU"
+            )
+            for name in ("sync", "async"):
+                url = f"{base}/{name}/readings?limit={args.limit}"
+                asyncio.run(run_load(url, min(args.concurrency, 20), 1.0, args.timeout))  # ısınma
+                report(f"{name:<5} /readings?limit={args.limit}", *asyncio.run(
+                    run_load(url, args.concurrency, args.duration, args.timeout)
+                ))
+        finally:
+            server.terminate()
+            server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent load test for read endpoints")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--path", action="append", help="tekrarlanabilir; varsayılan /api/v1/readings?limit=100")
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--compare", action="store_true", help="sync/threadpool ile async modeli karşılaştır")
+    parser.add_argument("--conditional", action="store_true", help="son ETag'i If-None-Match ile gönder (304 başarılı sayılır)")
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--index", action="store_true", help="--compare: ts'e indeks ekle (sorgu tam tarama + sıralama yerine indeks okuması)")
+    parser.add_argument("--port", type=int, default=8799)
+    parser.add_argument("--serve", metavar="DB", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.port)
+        return
+    if args.compare:
+        compare(args)
+        return
+    for path in args.path or ["/api/v1/readings?limit=100"]:
+        url = args.url.rstrip("/") + path
+        report(path, *asyncio.run(run_load(url, args.concurrency, args.duration, args.timeout, args.conditional)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Open-Meteo'yu taklit eden yerel stub sunucu (geocoding + forecast).
+
+Backend'i internete çıkmadan test etmek için:
+
+    python3 tools/weather_stub.py --port 8765 --delay 0.3
+    WEATHER_GEOCODING_URL=http://127.0.0.1:8765/v1/search \\
+    WEATHER_FORECAST_URL=http://127.0.0.1:8765/v1/forecast \\
+    uvicorn main:app
+
+Her upstream çağrısı loglanır ve GET /stats sayaçları döner; önbellek ve
+istek birleştirme çalışıyorsa aynı şehir için yapılan eşzamanlı
+/api/v1/weather istekleri tek bir forecast çağrısına dönüşür.
+"""
+import argparse
+import datetime as dt
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+COUNTS = {"search": 0, "forecast": 0}
+LOCK = threading.Lock()
+DELAY = 0.0
+
+
+def geocode_payload(name):
+    return {"results": [{"name": name.title(), "latitude": 41.0082, "longitude": 28.9784}]}
+
+
+def forecast_payload(lat, lon):
+    today = dt.date.today()
+    codes = [0, 2, 45, 61, 73, 81, 95]
+    return {
+        "latitude": lat,
+        "longitude": lon,
+        "current": {
+            "temperature_2m": 21.4,
+            "relative_humidity_2m": 58,
+            "weather_code": 2,
+            "wind_speed_10m": 3.2,
+            "apparent_temperature": 21.9,
+        },
+        "daily": {
+            "time": [(today + dt.timedelta(days=i)).isoformat() for i in range(7)],
+            "weather_code": codes,
+            "temperature_2m_max": [24.1 + i * 0.3 for i in range(7)],
+            "temperature_2m_min": [15.2 + i * 0.2 for i in range(7)],
+        },
+    }
+
+
+class Handler(BaseHTTPRequestHandler):
+    def _send(self, payload, status=200):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        q = {k: v[0] for k, v in parse_qs(url.query).items()}
+        if url.path == "/stats":
+            with LOCK:
+                return self._send(dict(COUNTS))
+        if url.path == "/v1/search":
+            kind, payload = "search", geocode_payload(q.get("name", "Istanbul"))
+        elif url.path == "/v1/forecast":
+            kind = "forecast"
+            payload = forecast_payload(float(q.get("latitude", 0)), float(q.get("longitude", 0)))
+        else:
+            return self._send({"error": "not found"}, status=404)
+        with LOCK:
+            COUNTS[kind] += 1
+        if DELAY:
+            time.sleep(DELAY)
+        self._send(payload)
+
+    def log_message(self, fmt, *args):
+        print(f"[stub] {self.address_string()} {fmt % args}  counts={COUNTS}")
+
+
+def main():
+    global DELAY
+    parser = argparse.ArgumentParser(description="Open-Meteo stub server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--delay", type=float, default=0.0, help="Her yanıttan önce bekleme (sn), yavaş upstream taklidi")
+    args = parser.parse_args()
+    DELAY = args.delay
+
+    server = ThreadingHTTPServer((args.host, args.port), Handler)
+    print(f"Open-Meteo stub: http://{args.host}:{args.port}  (/v1/search, /v1/forecast, /stats)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()